@@ -1,8 +1,19 @@
+import os
 import time
 import sqlite3
+import threading
+from datetime import datetime
+from apscheduler.schedulers.background import BackgroundScheduler
 from dotenv import load_dotenv
+from telegram.error import TelegramError
 from src.channels.telegram import TelegramChannel
 from src.agents.personal_assistant import PersonalAssistant
+from src.checkpoints import format_report
+from src.config import CHECKPOINT_MAINTENANCE_HOURS, SLACK_INGEST_INTERVAL, STREAM_REPLIES
+from src.db import get_message_cache
+from src.dispatcher import ConversationDispatcher
+from src.google_services import service_stats
+from src.utils import llm_pool_stats
 
 # Load .env variables
 load_dotenv()
@@ -18,25 +29,117 @@ telegram = TelegramChannel()
 # Initiate personal assistant
 personal_assistant = PersonalAssistant(conn)
 
-# Configuration for the Langgraph checkpoints, specifying thread ID
-config = {"configurable": {"thread_id": "1"}}
+# Each worker thread replies through its own channel, whose bot is bound to
+# that thread's event loop
+_local = threading.local()
 
 
-def monitor_channel(after_timestamp, config):
+def thread_id_for(chat_id):
+    """Map a Telegram chat to its Langgraph checkpoint thread ID."""
+    # The owner's chat keeps the thread used before per-chat threads existed.
+    if str(chat_id) == str(telegram.chat_id):
+        return "1"
+    return f"telegram:{chat_id}"
+
+
+def worker_channel():
+    if not hasattr(_local, "telegram"):
+        _local.telegram = TelegramChannel()
+    return _local.telegram
+
+
+def handle_message(chat_id, message):
+    """Answer one message; runs on a dispatcher worker thread."""
+    config = {"configurable": {"thread_id": thread_id_for(chat_id)}}
+    sent_message = (
+        f"Message: {message['text']}\n"
+        f"Current Date/time: {message['date']}"
+    )
+    channel = worker_channel()
+    if STREAM_REPLIES:
+        # Placeholder first, then edits as the reply is generated
+        channel.send_streaming(
+            personal_assistant.stream_reply(sent_message, config=config),
+            chat_id=chat_id,
+        )
+    else:
+        answer = personal_assistant.invoke(sent_message, config=config)
+        channel.send_message(answer, chat_id=chat_id)
+
+
+def maintain_checkpoints():
+    """Prune and compact the agent memory, then log its size, load times and
+    the router, LLM client, Google client and Gmail message cache stats."""
+    print(format_report(personal_assistant.maintain_memory()))
+    if personal_assistant.router is not None:
+        print(personal_assistant.router.format_stats())
+    llm = llm_pool_stats()
+    print(
+        f"llm clients: {llm['hits']} hits, {llm['misses']} misses, "
+        f"{llm['connections']} connections ({llm['idle_connections']} idle)"
+    )
+    google = service_stats()
+    print(
+        f"google clients: {google['builds']} builds, {google['hits']} hits, "
+        f"{google['refreshes']} token refreshes"
+    )
+    cache = get_message_cache().stats()
+    print(
+        f"gmail message cache: {cache['hits']} hits, {cache['misses']} misses, "
+        f"{cache['entries']} messages, {cache['bytes']} bytes"
+    )
+
+
+def ingest_slack():
+    """Copy new Slack messages into the local store searched by the Slack agent."""
+    from src.tools.slack.scanner import get_scanner
+
+    get_scanner().ingest()
+
+
+def monitor_channel(dispatcher):
     while True:
-        new_messages = telegram.receive_messages(after_timestamp)
-        if new_messages:
-            for message in new_messages:
-                sent_message = (
-                    f"Message: {message['text']}\n"
-                    f"Current Date/time: {message['date']}"
-                )
-                answer = personal_assistant.invoke(sent_message, config=config)
-                telegram.send_message(answer)
-        after_timestamp = int(time.time())
-        time.sleep(5)  # Sleep for 5 seconds before checking again
-        
+        try:
+            # Long poll: returns as soon as messages arrive, or empty on timeout
+            new_messages = telegram.poll_messages()
+        except TelegramError as e:
+            print(f"Failed to retrieve messages: {str(e)}")
+            time.sleep(5)  # Back off before retrying
+            continue
+        for message in new_messages:
+            chat_id = message.get("chat_id") or telegram.chat_id
+            if not telegram.is_allowed(chat_id):
+                print(f"Ignoring message from unknown chat {chat_id}")
+                continue
+            if telegram.handle_command(message):
+                continue
+            # Blocks while too many messages are pending (backpressure)
+            dispatcher.submit(chat_id, message)
+        # Only confirm the batch to Telegram once it is handed off
+        telegram.commit_offset()
+
 
 if __name__ == "__main__":
     print("Personal Assistant Manager is running")
-    monitor_channel(int(time.time()), config)
\ No newline at end of file
+    dispatcher = ConversationDispatcher(handle_message)
+    scheduler = BackgroundScheduler()
+    scheduler.add_job(
+        maintain_checkpoints,
+        id="checkpoint_maintenance",
+        trigger="interval",
+        hours=CHECKPOINT_MAINTENANCE_HOURS,
+    )
+    if os.getenv("SLACK_BOT_TOKEN"):
+        scheduler.add_job(
+            ingest_slack,
+            id="slack_ingestion",
+            trigger="interval",
+            seconds=SLACK_INGEST_INTERVAL,
+            next_run_time=datetime.now(),
+        )
+    scheduler.start()
+    try:
+        monitor_channel(dispatcher)
+    finally:
+        scheduler.shutdown(wait=False)
+        dispatcher.close(wait=False)
@@ -3,6 +3,7 @@ import asyncio
 import sqlite3
 from fastapi import FastAPI, Form
 from dotenv import load_dotenv
+from src.channels.streaming import PLACEHOLDER
 from src.channels.whatsapp import WhatsAppChannel
 from src.agents.personal_assistant import PersonalAssistant
 from src.utils import get_current_date_time
@@ -17,7 +18,7 @@ app = FastAPI()
 conn = sqlite3.connect("db/checkpoints.sqlite", check_same_thread=False)
 
 # Initiate personal assistant instance
-personal_assistant = PersonalAssistant()
+personal_assistant = PersonalAssistant(conn)
 
 # Configuration for the Langgraph agent, specifying thread ID
 config = {"configurable": {"thread_id": "1"}}
@@ -26,20 +27,28 @@ async def process_message_async(to_whatsapp_number, incoming_message):
     """
     Processes the incoming message asynchronously:
     1. Formats the message with the current date and time.
-    2. Invokes the personal assistant to get a response.
-    3. Sends the response to the provided WhatsApp number.
+    2. Sends a placeholder so the user knows the assistant is working
+       (WhatsApp messages cannot be edited, so the reply is not streamed).
+    3. Invokes the personal assistant to get a response.
+    4. Sends the response to the provided WhatsApp number.
     """
     # Format the message with current date/time
     message = (
         f"Message: {incoming_message}\n"
         f"Current Date/time: {get_current_date_time()}"
     )
-    
-    # Invoke the personal assistant to generate a response
-    answer = personal_assistant.invoke(message, config=config)
 
-    # Send the response via Twilio WhatsApp
     whatsapp = WhatsAppChannel()
+    await asyncio.to_thread(
+        whatsapp.send_message,
+        to_number=to_whatsapp_number,
+        body=PLACEHOLDER
+    )
+
+    # Invoke the personal assistant in a worker thread so the webhook stays responsive
+    answer = await asyncio.to_thread(personal_assistant.invoke, message, config=config)
+
+    # Send the response via Twilio WhatsApp
     await asyncio.to_thread(
         whatsapp.send_message,
         to_number=to_whatsapp_number,
@@ -1,18 +1,27 @@
-from typing import List
-from langgraph.prebuilt import create_react_agent
+import importlib
+import threading
+from typing import Any, Callable, List, Union
 from src.utils import get_llm_by_provider
 
+
+def _import_tool(spec: str):
+    """Import a tool given as ``"package.module:attribute"``."""
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
 class Agent:
     def __init__(
-        self, 
+        self,
         name: str,  # Name of the agent
         description: str,  # Description of the agent (a brief explanation of its function or purpose)
         system_prompt: str,  # The instructions for the agent
-        tools: List[str],  # List of tools that the agent can use
+        tools: List[Union[str, Any]],  # Tools the agent can use, or "module:attr" paths imported on first use
         sub_agents: List['Agent'],  # List of sub-agents that the main agent can sned message to
         model: str,  # LLM model (in provider/model format e.g., "openai/gpt-4o", "gemini/gemini-1.5-flash")
         temperature: float,  # Temperature setting for the LLM (affects creativity/randomness),
-        memory=None # Agent memory storage (Optional)
+        memory=None, # Agent memory storage, or a callable returning it (Optional)
+        history_budget: int = 0 # Token budget of the conversation history sent to the LLM, 0 for unlimited (Optional)
 
     ):
         self.name = name
@@ -22,30 +31,79 @@ class Agent:
         self.sub_agents = sub_agents
         self.model = model
         self.temperature = temperature
-        self.agent = None 
+        self.agent = None
         self.memory = memory
+        self.history_budget = history_budget
+        self.history = None  # HistoryBudget hook, created with the agent graph
+        self._tool_factories: List[Callable[[], Any]] = []
+        self._lock = threading.Lock()
 
     def invoke(self, *args, **kwargs):
-        if not self.agent:
-            self.initiat_agent()
-        
+        self._ensure_agent()
+
         print(f"--- Calling {self.name} ---")
         response = self.agent.invoke(*args, **kwargs)
         return response
-    
+
+    async def ainvoke(self, *args, **kwargs):
+        self._ensure_agent()
+
+        print(f"--- Calling {self.name} ---")
+        response = await self.agent.ainvoke(*args, **kwargs)
+        return response
+
     def stream(self, *args, **kwargs):
-        if not self.agent:
-            self.initiat_agent()
-        
+        self._ensure_agent()
+
         print(f"--- Calling {self.name} ---")
         for chunk in self.agent.stream(*args, **kwargs):
             yield chunk
 
+    @property
+    def can_write(self) -> bool:
+        """Whether a tool of the agent changes data, e.g. sends an email.
+
+        Such tools are marked by :func:`src.response_cache.invalidates_responses`.
+        """
+        tools = [_import_tool(t) if isinstance(t, str) else t for t in self.tools]
+        return any(
+            getattr(getattr(t, "func", t), "invalidates_responses", False) for t in tools
+        )
+
+    def add_tool_factory(self, factory: Callable[[], Any]) -> None:
+        """Register a tool that is only built when the agent graph is compiled."""
+        self._tool_factories.append(factory)
+        self.agent = None
+
+    def _ensure_agent(self):
+        # Graphs are compiled on first dispatch; the lock keeps concurrent
+        # first calls from compiling the same graph twice.
+        if self.agent is None:
+            with self._lock:
+                if self.agent is None:
+                    self.initiat_agent()
+
+    def _resolve_tools(self) -> list:
+        tools = [_import_tool(t) if isinstance(t, str) else t for t in self.tools]
+        return tools + [factory() for factory in self._tool_factories]
+
     def initiat_agent(self):
+        # langgraph and the tool modules are slow to import, so they are only
+        # loaded once an agent is actually used.
+        from langgraph.prebuilt import create_react_agent
+
         llm = get_llm_by_provider(self.model, self.temperature)
+        memory = self.memory() if callable(self.memory) else self.memory
+        history = {}
+        if self.history_budget:
+            from .history import BudgetedAgentState, HistoryBudget
+
+            self.history = HistoryBudget(self.name, self.system_prompt, budget=self.history_budget)
+            history = {"pre_model_hook": self.history, "state_schema": BudgetedAgentState}
         self.agent = create_react_agent(
-            llm, 
-            tools=self.tools, 
-            state_modifier=self.system_prompt,
-            **({"checkpointer": self.memory} if self.memory else {"checkpointer": False}) # set to False to avoid "MULTIPLE_SUBGRAPHS" error
+            llm,
+            tools=self._resolve_tools(),
+            prompt=self.system_prompt,
+            **history,
+            **({"checkpointer": memory} if memory else {"checkpointer": False}) # set to False to avoid "MULTIPLE_SUBGRAPHS" error
         )
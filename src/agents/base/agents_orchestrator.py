@@ -1,27 +1,150 @@
+from typing import TYPE_CHECKING, Iterator, List, Optional
 from pydantic import Field, create_model
 from .agent import Agent
-from src.tools.send_message import SendMessage
+
+if TYPE_CHECKING:
+    from src.response_cache import ResponseCache
+    from src.tools.send_message import SendMessage, SendMessages
 
 class AgentsOrchestrator:
-    def __init__(self, main_agent: Agent, agents: list[Agent]):
+    def __init__(self, main_agent: Agent, agents: list[Agent], response_cache=None):
         self.main_agent = main_agent
         self.agents = agents
         self.agent_mapping = {}
+        self.response_cache = response_cache  # ResponseCache, or a callable returning it (Optional)
 
         # Set up the communication framework
         self._populate_agent_mapping()
         self._add_send_message_tool()
         
     def invoke(self, message, **kwargs):
+        cache, scope = self._response_cache(), self._scope(kwargs)
+        if cache is not None:
+            answer = cache.get(message, scope)
+            if answer is not None:
+                self.remember(message, answer, **kwargs)
+                return answer
+            generation = cache.generation()
+
         messages = {"messages": [("human", message)]}
         response = self.main_agent.invoke(messages, **kwargs)
-        return response["messages"][-1].content
+        answer = response["messages"][-1].content
+        if cache is not None:
+            cache.put(message, answer, scope, generation)
+        return answer
 
     def stream(self, message, **kwargs):
         messages = {"messages": [("human", message)]}
         for chunk in self.main_agent.stream(messages, **kwargs):
             yield chunk
 
+    def stream_reply(self, message, **kwargs) -> Iterator[str]:
+        """
+        Streams the main agent's reply as successive snapshots of its text.
+
+        Each snapshot is the reply written so far, followed by a progress note
+        while sub-agents or tools are working. The last snapshot is the final
+        answer, the same text ``invoke`` would return.
+        """
+        cache, scope = self._response_cache(), self._scope(kwargs)
+        if cache is not None:
+            answer = cache.get(message, scope)
+            if answer is not None:
+                self.remember(message, answer, **kwargs)
+                yield answer
+                return
+            generation = cache.generation()
+
+        messages = {"messages": [("human", message)]}
+        text, message_id, status, final = "", None, "", None
+
+        for mode, data in self.main_agent.stream(
+            messages, stream_mode=["messages", "updates"], **kwargs
+        ):
+            if mode == "messages":
+                chunk, metadata = data
+                # Only the main agent's answer, not nested graphs or the
+                # history summariser
+                if (
+                    chunk.type != "AIMessageChunk"
+                    or metadata.get("langgraph_node") != "agent"
+                    or "|" in metadata.get("langgraph_checkpoint_ns", "")
+                    or not isinstance(chunk.content, str)
+                    or not chunk.content
+                ):
+                    continue
+                if chunk.id != message_id:
+                    message_id, text = chunk.id, ""
+                text += chunk.content
+                yield self._snapshot(text, status)
+                continue
+
+            for node, update in data.items():
+                node_messages = (update or {}).get("messages") or []
+                if not node_messages:
+                    continue
+                last = node_messages[-1]
+                if node == "agent":
+                    tool_calls = getattr(last, "tool_calls", None)
+                    if tool_calls:
+                        status = self._progress_note(tool_calls)
+                        yield self._snapshot(text, status)
+                    else:
+                        final = last.content
+                elif node == "tools":
+                    status = ""
+
+        if final is not None:
+            if cache is not None:
+                cache.put(message, final, scope, generation)
+            yield final
+
+    def _response_cache(self) -> Optional["ResponseCache"]:
+        cache = self.response_cache
+        return cache() if callable(cache) else cache
+
+    @staticmethod
+    def _scope(kwargs) -> str:
+        """
+        Cached answers are only shared within one conversation thread.
+        """
+        config = kwargs.get("config") or {}
+        return str(config.get("configurable", {}).get("thread_id", ""))
+
+    def remember(self, message, answer, **kwargs):
+        """
+        Adds a turn answered without the main agent (e.g. from the cache) to its
+        memory, so that follow-up questions can refer to it.
+        """
+        config = kwargs.get("config")
+        if not self.main_agent.memory or not config:
+            return
+        self.main_agent._ensure_agent()
+        self.main_agent.agent.update_state(
+            config, {"messages": [("human", message), ("ai", answer)]}, as_node="agent"
+        )
+
+    @staticmethod
+    def _snapshot(text: str, status: str) -> str:
+        return f"{text.rstrip()}\n\n{status}".strip() if status else text
+
+    @staticmethod
+    def _progress_note(tool_calls) -> str:
+        """
+        Describes the sub-agents or tools the main agent is waiting for.
+        """
+        names = []
+        for call in tool_calls:
+            args = call.get("args") or {}
+            if call["name"] == "SendMessage":
+                names.append(args.get("recipient", call["name"]))
+            elif call["name"] == "SendMessages":
+                names.extend(m.get("recipient", "") for m in args.get("messages", []))
+            else:
+                names.append(call["name"])
+        names = list(dict.fromkeys(n for n in names if n))
+        return f"⏳ Asking {', '.join(names)}…"
+
     def _populate_agent_mapping(self):
         """
         Populates the agent mapping with agent names as keys and agent objects as values.
@@ -29,21 +152,27 @@ class AgentsOrchestrator:
         for agent in self.agents:
             self.agent_mapping[agent.name] = agent
 
-    def _create_dynamic_send_message_tool(self, agent: "Agent") -> "SendMessage":
+    @staticmethod
+    def _recipients_description(agent: "Agent") -> str:
         """
-        Creates a dynamic send message tool for agents with sub-agents.
+        Generates a description of the sub-agents an agent can message.
         """
-        # Generate a description for the recipients
-        recipients_description = "\n".join(
+        return "\n".join(
             f"{sub_agent.name}: {sub_agent.description}"
             for sub_agent in agent.sub_agents
             if sub_agent.description
         )
 
+    def _create_dynamic_send_message_tool(self, agent: "Agent") -> "SendMessage":
+        """
+        Creates a dynamic send message tool for agents with sub-agents.
+        """
+        from src.tools.send_message import SendMessage
+
         # Create a dynamic input schema
         DynamicSendMessageInput = create_model(
             f"{agent.name}SendMessageInput",
-            recipient=(str, Field(..., description=recipients_description)),
+            recipient=(str, Field(..., description=self._recipients_description(agent))),
             message=(str, Field(..., description="Message to send to sub-agent.")),
         )
 
@@ -52,17 +181,45 @@ class AgentsOrchestrator:
         send_message_tool.agent_mapping = self.agent_mapping  # Dynamically bind agent_mapping
         return send_message_tool
 
+    def _create_dynamic_send_messages_tool(self, agent: "Agent") -> "SendMessages":
+        """
+        Creates a dynamic tool sending messages to several sub-agents in parallel.
+        """
+        from src.tools.send_message import SendMessages
+
+        # Create a dynamic input schema: a list of recipient/message pairs
+        DynamicMessage = create_model(
+            f"{agent.name}Message",
+            recipient=(str, Field(..., description=self._recipients_description(agent))),
+            message=(str, Field(..., description="Message to send to sub-agent.")),
+        )
+        DynamicSendMessagesInput = create_model(
+            f"{agent.name}SendMessagesInput",
+            messages=(
+                List[DynamicMessage],
+                Field(..., description="Independent messages, sent to the sub-agents concurrently."),
+            ),
+        )
+
+        send_messages_tool = SendMessages(args_schema=DynamicSendMessagesInput)
+        send_messages_tool.agent_mapping = self.agent_mapping
+        return send_messages_tool
+
     def _add_send_message_tool(self):
         """
-        Adds the send message tool to agents with sub-agents.
+        Adds the send message tools to agents with sub-agents.
+
+        The tools are built, and bound to the agent's LLM model, when the agent
+        is first invoked rather than at start-up.
         """
         for agent in self.agents:
             if hasattr(agent, "sub_agents") and agent.sub_agents:
-                send_message_tool = self._create_dynamic_send_message_tool(agent)
-                agent.tools.append(send_message_tool)
-
-                # Bind the new tool to the agent's LLM model
-                agent.initiat_agent()
+                agent.add_tool_factory(
+                    lambda agent=agent: self._create_dynamic_send_message_tool(agent)
+                )
+                agent.add_tool_factory(
+                    lambda agent=agent: self._create_dynamic_send_messages_tool(agent)
+                )
 
     def get_agent(self, name: str) -> "Agent":
         """
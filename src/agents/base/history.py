@@ -0,0 +1,118 @@
+import threading
+from collections import deque
+from typing import Callable, Deque, List, Optional, Sequence
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.prebuilt.chat_agent_executor import AgentState
+from src.config import HISTORY_KEEP_TOKENS, HISTORY_SUMMARY_MODEL, HISTORY_TOKEN_BUDGET
+from src.utils import get_llm_by_provider
+
+
+class BudgetedAgentState(AgentState):
+    """Agent state with a rolling summary of the older conversation.
+
+    Both keys are saved by the checkpointer, so the summary is only
+    recomputed when more history has to be folded into it.
+    """
+    summary: str  # Summary of every message up to and including ``summary_until``
+    summary_until: str  # ID of the last message covered by ``summary``
+
+
+def summarise_history(summary: str, messages: Sequence[BaseMessage]) -> str:
+    """Extend ``summary`` with ``messages`` using a small model."""
+    transcript = "\n".join(
+        f"{m.type}: {m.content}" for m in messages if isinstance(m.content, str) and m.content
+    )
+    llm = get_llm_by_provider(HISTORY_SUMMARY_MODEL, temperature=0.1)
+    response = llm.invoke([
+        SystemMessage(content=(
+            "You maintain a running summary of a conversation between a user and "
+            "their personal assistant. Update the summary with the new messages. "
+            "Keep facts, decisions, names, dates and open tasks; drop small talk."
+        )),
+        HumanMessage(content=f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"),
+    ])
+    return response.content.strip()
+
+
+class HistoryBudget:
+    """Pre-model hook keeping the prompt within a token budget.
+
+    Messages already covered by the rolling summary are replaced by it.
+    When the rest still exceeds ``budget`` tokens, older turns are folded
+    into the summary until only about ``keep_tokens`` of recent turns are
+    left verbatim. Turns are cut at human messages so that tool calls and
+    their results stay together. The state in the checkpointer keeps the
+    full history; only the model input is shortened.
+
+    ``last_prompt_tokens`` and ``prompt_tokens`` record the approximate size
+    of each prompt sent to the model, the latter for the last ``RECORDED``
+    prompts only.
+    """
+
+    RECORDED = 100
+
+    def __init__(
+        self,
+        name: str,
+        system_prompt: str = "",
+        budget: int = HISTORY_TOKEN_BUDGET,
+        keep_tokens: int = HISTORY_KEEP_TOKENS,
+        summarise: Callable[[str, Sequence[BaseMessage]], str] = summarise_history,
+        count_tokens: Callable[[Sequence[BaseMessage]], int] = count_tokens_approximately,
+    ):
+        self.name = name
+        self.budget = budget
+        self.keep_tokens = min(keep_tokens, budget)
+        self.summarise = summarise
+        self.count_tokens = count_tokens
+        self.system_tokens = count_tokens([SystemMessage(content=system_prompt)]) if system_prompt else 0
+        self.last_prompt_tokens = 0
+        self.prompt_tokens: Deque[int] = deque(maxlen=self.RECORDED)
+        self._lock = threading.Lock()
+
+    def _summary_message(self, summary: str) -> List[BaseMessage]:
+        if not summary:
+            return []
+        return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")]
+
+    def _cut(self, messages: Sequence[BaseMessage]) -> Optional[int]:
+        """Index of the first message to keep verbatim, at a human message."""
+        kept = 0
+        cut = None
+        for i in range(len(messages) - 1, 0, -1):
+            kept += self.count_tokens([messages[i]])
+            if messages[i].type == "human":
+                if kept > self.keep_tokens and cut is not None:
+                    break
+                cut = i
+        return cut
+
+    def __call__(self, state) -> dict:
+        messages = state["messages"]
+        summary = state.get("summary", "")
+        start = 0
+        if state.get("summary_until"):
+            ids = [m.id for m in messages]
+            if state["summary_until"] in ids:
+                start = ids.index(state["summary_until"]) + 1
+            else:
+                summary = ""  # history was rewritten, e.g. by src.checkpoints
+        recent = list(messages[start:])
+        update = {}
+
+        tokens = self.count_tokens(self._summary_message(summary) + recent)
+        if tokens + self.system_tokens > self.budget:
+            cut = self._cut(recent)
+            if cut:
+                summary = self.summarise(summary, recent[:cut])
+                update = {"summary": summary, "summary_until": recent[cut - 1].id}
+                recent = recent[cut:]
+
+        llm_input = self._summary_message(summary) + recent
+        prompt_tokens = self.count_tokens(llm_input) + self.system_tokens
+        with self._lock:
+            self.last_prompt_tokens = prompt_tokens
+            self.prompt_tokens.append(prompt_tokens)
+        print(f"--- {self.name} prompt: ~{prompt_tokens} tokens ({len(llm_input)} messages) ---")
+        return {**update, "llm_input_messages": llm_input}
@@ -1,17 +1,49 @@
-from langgraph.checkpoint.sqlite import SqliteSaver
+import time
+from functools import cached_property
 from src.agents.base import Agent, AgentsOrchestrator
+from src.config import (
+    CHECKPOINT_KEEP_LAST,
+    CHECKPOINT_SUMMARISE_AFTER,
+    HISTORY_TOKEN_BUDGET,
+    INTENT_ROUTER,
+    RESPONSE_CACHE_TTL,
+)
 from src.prompts import *
-from src.tools.calendar import *
-from src.tools.email import *
-from src.tools.notion import *
-from src.tools.slack import *
-from src.tools.research import *
 from src.utils import get_current_date_time
 
+# Tools are referenced by import path so that their dependencies (selenium,
+# tavily, notion_client, slack_sdk, ...) are only loaded when the agent
+# using them is first called.
+EMAIL_TOOLS = [
+    "src.tools.email:read_emails",
+    "src.tools.email:send_email",
+    "src.tools.email:find_contact_email",
+]
+CALENDAR_TOOLS = [
+    "src.tools.calendar:get_calendar_events",
+    "src.tools.calendar:add_event_to_calendar",
+    "src.tools.calendar:check_availability",
+    "src.tools.calendar:get_next_events",
+    "src.tools.email:find_contact_email",
+]
+NOTION_TOOLS = [
+    "src.tools.notion:get_my_todo_list",
+    "src.tools.notion:add_task_in_todo_list",
+]
+SLACK_TOOLS = [
+    "src.tools.slack:get_slack_messages",
+    "src.tools.slack:search_slack_messages",
+    "src.tools.slack:send_slack_message",
+]
+RESEARCHER_TOOLS = [
+    "src.tools.research:search_web",
+    "src.tools.research:scrape_website_to_markdown",
+    "src.tools.research:search_linkedin_tool",
+]
+
 class PersonalAssistant:
     def __init__(self, db_connection):
-        # Create sqlite checkpointer for managing manager memory
-        self.checkpointer = SqliteSaver(db_connection)
+        self.db_connection = db_connection
         
         # Initialize individual agents
         self.email_agent = Agent(
@@ -19,7 +51,7 @@ class PersonalAssistant:
             description="Email agent can manage GMAIL inbox including read and send emails",
             model="openai/gpt-4o-mini",
             system_prompt=EMAIL_AGENT_PROMPT.format(date_time=get_current_date_time()),
-            tools=[read_emails, send_email, find_contact_email],
+            tools=list(EMAIL_TOOLS),
             sub_agents=[],
             temperature=0.1
         )
@@ -29,7 +61,7 @@ class PersonalAssistant:
             description="Calendar agent can manage Google Calendar including get events and create events",
             model="openai/gpt-4o-mini",
             system_prompt=CALENDAR_AGENT_PROMPT.format(date_time=get_current_date_time()),
-            tools=[get_calendar_events, add_event_to_calendar, find_contact_email],
+            tools=list(CALENDAR_TOOLS),
             sub_agents=[],
             temperature=0.1
         )
@@ -39,7 +71,7 @@ class PersonalAssistant:
             description="Notion agent can manage Notion including get my todo list and add task in todo list",
             model="openai/gpt-4o-mini",
             system_prompt=NOTION_AGENT_PROMPT.format(date_time=get_current_date_time()),
-            tools=[get_my_todo_list, add_task_in_todo_list],
+            tools=list(NOTION_TOOLS),
             sub_agents=[],
             temperature=0.1
         )
@@ -49,7 +81,7 @@ class PersonalAssistant:
             description="Slack agent can read and send messages through Slack",
             model="openai/gpt-4o-mini",
             system_prompt=SLACK_AGENT_PROMPT.format(date_time=get_current_date_time()),
-            tools=[get_slack_messages, send_slack_message],
+            tools=list(SLACK_TOOLS),
             sub_agents=[],
             temperature=0.1
         )
@@ -59,7 +91,7 @@ class PersonalAssistant:
             description="Researcher agent can search the web, scrape websites or LinkedIn profiles",
             model="openai/gpt-4o-mini",
             system_prompt=RESEARCHER_AGENT_PROMPT.format(date_time=get_current_date_time()),
-            tools=[search_web, scrape_website_to_markdown, search_linkedin_tool],
+            tools=list(RESEARCHER_TOOLS),
             sub_agents=[],
             temperature=0.1
         )
@@ -79,7 +111,8 @@ class PersonalAssistant:
                 self.researcher_agent
             ],
             temperature=0.1,
-            memory=self.checkpointer # only manager has memory feature
+            memory=lambda: self.checkpointer, # only manager has memory feature
+            history_budget=HISTORY_TOKEN_BUDGET
         )
 
         # Initialize the orchestrator
@@ -92,7 +125,84 @@ class PersonalAssistant:
                 self.notion_agent,
                 self.slack_agent,
                 self.researcher_agent
-            ]
+            ],
+            # Repeated read-only questions are answered without calling the agents
+            response_cache=(lambda: self.response_cache) if RESPONSE_CACHE_TTL > 0 else None
+        )
+
+        # Simple requests ("events tomorrow") call the tool directly
+        self.router = None
+        if INTENT_ROUTER:
+            from src.router import IntentRouter
+
+            self.router = IntentRouter()
+
+    def invoke(self, message, **kwargs):
+        """Answer ``message``, through the router when it can."""
+        answer = self._route(message, **kwargs)
+        if answer is not None:
+            return answer
+        started = time.perf_counter()
+        answer = self.assistant_orchestrator.invoke(message, **kwargs)
+        self._record_fallback(started)
+        return answer
+
+    def stream_reply(self, message, **kwargs):
+        """Stream the reply to ``message``; routed answers come in one piece."""
+        answer = self._route(message, **kwargs)
+        if answer is not None:
+            yield answer
+            return
+        started = time.perf_counter()
+        yield from self.assistant_orchestrator.stream_reply(message, **kwargs)
+        self._record_fallback(started)
+
+    def _route(self, message, **kwargs):
+        if self.router is None:
+            return None
+        answer = self.router.route(message)
+        if answer is not None:
+            self.assistant_orchestrator.remember(message, answer, **kwargs)
+        return answer
+
+    def _record_fallback(self, started):
+        if self.router is not None:
+            self.router.record_fallback(time.perf_counter() - started)
+
+    @cached_property
+    def response_cache(self):
+        """Cache of recent answers, opened on first use."""
+        from src.response_cache import get_response_cache
+
+        return get_response_cache()
+
+    @cached_property
+    def checkpointer(self):
+        """Sqlite checkpointer for managing manager memory, created on first use."""
+        from langgraph.checkpoint.sqlite import SqliteSaver
+
+        return SqliteSaver(self.db_connection)
+
+    def maintain_memory(
+        self,
+        keep_last=CHECKPOINT_KEEP_LAST,
+        summarise_after=CHECKPOINT_SUMMARISE_AFTER,
+    ):
+        """Prune, optionally summarise, and compact the manager's checkpoints.
+
+        See ``src.checkpoints.run_maintenance``; returns its report.
+        """
+        from src import checkpoints
+
+        graph = None
+        if summarise_after > 0:
+            self.manager_agent._ensure_agent()
+            graph = self.manager_agent.agent
+        return checkpoints.run_maintenance(
+            self.checkpointer,
+            keep_last=keep_last,
+            graph=graph,
+            summarise_after=summarise_after,
         )
 
     def __getattr__(self, name):
@@ -1,73 +1,207 @@
 import asyncio
-import time
-from apscheduler.schedulers.background import BackgroundScheduler
-from googleapiclient.discovery import build
-
-from .db import get_db
-from .channels.telegram import TelegramChannel
-from .email_utils import classify_importance
-from .tools.email import fetch_new_messages
-from .utils import get_credentials
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from telegram.error import TelegramError
+
+from .config import (
+    GMAIL_BATCH_SIZE,
+    GMAIL_PUBSUB_TOPIC,
+    IO_WORKERS,
+    POLL_MAX_INTERVAL,
+    POLL_MIN_INTERVAL,
+    PUSH_FALLBACK_INTERVAL,
+)
+from .db import DigestStore, SummaryCache, get_db, get_message_cache
+from .channels.telegram import CATCHUP_REQUEST_KEY, TelegramChannel
+from .email_utils import FULL_PAYLOAD_KINDS, METADATA_HEADERS, classify_importance
+from .notifications import AdaptiveBackoff, get_notification_source, start_watch
+from .tools.email import IncompleteFetchError, fetch_new_messages, get_messages
+from .google_services import get_service
 from . import digest
 
-# Globals initialised in ``main``
-gmail_service = None
+# Initialised in ``main``
+notification_source = None
 db = get_db()
-scheduler = BackgroundScheduler()
+message_cache = get_message_cache()
+digest_store = DigestStore()
+summary_cache = SummaryCache()
+scheduler = AsyncIOScheduler()
+# Strong references to fire-and-forget tasks so they are not collected early
+background_tasks: set = set()
+_digest_lock: Optional[asyncio.Lock] = None
 
 
 async def poll_gmail():
-    """Continuously poll Gmail for new messages."""
+    """Continuously poll Gmail for new messages.
+
+    VIP messages are pushed to Telegram right away; everything else is
+    added to :data:`digest_store` so digests never re-list the mailbox.
+
+    With a :data:`notification_source` the loop wakes up as soon as Gmail
+    reports a change and only polls every ``PUSH_FALLBACK_INTERVAL`` seconds
+    as a safety net. Without one, the polling interval backs off from
+    ``POLL_MIN_INTERVAL`` to ``POLL_MAX_INTERVAL`` while the mailbox is idle.
+    """
+    if notification_source is not None:
+        backoff = AdaptiveBackoff(PUSH_FALLBACK_INTERVAL, PUSH_FALLBACK_INTERVAL)
+    else:
+        backoff = AdaptiveBackoff(POLL_MIN_INTERVAL, POLL_MAX_INTERVAL)
     try:
         while True:
-            last = db.get("last_history_id")
-            msgs = fetch_new_messages(gmail_service, last)
-            for m in msgs:
-                kind = classify_importance(m)
+            last = await asyncio.to_thread(db.get, "last_history_id")
+            msgs, kinds, full, cursor = await asyncio.to_thread(_fetch_and_classify, last)
+            for m, kind in zip(msgs, kinds):
                 if kind == "vip":
-                    TelegramChannel.push_email(m, kind)
-            if msgs:
-                db.set("last_history_id", msgs[-1]["historyId"])
-            await asyncio.sleep(60)
+                    await TelegramChannel.apush_email(full.get(m["id"], m), kind)
+            await asyncio.to_thread(_record, msgs, kinds, full, cursor)
+            delay = backoff.next(bool(msgs))
+            if notification_source is not None:
+                await notification_source.wait(delay)
+            else:
+                await asyncio.sleep(delay)
     except asyncio.CancelledError:
         pass
 
 
-async def handle_commands():
-    """Handle Telegram commands like ``/catchup``."""
-    last_ts = int(time.time())
+def _fetch_and_classify(last: str):
+    """Fetch and classify messages after ``last``; runs in a worker thread.
+
+    Returns the metadata messages, their kinds, the full payloads of
+    those that need one, keyed by message ID, and the history ID to resume
+    from when some messages could not be fetched (``None`` otherwise).
+    """
+    # Google API clients are per thread, see ``get_service``
+    gmail_service = get_service("gmail", "v1")
+    cursor = None
+    try:
+        msgs = fetch_new_messages(
+            gmail_service,
+            last,
+            batch_size=GMAIL_BATCH_SIZE,
+            format="metadata",
+            metadata_headers=METADATA_HEADERS,
+            cache=message_cache,
+            # Label, read and archive changes must not list a message again
+            history_types=["messageAdded"],
+        )
+    except IncompleteFetchError as e:
+        print(f"{e}; retrying them on the next poll")
+        msgs, cursor = e.messages, e.history_id
+    kinds = [classify_importance(m) for m in msgs]
+    full_ids = [m["id"] for m, kind in zip(msgs, kinds) if kind in FULL_PAYLOAD_KINDS]
+    full = {}
+    if full_ids:
+        full = {
+            m["id"]: m
+            for m in get_messages(
+                gmail_service,
+                full_ids,
+                batch_size=GMAIL_BATCH_SIZE,
+                cache=message_cache,
+            )
+        }
+    return msgs, kinds, full, cursor
+
+
+def _record(msgs, kinds, full, cursor: Optional[str] = None) -> None:
+    """Feed the digest store and advance the history cursor.
+
+    ``cursor``, when given, is where the next poll must resume so that
+    messages which failed to fetch are not skipped.
+    """
+    for m, kind in zip(msgs, kinds):
+        digest_store.add(full.get(m["id"], m), kind)
+    if cursor is not None:
+        db.set("last_history_id", cursor)
+    elif msgs:
+        db.set("last_history_id", msgs[-1]["historyId"])
+
+
+async def handle_commands(interval: float = 5.0):
+    """Start a digest whenever ``/catchup`` is requested.
+
+    Telegram allows a single consumer of a bot's updates, the long poll in
+    ``app.py``, which records the request under ``CATCHUP_REQUEST_KEY``.
+    This checks the key every ``interval`` seconds.
+    """
+    handled = await asyncio.to_thread(db.get, CATCHUP_REQUEST_KEY)
     try:
         while True:
-            msgs = TelegramChannel().receive_messages(last_ts)
-            for msg in msgs:
-                if msg.get("text") == "/catchup":
-                    run_digest()
-            last_ts = int(time.time())
-            await asyncio.sleep(5)
+            await asyncio.sleep(interval)
+            requested = await asyncio.to_thread(db.get, CATCHUP_REQUEST_KEY)
+            if requested and requested != handled:
+                handled = requested
+                start_digest()
     except asyncio.CancelledError:
         pass
 
 
-def run_digest() -> None:
-    """Collect messages since the last digest and send a summary."""
-    now = int(time.time())
-    last = int(db.get("last_digest_ts", "0"))
-    digest.gmail_service = gmail_service
-    buckets = digest.collect_digest(last, now)
-    message = digest.format_digest(buckets)
-    TelegramChannel().send_message(message)
-    db.set("last_digest_ts", str(now))
-
-
-def main() -> None:
-    """Entry point for the polling service."""
-    global gmail_service
-    creds = get_credentials()
-    gmail_service = build("gmail", "v1", credentials=creds)
+def start_digest() -> asyncio.Task:
+    """Run :func:`run_digest` as a background task on the running loop."""
+    task = asyncio.get_running_loop().create_task(run_digest())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+
+async def run_digest() -> None:
+    """Send a summary of the messages accumulated since the last digest.
+
+    Building the digest runs in a worker thread, so polling and command
+    handling carry on meanwhile. Concurrent runs (e.g. ``/catchup`` during
+    a scheduled digest) are serialised. The entries are only pruned once
+    the digest is delivered; after a failed send they go into the next one.
+    """
+    global _digest_lock
+    if _digest_lock is None:
+        _digest_lock = asyncio.Lock()
+    async with _digest_lock:
+        message, sent_ids = await asyncio.to_thread(_build_digest)
+        if not message:
+            return
+        try:
+            await TelegramChannel().asend_long_message(message)
+        except TelegramError as e:
+            print(f"Failed to send digest: {e}; keeping it for the next one")
+            return
+        await asyncio.to_thread(digest_store.prune, sent_ids)
+
+
+def _build_digest() -> Tuple[str, List[str]]:
+    """Format the unsent digest entries; returns the text and their IDs.
+
+    Only these IDs are pruned once the digest is sent, so entries added
+    meanwhile wait for the next digest.
+    """
+    buckets = digest_store.buckets()
+    sent_ids = [m["id"] for msgs in buckets.values() for m in msgs]
+    return digest.format_digest(buckets), sent_ids
+
+
+def renew_watch() -> None:
+    """(Re)register the Gmail push notification watch."""
+    start_watch(get_service("gmail", "v1"), GMAIL_PUBSUB_TOPIC)
+
+
+async def serve() -> None:
+    """Run the Gmail poller, the command handler and the digest schedule.
+
+    Blocking Gmail and SQLite calls go to a bounded thread pool of
+    ``IO_WORKERS`` threads so no stage can stall the event loop.
+    """
+    global _digest_lock
+    _digest_lock = asyncio.Lock()
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+    )
 
-    loop = asyncio.get_event_loop()
-    poll_task = loop.create_task(poll_gmail())
-    cmd_task = loop.create_task(handle_commands())
+    if notification_source is not None and GMAIL_PUBSUB_TOPIC:
+        await asyncio.to_thread(renew_watch)
+        # Watches expire after seven days; renew well before that.
+        scheduler.add_job(renew_watch, id="gmail_watch", trigger="interval", days=1)
 
     scheduler.add_job(
         run_digest,
@@ -85,20 +219,27 @@ def main() -> None:
         minute=0,
         timezone="America/New_York",
     )
-
     scheduler.start()
 
     try:
-        loop.run_until_complete(asyncio.gather(poll_task, cmd_task))
+        await asyncio.gather(poll_gmail(), handle_commands())
+    finally:
+        scheduler.shutdown(wait=False)
+
+
+def main() -> None:
+    """Entry point for the polling service."""
+    global notification_source
+    digest.summary_cache = summary_cache
+    notification_source = get_notification_source()
+
+    try:
+        asyncio.run(serve())
     except KeyboardInterrupt:
-        poll_task.cancel()
-        cmd_task.cancel()
-        loop.run_until_complete(
-            asyncio.gather(poll_task, cmd_task, return_exceptions=True)
-        )
+        pass
     finally:
-        scheduler.shutdown()
-        loop.close()
+        if notification_source is not None:
+            notification_source.close()
         db.close()
 
 
@@ -0,0 +1,63 @@
+"""Helpers for streaming agent replies to chat channels."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncIterator, Iterable, List, TypeVar
+
+T = TypeVar("T")
+
+# Shown straight away while the assistant works on a reply
+PLACEHOLDER = "Thinking…"
+# Replaces the placeholder when the reply fails
+ERROR_TEXT = "Sorry, something went wrong while answering. Please try again."
+
+
+async def iterate_in_thread(iterable: Iterable[T]) -> AsyncIterator[T]:
+    """Consume a blocking iterator in a worker thread.
+
+    Items are handed to the event loop as soon as they are produced, so a
+    synchronous ``stream()`` can drive asynchronous channel updates.
+    Exceptions raised by the iterator are re-raised to the consumer.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+        except BaseException as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (done, e))
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, (done, None))
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item, error = await queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                break
+            yield item
+    finally:
+        await producer
+
+
+def split_message(text: str, limit: int) -> List[str]:
+    """Split ``text`` into chunks of at most ``limit`` characters.
+
+    Splits on the last newline before the limit where possible so that
+    paragraphs stay intact.
+    """
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    chunks.append(text)
+    return chunks
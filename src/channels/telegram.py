@@ -1,91 +1,307 @@
 import os
+import time
 import asyncio
 import base64
 import sqlite3
 from email.mime.text import MIMEText
 
-from googleapiclient.discovery import build
 from telegram import Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.constants import ParseMode
-from telegram.error import TelegramError
+from telegram.constants import MessageLimit, ParseMode
+from telegram.error import BadRequest, RetryAfter, TelegramError
 
 from .. import config
-from ..utils import get_credentials
-from ..tools import email as email_utils
+from .streaming import ERROR_TEXT, PLACEHOLDER, iterate_in_thread, split_message
+from ..db import get_db, get_message_cache
+from ..gmail_message import parse_message
+from ..google_services import get_service
+from ..response_cache import invalidates_responses
+
+# KV key holding the ID of the next Telegram update to fetch
+UPDATE_OFFSET_KEY = "telegram_update_offset"
+# Set by the Telegram consumer when /catchup is received; the Gmail service
+# starts a digest when it changes
+CATCHUP_REQUEST_KEY = "catchup_requested"
+# Update types requested from Telegram. Button presses (callback queries)
+# are left out: nothing handles them, and fetching them would confirm and
+# drop them.
+ALLOWED_UPDATES = ("message",)
 
 
 class TelegramChannel:
-    def __init__(self):
+    """Telegram bot channel.
+
+    The ``a``-prefixed coroutines are meant for code already running on an
+    event loop; the plain methods are blocking wrappers for synchronous
+    callers such as agent tools.
+    """
+
+    def __init__(self, store=None):
         self.token = os.getenv("TELEGRAM_TOKEN")
         self.chat_id = os.getenv("CHAT_ID")
+        self.allowed_chats = {
+            chat.strip()
+            for chat in [self.chat_id or "", *config.TELEGRAM_ALLOWED_CHATS.split(",")]
+            if chat.strip()
+        }
         self.bot = Bot(token=self.token)
+        self._loop = None
+        self._store = store
+        self._offset = None
+
+    @property
+    def store(self):
+        """KV store holding the update offset, ``get_db()`` by default."""
+        if self._store is None:
+            self._store = get_db()
+        return self._store
+
+    def _run(self, coro):
+        # A private loop keeps the blocking wrappers usable from any thread,
+        # including worker threads of a running asyncio application.
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
+
+    def is_allowed(self, chat_id):
+        """Return whether the bot may answer ``chat_id``.
+
+        Only the owner's ``CHAT_ID`` and the chats in
+        ``TELEGRAM_ALLOWED_CHATS`` are answered, since replies can contain
+        the owner's emails, calendar and tasks.
+        """
+        return str(chat_id) in self.allowed_chats
 
-    def send_message(self, text):
+    async def asend_message(self, text, chat_id=None):
         try:
-            loop = asyncio.get_event_loop()
-            loop.run_until_complete(
-                self.bot.send_message(chat_id=self.chat_id, text=text, parse_mode=ParseMode.MARKDOWN)
+            await self.bot.send_message(
+                chat_id=chat_id or self.chat_id, text=text, parse_mode=ParseMode.MARKDOWN
             )
             return "Message sent successfully on Telegram"
         except TelegramError as e:
             return f"Failed to send message: {str(e)}"
 
+    def send_message(self, text, chat_id=None):
+        return self._run(self.asend_message(text, chat_id))
+
+    async def asend_long_message(self, text, chat_id=None):
+        """Send ``text`` as Markdown, split across messages if too long.
+
+        A part whose Markdown Telegram rejects is sent as plain text.
+        Unlike :meth:`asend_message`, raises ``TelegramError`` when a part
+        cannot be sent, so callers know the text was not delivered.
+        """
+        chat_id = chat_id or self.chat_id
+        for chunk in split_message(text, MessageLimit.MAX_TEXT_LENGTH):
+            try:
+                await self.bot.send_message(
+                    chat_id=chat_id, text=chunk, parse_mode=ParseMode.MARKDOWN
+                )
+            except BadRequest:
+                await self.bot.send_message(chat_id=chat_id, text=chunk)
+
+    async def asend_streaming(
+        self, snapshots, min_interval=config.STREAM_EDIT_INTERVAL, chat_id=None
+    ):
+        """Send a reply that is still being generated.
+
+        A placeholder is sent at once and then edited with the latest text
+        snapshot, at most once every ``min_interval`` seconds to respect
+        Telegram's edit rate limits. The last snapshot is the final reply;
+        it is rendered as Markdown and split across messages if too long.
+        If ``snapshots`` raises, the placeholder is replaced by an error
+        notice and the exception is re-raised.
+
+        Parameters
+        ----------
+        snapshots : async iterable of str
+            Successive versions of the reply text, e.g. from
+            ``AgentsOrchestrator.stream_reply``.
+        min_interval : float, optional
+            Minimum number of seconds between two edits.
+        chat_id : int or str, optional
+            Chat to reply in, the configured ``CHAT_ID`` by default.
+
+        Returns
+        -------
+        str
+            The final reply text.
+        """
+        loop = asyncio.get_running_loop()
+        limit = MessageLimit.MAX_TEXT_LENGTH
+        chat_id = chat_id or self.chat_id
+        message = await self.bot.send_message(chat_id=chat_id, text=PLACEHOLDER)
+        shown, latest, pending = PLACEHOLDER, None, False
+        next_edit = loop.time() + min_interval
+
+        iterator = snapshots.__aiter__()
+        next_item = asyncio.ensure_future(iterator.__anext__())
+        try:
+            while True:
+                timeout = max(0.0, next_edit - loop.time()) if pending else None
+                done, _ = await asyncio.wait({next_item}, timeout=timeout)
+                if next_item in done:
+                    try:
+                        latest = next_item.result()
+                    except StopAsyncIteration:
+                        break
+                    pending = True
+                    next_item = asyncio.ensure_future(iterator.__anext__())
+                    if loop.time() < next_edit:
+                        continue
+                text = latest[:limit]
+                pending = False
+                if not text.strip() or text == shown:
+                    continue
+                try:
+                    await message.edit_text(text)
+                    shown = text
+                except RetryAfter as e:
+                    next_edit = loop.time() + float(e.retry_after)
+                    pending = True
+                    continue
+                except TelegramError:
+                    pass
+                next_edit = loop.time() + min_interval
+        except Exception:
+            try:
+                await message.edit_text(ERROR_TEXT)
+            except TelegramError:
+                pass
+            raise
+        finally:
+            next_item.cancel()
+
+        final = latest if latest and latest.strip() else "Sorry, I have no answer."
+        first, *rest = split_message(final, limit)
+        try:
+            await message.edit_text(first, parse_mode=ParseMode.MARKDOWN)
+        except BadRequest:
+            # Unbalanced Markdown, or the text is already shown as is.
+            if first != shown:
+                await message.edit_text(first)
+        for chunk in rest:
+            await self.asend_message(chunk, chat_id)
+        return final
+
+    def send_streaming(
+        self, snapshots, min_interval=config.STREAM_EDIT_INTERVAL, chat_id=None
+    ):
+        """Blocking variant of :meth:`asend_streaming` for a plain iterator."""
+        return self._run(
+            self.asend_streaming(iterate_in_thread(snapshots), min_interval, chat_id)
+        )
+
+    async def apoll_messages(self, timeout=config.TELEGRAM_POLL_TIMEOUT):
+        """Long-poll Telegram for new messages.
+
+        Waits up to ``timeout`` seconds for updates newer than the last one
+        received. The next update ID is kept in memory; the following poll
+        sends it, which confirms the batch to Telegram. Callers hand the
+        messages off, then call :meth:`commit_offset` before polling again,
+        so a crash in between delivers the batch again after a restart
+        (at-least-once) instead of losing it. An idle poll is a single open
+        request instead of repeated downloads of the backlog.
+
+        Raises ``TelegramError`` on network or API errors.
+        """
+        if self._offset is None:
+            self._offset = int(self.store.get(UPDATE_OFFSET_KEY, "0") or 0)
+        # Telegram remembers allowed_updates for later calls too
+        updates = await self.bot.get_updates(
+            offset=self._offset or None,
+            timeout=timeout,
+            allowed_updates=list(ALLOWED_UPDATES),
+        )
+        if updates:
+            self._offset = updates[-1].update_id + 1
+        return self._new_messages(updates)
+
+    def handle_command(self, message):
+        """Handle a bot command sent in ``message``.
+
+        The Gmail service (``src.app``) does not read Telegram itself, as
+        only one process may poll a bot's updates, so ``/catchup`` is
+        recorded in :attr:`store` for it. Returns whether ``message`` was a
+        command.
+        """
+        if (message.get("text") or "").strip() != "/catchup":
+            return False
+        self.store.set(CATCHUP_REQUEST_KEY, str(time.time()))
+        return True
+
+    def commit_offset(self):
+        """Persist the offset past the last polled batch in :attr:`store`."""
+        if self._offset and str(self._offset) != self.store.get(UPDATE_OFFSET_KEY):
+            self.store.set(UPDATE_OFFSET_KEY, str(self._offset))
+
+    def poll_messages(self, timeout=config.TELEGRAM_POLL_TIMEOUT):
+        """Blocking variant of :meth:`apoll_messages`."""
+        return self._run(self.apoll_messages(timeout))
+
     def receive_messages(self, after_timestamp):
         try:
-            loop = asyncio.get_event_loop()
-            updates = loop.run_until_complete(self.bot.get_updates())
-            new_messages = []
-            for update in updates:
-                if isinstance(update, Update) and update.message:
-                    message = update.message
-                    if message.date.timestamp() > after_timestamp:
-                        new_messages.append({
-                            "text": message.text,
-                            "date": message.date.strftime("%Y-%m-%d %H:%M"),
-                        })
-            return new_messages
+            updates = self._run(self.bot.get_updates())
         except TelegramError as e:
             return f"Failed to retrieve messages: {str(e)}"
+        return self._new_messages(updates, after_timestamp)
 
     @staticmethod
-    def push_email(msg, kind):
+    def _new_messages(updates, after_timestamp=None):
+        new_messages = []
+        for update in updates:
+            if isinstance(update, Update) and update.message:
+                message = update.message
+                if after_timestamp is None or message.date.timestamp() > after_timestamp:
+                    new_messages.append({
+                        "text": message.text,
+                        "date": message.date.strftime("%Y-%m-%d %H:%M"),
+                        "chat_id": message.chat_id,
+                    })
+        return new_messages
+
+    @staticmethod
+    async def apush_email(msg, kind):
         """Push a Gmail message to the configured Telegram user.
 
         Parameters
         ----------
-        msg : dict
+        msg : dict or ParsedMessage
             Message object returned by the Gmail API.
         kind : str
             Classification of the email (unused).
         """
 
-        headers = {
-            h.get("name"): h.get("value")
-            for h in msg.get("payload", {}).get("headers", [])
-            if isinstance(h, dict)
-        }
-        subject = headers.get("Subject", "(no subject)")
-        from_addr = headers.get("From", "(unknown)")
+        msg = parse_message(msg)
+        subject = msg.header("Subject", "(no subject)")
+        from_addr = msg.header("From", "(unknown)")
 
-        body = msg.get("snippet", "")[:200]
+        body = msg.snippet[:200]
         md = f"*{subject}* \u00b7 _{from_addr}_ \u00b7 {body}"
 
         buttons = [
-            [InlineKeyboardButton("Draft Reply", callback_data=f"draft:{msg.get('id')}")]
+            [InlineKeyboardButton("Draft Reply", callback_data=f"draft:{msg.id}")]
         ]
 
-        parts = msg.get("payload", {}).get("parts", [])
-        if any(p.get("mimeType") == "text/calendar" for p in parts):
+        if msg.has_part("text/calendar"):
             buttons.append([
-                InlineKeyboardButton("Yes", callback_data=f"rsvp:{msg.get('id')}:yes"),
-                InlineKeyboardButton("No", callback_data=f"rsvp:{msg.get('id')}:no"),
-                InlineKeyboardButton("Maybe", callback_data=f"rsvp:{msg.get('id')}:maybe"),
+                InlineKeyboardButton("Yes", callback_data=f"rsvp:{msg.id}:yes"),
+                InlineKeyboardButton("No", callback_data=f"rsvp:{msg.id}:no"),
+                InlineKeyboardButton("Maybe", callback_data=f"rsvp:{msg.id}:maybe"),
             ])
 
         ikb = InlineKeyboardMarkup(buttons)
         bot = Bot(token=os.getenv("TELEGRAM_TOKEN"))
-        bot.send_message(chat_id=config.USER_ID, text=md, reply_markup=ikb)
+        try:
+            await bot.send_message(chat_id=config.USER_ID, text=md, reply_markup=ikb)
+        except TelegramError as e:
+            print(f"Failed to push email {msg.id}: {str(e)}")
+        finally:
+            await bot.shutdown()
 
+    @staticmethod
+    def push_email(msg, kind):
+        """Blocking variant of :meth:`apush_email`."""
+        asyncio.run(TelegramChannel.apush_email(msg, kind))
 
 
 def handle_draft(update: Update, context) -> None:
@@ -94,14 +310,11 @@ def handle_draft(update: Update, context) -> None:
     update.callback_query.answer()
     msg_id = update.callback_query.data.split(":", 1)[1]
 
-    creds = get_credentials()
-    service = build("gmail", "v1", credentials=creds)
-    msg = (
-        service.users()
-        .messages()
-        .get(userId="me", id=msg_id, format="full")
-        .execute()
-    )
+    # The Gmail tools pull in langchain; load them only when a button is used.
+    from ..tools import email as email_utils
+
+    service = get_service("gmail", "v1")
+    [msg] = email_utils.get_messages(service, [msg_id], cache=get_message_cache())
     draft_text = email_utils.generate_reply(msg)
 
     orig_text = update.callback_query.message.text or ""
@@ -121,6 +334,7 @@ def handle_draft(update: Update, context) -> None:
     update.callback_query.message.edit_text(new_text, reply_markup=keyboard)
 
 
+@invalidates_responses
 def handle_send(update: Update, context) -> None:
     """Handle a "send" callback query from Telegram."""
 
@@ -135,23 +349,16 @@ def handle_send(update: Update, context) -> None:
     cur.close()
     draft_text = row[0] if row else ""
 
-    creds = get_credentials()
-    service = build("gmail", "v1", credentials=creds)
-    msg = (
-        service.users()
-        .messages()
-        .get(userId="me", id=msg_id, format="full")
-        .execute()
-    )
+    # The Gmail tools pull in langchain; load them only when a button is used.
+    from ..tools import email as email_utils
+
+    service = get_service("gmail", "v1")
+    [msg] = email_utils.get_messages(service, [msg_id], cache=get_message_cache())
 
-    headers = {
-        h.get("name"): h.get("value")
-        for h in msg.get("payload", {}).get("headers", [])
-        if isinstance(h, dict)
-    }
-    to_addr = headers.get("From", "")
-    subject = "Re: " + headers.get("Subject", "")
-    thread_id = msg.get("threadId")
+    msg = parse_message(msg)
+    to_addr = msg.header("From", "")
+    subject = "Re: " + msg.header("Subject", "")
+    thread_id = msg.thread_id
 
     mime = MIMEText(draft_text)
     mime["To"] = to_addr
@@ -183,6 +390,7 @@ def handle_discard(update: Update, context) -> None:
     update.callback_query.message.edit_text("Draft discarded.")
 
 
+@invalidates_responses
 def handle_rsvp(update: Update, context) -> None:
     """Handle an RSVP callback query from Telegram."""
 
@@ -199,13 +407,17 @@ def handle_rsvp(update: Update, context) -> None:
         "maybe": "tentative",
     }.get(response, "tentative")
 
-    creds = get_credentials()
-    service = build("calendar", "v3", credentials=creds)
-    service.events().patch(
-        calendarId="primary",
-        eventId=msg_id,
-        body={"responseStatus": status},
-    ).execute()
+    from ..tools.calendar.cache import get_calendar_cache
+
+    service = get_service("calendar", "v3")
+    try:
+        service.events().patch(
+            calendarId="primary",
+            eventId=msg_id,
+            body={"responseStatus": status},
+        ).execute()
+    finally:
+        get_calendar_cache().invalidate()
 
     update.callback_query.message.edit_text(
         f"Responded: {response.capitalize()}"
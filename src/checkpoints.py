@@ -0,0 +1,280 @@
+"""Retention and compaction for the LangGraph checkpoint database.
+
+The manager's ``SqliteSaver`` stores a full state snapshot for every step
+of every conversation. :func:`run_maintenance` keeps the most recent
+checkpoints per thread, drops writes belonging to pruned checkpoints,
+optionally folds old messages of long conversations into a summary, then
+checkpoints the WAL and vacuums the file. Run it from the scheduler in
+``app.py`` or by hand::
+
+    python -m src.checkpoints --db db/checkpoints.sqlite --keep 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .config import CHECKPOINT_KEEP_LAST, CHECKPOINT_KEEP_MESSAGES, CHECKPOINT_SUMMARISE_AFTER
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MODEL = "openai/gpt-4o-mini"
+
+
+def _db_path(conn: sqlite3.Connection) -> Optional[str]:
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return path or None
+    return None
+
+
+def _file_size(path: Optional[str]) -> int:
+    return os.path.getsize(path) if path and os.path.exists(path) else 0
+
+
+def thread_ids(conn: sqlite3.Connection) -> List[str]:
+    """Return the IDs of all threads with a top-level checkpoint."""
+    rows = conn.execute(
+        "SELECT DISTINCT thread_id FROM checkpoints WHERE checkpoint_ns = '' ORDER BY thread_id"
+    )
+    return [r[0] for r in rows]
+
+
+def checkpoint_stats(saver) -> Dict[str, Any]:
+    """Report the size of the checkpoint database and per-thread load times.
+
+    ``load_ms`` is how long loading a thread's latest checkpoint takes, the
+    cost paid at the start of every turn of that conversation.
+    """
+    saver.setup()
+    conn = saver.conn
+    with saver.lock:
+        path = _db_path(conn)
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        rows = conn.execute(
+            "SELECT thread_id, COUNT(*) FROM checkpoints GROUP BY thread_id"
+        ).fetchall()
+        writes = conn.execute("SELECT COUNT(*) FROM writes").fetchone()[0]
+    threads = {}
+    for thread_id, count in rows:
+        started = time.perf_counter()
+        saver.get_tuple({"configurable": {"thread_id": thread_id}})
+        threads[thread_id] = {
+            "checkpoints": count,
+            "load_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+    return {
+        "path": path,
+        "bytes": _file_size(path),
+        "wal_bytes": _file_size(f"{path}-wal" if path else None),
+        "free_bytes": free_pages * page_size,
+        "writes": writes,
+        "threads": threads,
+    }
+
+
+def prune_checkpoints(saver, keep_last: int = CHECKPOINT_KEEP_LAST) -> Dict[str, int]:
+    """Keep the ``keep_last`` newest checkpoints of each thread and namespace.
+
+    Checkpoint IDs are time ordered, so the newest ones sort last. Pending
+    writes of deleted checkpoints are removed as well. Returns the number of
+    deleted checkpoints and writes.
+    """
+    keep_last = max(1, keep_last)
+    saver.setup()
+    conn = saver.conn
+    with saver.lock:
+        try:
+            checkpoints = conn.execute(
+                """
+                DELETE FROM checkpoints WHERE rowid IN (
+                  SELECT rowid FROM (
+                    SELECT rowid, ROW_NUMBER() OVER (
+                      PARTITION BY thread_id, checkpoint_ns
+                      ORDER BY checkpoint_id DESC
+                    ) AS rn
+                    FROM checkpoints
+                  ) WHERE rn > ?
+                )
+                """,
+                (keep_last,),
+            ).rowcount
+            writes = conn.execute(
+                """
+                DELETE FROM writes WHERE NOT EXISTS (
+                  SELECT 1 FROM checkpoints c
+                  WHERE c.thread_id = writes.thread_id
+                    AND c.checkpoint_ns = writes.checkpoint_ns
+                    AND c.checkpoint_id = writes.checkpoint_id
+                )
+                """
+            ).rowcount
+            conn.commit()
+        except sqlite3.DatabaseError:
+            conn.rollback()
+            raise
+    return {"checkpoints": checkpoints, "writes": writes}
+
+
+def compact(saver) -> None:
+    """Reclaim free pages, then fold the WAL back into the database."""
+    conn = saver.conn
+    with saver.lock:
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def _summarise_messages(messages: Sequence) -> str:
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    from .utils import get_llm_by_provider
+
+    transcript = "\n".join(
+        f"{m.type}: {m.content}" for m in messages if isinstance(m.content, str) and m.content
+    )
+    llm = get_llm_by_provider(SUMMARY_MODEL, temperature=0.1)
+    response = llm.invoke([
+        SystemMessage(content=(
+            "Summarise this conversation between a user and their personal "
+            "assistant. Keep facts, decisions, names, dates and open tasks."
+        )),
+        HumanMessage(content=transcript),
+    ])
+    return response.content.strip()
+
+
+def summarise_thread(
+    graph,
+    thread_id: str,
+    max_messages: int = CHECKPOINT_SUMMARISE_AFTER,
+    keep_messages: int = CHECKPOINT_KEEP_MESSAGES,
+    summarise: Callable[[Sequence], str] = _summarise_messages,
+) -> bool:
+    """Replace the older messages of a long conversation by a summary.
+
+    When the thread holds more than ``max_messages`` messages, everything
+    but roughly the last ``keep_messages`` is summarised into one system
+    message. The cut is moved back to a human message so a tool call is
+    never separated from its result. Returns whether the thread changed.
+
+    This runs outside the conversation's dispatcher, so a turn may be
+    committed while the summary is written. The thread is left alone when
+    its last message changed meanwhile, and the update only replaces the
+    summarised messages by ID, never the messages after them.
+    """
+    from langchain_core.messages import RemoveMessage, SystemMessage
+
+    config = {"configurable": {"thread_id": thread_id}}
+    messages = graph.get_state(config).values.get("messages", [])
+    if max_messages <= 0 or len(messages) <= max_messages:
+        return False
+    cut = max(1, len(messages) - keep_messages)
+    while cut > 0 and messages[cut].type != "human":
+        cut -= 1
+    if cut == 0:
+        return False
+
+    summary = summarise(messages[:cut])
+    latest = graph.get_state(config).values.get("messages", [])
+    if not latest or latest[-1].id != messages[-1].id:
+        return False
+    graph.update_state(
+        config,
+        {"messages": [
+            # Same ID as the first message: replaces it in place
+            SystemMessage(
+                content=f"Summary of the earlier conversation:\n{summary}",
+                id=messages[0].id,
+            ),
+            *(RemoveMessage(id=m.id) for m in messages[1:cut]),
+        ]},
+        as_node="agent",
+    )
+    return True
+
+
+def run_maintenance(
+    saver,
+    keep_last: int = CHECKPOINT_KEEP_LAST,
+    graph=None,
+    summarise_after: int = CHECKPOINT_SUMMARISE_AFTER,
+    vacuum: bool = True,
+) -> Dict[str, Any]:
+    """Summarise long threads (if ``graph`` is given), prune, then compact.
+
+    Returns the database stats before and after along with what was
+    removed.
+    """
+    before = checkpoint_stats(saver)
+    summarised = []
+    if graph is not None and summarise_after > 0:
+        with saver.lock:
+            ids = thread_ids(saver.conn)
+        for thread_id in ids:
+            try:
+                if summarise_thread(graph, thread_id, max_messages=summarise_after):
+                    summarised.append(thread_id)
+            except Exception:
+                logger.exception("Failed to summarise thread %s", thread_id)
+    pruned = prune_checkpoints(saver, keep_last)
+    if vacuum:
+        compact(saver)
+    return {
+        "before": before,
+        "after": checkpoint_stats(saver),
+        "pruned": pruned,
+        "summarised": summarised,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render a :func:`run_maintenance` report."""
+    before, after = report["before"], report["after"]
+    lines = [
+        f"checkpoint db: {before['bytes'] + before['wal_bytes']} -> "
+        f"{after['bytes'] + after['wal_bytes']} bytes",
+        f"pruned {report['pruned']['checkpoints']} checkpoints, "
+        f"{report['pruned']['writes']} writes",
+    ]
+    if report["summarised"]:
+        lines.append(f"summarised threads: {', '.join(report['summarised'])}")
+    for thread_id, t in after["threads"].items():
+        lines.append(
+            f"  thread {thread_id}: {t['checkpoints']} checkpoints, load {t['load_ms']} ms"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: List[str] | None = None) -> None:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    parser = argparse.ArgumentParser(description="Prune and compact checkpoints.")
+    parser.add_argument("--db", default="db/checkpoints.sqlite")
+    parser.add_argument("--keep", type=int, default=CHECKPOINT_KEEP_LAST)
+    parser.add_argument("--stats-only", action="store_true")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db, check_same_thread=False)
+    saver = SqliteSaver(conn)
+    try:
+        if args.stats_only:
+            stats = checkpoint_stats(saver)
+            print(format_report({
+                "before": stats, "after": stats,
+                "pruned": {"checkpoints": 0, "writes": 0}, "summarised": [],
+            }))
+        else:
+            print(format_report(run_maintenance(saver, args.keep)))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
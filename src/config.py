@@ -4,3 +4,50 @@ import os
 
 USER_ID = os.getenv("CHAT_ID", "")
 APP_DB_BACKEND = os.getenv("APP_DB_BACKEND", "sqlite")
+GMAIL_BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "50"))
+GMAIL_BATCH_RETRIES = int(os.getenv("GMAIL_BATCH_RETRIES", "3"))
+GMAIL_CACHE_MAX_BYTES = int(os.getenv("GMAIL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+DIGEST_CONCURRENCY = int(os.getenv("DIGEST_CONCURRENCY", "4"))
+DIGEST_RATE_LIMIT = float(os.getenv("DIGEST_RATE_LIMIT", "5"))
+SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", str(30 * 24 * 3600)))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "2000"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "1500"))
+GMAIL_PUSH_SOURCE = os.getenv("GMAIL_PUSH_SOURCE", "")
+GMAIL_PUBSUB_TOPIC = os.getenv("GMAIL_PUBSUB_TOPIC", "")
+GMAIL_PUBSUB_SUBSCRIPTION = os.getenv("GMAIL_PUBSUB_SUBSCRIPTION", "")
+GMAIL_NOTIFY_DIR = os.getenv("GMAIL_NOTIFY_DIR", "data/gmail_notifications")
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "10"))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "60"))
+PUSH_FALLBACK_INTERVAL = float(os.getenv("PUSH_FALLBACK_INTERVAL", "300"))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "90"))
+SUBAGENT_TIMEOUT = float(os.getenv("SUBAGENT_TIMEOUT", "120"))
+SUBAGENT_CONCURRENCY = int(os.getenv("SUBAGENT_CONCURRENCY", "5"))
+STREAM_REPLIES = os.getenv("STREAM_REPLIES", "1") == "1"
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+CONVERSATION_WORKERS = int(os.getenv("CONVERSATION_WORKERS", "4"))
+CONVERSATION_QUEUE_SIZE = int(os.getenv("CONVERSATION_QUEUE_SIZE", "32"))
+TELEGRAM_POLL_TIMEOUT = int(os.getenv("TELEGRAM_POLL_TIMEOUT", "50"))
+# Chats besides CHAT_ID the bot answers, comma separated
+TELEGRAM_ALLOWED_CHATS = os.getenv("TELEGRAM_ALLOWED_CHATS", "")
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+CHECKPOINT_SUMMARISE_AFTER = int(os.getenv("CHECKPOINT_SUMMARISE_AFTER", "0"))
+CHECKPOINT_KEEP_MESSAGES = int(os.getenv("CHECKPOINT_KEEP_MESSAGES", "20"))
+CHECKPOINT_MAINTENANCE_HOURS = float(os.getenv("CHECKPOINT_MAINTENANCE_HOURS", "24"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "8000"))
+HISTORY_KEEP_TOKENS = int(os.getenv("HISTORY_KEEP_TOKENS", "4000"))
+HISTORY_SUMMARY_MODEL = os.getenv("HISTORY_SUMMARY_MODEL", "openai/gpt-4o-mini")
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "600"))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.9"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "500"))
+INTENT_ROUTER = os.getenv("INTENT_ROUTER", "1") == "1"
+SLACK_CONCURRENCY = int(os.getenv("SLACK_CONCURRENCY", "4"))
+SLACK_USER_CACHE_TTL = int(os.getenv("SLACK_USER_CACHE_TTL", "3600"))
+SLACK_LOOKBACK_HOURS = float(os.getenv("SLACK_LOOKBACK_HOURS", "24"))
+SLACK_INGEST_INTERVAL = float(os.getenv("SLACK_INGEST_INTERVAL", "300"))
+SLACK_USER_ID = os.getenv("SLACK_USER_ID", "")
+SLACK_QUIET_MAX_INTERVAL = float(os.getenv("SLACK_QUIET_MAX_INTERVAL", str(SLACK_INGEST_INTERVAL)))
+NOTION_SYNC_MAX_AGE = float(os.getenv("NOTION_SYNC_MAX_AGE", "60"))
+NOTION_FULL_SYNC_HOURS = float(os.getenv("NOTION_FULL_SYNC_HOURS", "24"))
+CALENDAR_SYNC_MAX_AGE = float(os.getenv("CALENDAR_SYNC_MAX_AGE", "60"))
@@ -1,11 +1,21 @@
 """Key-value store implementations for application state."""
 
+import json
 import os
+import re
 import sqlite3
+import threading
+import time
+import zlib
 from abc import ABC, abstractmethod
-from typing import Iterable, Optional
+from typing import Dict, Iterable, List, Optional
 
-from .config import APP_DB_BACKEND
+from .config import (
+    APP_DB_BACKEND,
+    GMAIL_CACHE_MAX_BYTES,
+    SUMMARY_CACHE_MAX_ENTRIES,
+    SUMMARY_CACHE_TTL,
+)
 
 
 class KVStore(ABC):
@@ -35,7 +45,9 @@ class SqliteKV(KVStore):
         db_path: str, optional
             Path to the SQLite database file. Defaults to ``"assistant.db"``.
         """
-        self.conn = sqlite3.connect(db_path)
+        # Shared with the worker threads of the asyncio runtime.
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
         self.conn.execute(
             """
             CREATE TABLE IF NOT EXISTS state(
@@ -74,43 +86,46 @@ class SqliteKV(KVStore):
 
     def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
         """Retrieve the value for ``key`` from the store."""
-        cur = self.conn.cursor()
-        cur.execute("SELECT value FROM state WHERE key=?", (key,))
-        row = cur.fetchone()
-        cur.close()
+        with self._lock:
+            cur = self.conn.cursor()
+            cur.execute("SELECT value FROM state WHERE key=?", (key,))
+            row = cur.fetchone()
+            cur.close()
         if row is None:
             return default
         return row[0]
 
     def set(self, key: str, value: str) -> None:
         """Store ``value`` for ``key`` in the database."""
-        cur = self.conn.cursor()
-        try:
-            cur.execute(
-                "REPLACE INTO state(key, value) VALUES(?, ?)",
-                (key, value),
-            )
-            self.conn.commit()
-        except sqlite3.DatabaseError:
-            self.conn.rollback()
-            raise
-        finally:
-            cur.close()
+        with self._lock:
+            cur = self.conn.cursor()
+            try:
+                cur.execute(
+                    "REPLACE INTO state(key, value) VALUES(?, ?)",
+                    (key, value),
+                )
+                self.conn.commit()
+            except sqlite3.DatabaseError:
+                self.conn.rollback()
+                raise
+            finally:
+                cur.close()
 
     def transaction(self, items: Iterable[tuple[str, str]]) -> None:
         """Insert multiple ``(key, value)`` pairs in a single transaction."""
-        cur = self.conn.cursor()
-        try:
-            cur.executemany(
-                "REPLACE INTO state(key, value) VALUES(?, ?)",
-                items,
-            )
-            self.conn.commit()
-        except sqlite3.DatabaseError:
-            self.conn.rollback()
-            raise
-        finally:
-            cur.close()
+        with self._lock:
+            cur = self.conn.cursor()
+            try:
+                cur.executemany(
+                    "REPLACE INTO state(key, value) VALUES(?, ?)",
+                    items,
+                )
+                self.conn.commit()
+            except sqlite3.DatabaseError:
+                self.conn.rollback()
+                raise
+            finally:
+                cur.close()
 
 
 class CloudflareD1KV(KVStore):
@@ -129,6 +144,760 @@ class CloudflareD1KV(KVStore):
         raise NotImplementedError
 
 
+class MessageCache:
+    """Persistent LRU cache of Gmail message resources.
+
+    Messages are stored zlib-compressed and tagged with the ``historyId``
+    they had when fetched, so callers that know a message changed later
+    (e.g. its labels) can ask for a newer copy. A ``"full"`` entry also
+    satisfies ``"metadata"`` lookups, but not the other way round.
+    """
+
+    def __init__(
+        self, db_path: str = "assistant.db", max_bytes: int = GMAIL_CACHE_MAX_BYTES
+    ) -> None:
+        """Create or connect to the cache database.
+
+        Parameters
+        ----------
+        db_path: str, optional
+            Path to the SQLite database file. Defaults to ``"assistant.db"``.
+        max_bytes: int, optional
+            Upper bound on the total compressed payload size; least recently
+            used entries are evicted beyond it.
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS gmail_messages(
+              id TEXT PRIMARY KEY,
+              history_id INTEGER,
+              format TEXT,
+              payload BLOB,
+              size INTEGER,
+              last_used INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS gmail_messages_lru
+              ON gmail_messages(last_used);
+            """
+        )
+        self.conn.commit()
+        row = self.conn.execute(
+            "SELECT MAX(last_used) FROM gmail_messages"
+        ).fetchone()
+        self._tick = row[0] or 0
+
+    def __enter__(self) -> "MessageCache":
+        """Enter the runtime context related to this object."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        """Close the connection when leaving the context."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        self.conn.close()
+
+    def get(
+        self,
+        msg_id: str,
+        format: str = "full",
+        min_history_id: Optional[int] = None,
+    ) -> Optional[dict]:
+        """Return the cached message ``msg_id`` or ``None`` on a miss.
+
+        Parameters
+        ----------
+        msg_id: str
+            Gmail message ID.
+        format: str, optional
+            Gmail ``format`` the caller needs.
+        min_history_id: int, optional
+            Treat entries fetched before this ``historyId`` as stale.
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT history_id, format, payload FROM gmail_messages WHERE id=?",
+                (msg_id,),
+            ).fetchone()
+            if (
+                row is None
+                or (format == "full" and row[1] != "full")
+                or (min_history_id is not None and row[0] < int(min_history_id))
+            ):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._tick += 1
+            self.conn.execute(
+                "UPDATE gmail_messages SET last_used=? WHERE id=?",
+                (self._tick, msg_id),
+            )
+            self.conn.commit()
+        return json.loads(zlib.decompress(row[2]))
+
+    def put(self, msg: dict, format: str = "full") -> None:
+        """Store ``msg`` fetched with the given Gmail ``format``.
+
+        A ``"metadata"`` copy never replaces a ``"full"`` entry of the same
+        or a newer ``historyId``.
+        """
+        msg_id = msg.get("id")
+        if not msg_id:
+            return
+        history_id = int(msg.get("historyId", 0))
+        payload = zlib.compress(json.dumps(msg).encode("utf-8"))
+        with self._lock:
+            if format != "full":
+                row = self.conn.execute(
+                    "SELECT history_id, format FROM gmail_messages WHERE id=?",
+                    (msg_id,),
+                ).fetchone()
+                if row is not None and row[1] == "full" and row[0] >= history_id:
+                    return
+            self._tick += 1
+            cur = self.conn.cursor()
+            try:
+                cur.execute(
+                    "REPLACE INTO gmail_messages"
+                    "(id, history_id, format, payload, size, last_used)"
+                    " VALUES(?, ?, ?, ?, ?, ?)",
+                    (msg_id, history_id, format, payload, len(payload), self._tick),
+                )
+                self._evict(cur)
+                self.conn.commit()
+            except sqlite3.DatabaseError:
+                self.conn.rollback()
+                raise
+            finally:
+                cur.close()
+
+    def invalidate(self, msg_id: str) -> None:
+        """Drop ``msg_id`` from the cache."""
+        with self._lock:
+            self.conn.execute("DELETE FROM gmail_messages WHERE id=?", (msg_id,))
+            self.conn.commit()
+
+    def _evict(self, cur: sqlite3.Cursor) -> None:
+        """Delete least recently used rows until under :attr:`max_bytes`."""
+        total = cur.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM gmail_messages"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = cur.execute(
+            "SELECT id, size FROM gmail_messages ORDER BY last_used"
+        ).fetchall()
+        victims = []
+        for msg_id, size in rows:
+            if total <= self.max_bytes:
+                break
+            victims.append((msg_id,))
+            total -= size
+        cur.executemany("DELETE FROM gmail_messages WHERE id=?", victims)
+        self.evictions += len(victims)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and the current cache size."""
+        with self._lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM gmail_messages"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+class DigestStore:
+    """Per-bucket digest entries accumulated as the poller sees messages.
+
+    Each entry keeps the Gmail message resource (compressed) under its
+    bucket so a digest can be formatted without listing or fetching the
+    window again.
+    """
+
+    BUCKETS = ("promo", "newsletter", "other")
+
+    def __init__(self, db_path: str = "assistant.db") -> None:
+        """Create or connect to the SQLite database and ensure schema.
+
+        Parameters
+        ----------
+        db_path: str, optional
+            Path to the SQLite database file. Defaults to ``"assistant.db"``.
+        """
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS digest_entries(
+              msg_id TEXT PRIMARY KEY,
+              bucket TEXT,
+              internal_date INTEGER,
+              payload BLOB
+            );
+            CREATE INDEX IF NOT EXISTS digest_entries_date
+              ON digest_entries(internal_date);
+            """
+        )
+        self.conn.commit()
+
+    def __enter__(self) -> "DigestStore":
+        """Enter the runtime context related to this object."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        """Close the connection when leaving the context."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        self.conn.close()
+
+    def add(self, msg: dict, kind: str) -> None:
+        """Record ``msg`` under the digest bucket for ``kind``.
+
+        VIP messages are pushed immediately rather than digested, so adding
+        one removes any earlier entry for the same message.
+        """
+        if kind == "vip":
+            self.discard(msg["id"])
+            return
+        bucket = kind if kind in self.BUCKETS else "other"
+        payload = zlib.compress(json.dumps(msg).encode("utf-8"))
+        with self._lock:
+            self.conn.execute(
+                "REPLACE INTO digest_entries(msg_id, bucket, internal_date, payload)"
+                " VALUES(?, ?, ?, ?)",
+                (msg["id"], bucket, int(msg.get("internalDate", 0)), payload),
+            )
+            self.conn.commit()
+
+    def discard(self, msg_id: str) -> None:
+        """Remove the entry for ``msg_id`` if present."""
+        with self._lock:
+            self.conn.execute("DELETE FROM digest_entries WHERE msg_id=?", (msg_id,))
+            self.conn.commit()
+
+    def buckets(self) -> Dict[str, List[dict]]:
+        """Return the entries not yet sent in a digest, by bucket.
+
+        Every stored entry is unsent, whenever it was received, so a
+        message ingested late (poll lag, a Gmail outage) still makes the
+        next digest. Messages are ordered by ``internalDate``.
+        """
+        buckets: Dict[str, List[dict]] = {b: [] for b in self.BUCKETS}
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT bucket, payload FROM digest_entries ORDER BY internal_date"
+            ).fetchall()
+        for bucket, payload in rows:
+            buckets[bucket].append(json.loads(zlib.decompress(payload)))
+        return buckets
+
+    def prune(self, msg_ids: Iterable[str]) -> None:
+        """Delete the entries of ``msg_ids``, once they were sent."""
+        with self._lock:
+            self.conn.executemany(
+                "DELETE FROM digest_entries WHERE msg_id=?",
+                ((msg_id,) for msg_id in msg_ids),
+            )
+            self.conn.commit()
+
+
+class SummaryCache:
+    """Persistent cache of LLM summaries keyed by a content hash.
+
+    Entries expire after ``ttl`` seconds and the least recently used ones
+    are evicted once more than ``max_entries`` are stored.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "assistant.db",
+        ttl: int = SUMMARY_CACHE_TTL,
+        max_entries: int = SUMMARY_CACHE_MAX_ENTRIES,
+    ) -> None:
+        """Create or connect to the cache database.
+
+        Parameters
+        ----------
+        db_path: str, optional
+            Path to the SQLite database file. Defaults to ``"assistant.db"``.
+        ttl: int, optional
+            Lifetime of an entry in seconds.
+        max_entries: int, optional
+            Maximum number of stored summaries.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS summaries(
+              key TEXT PRIMARY KEY,
+              summary TEXT,
+              created REAL,
+              last_used REAL
+            );
+            CREATE INDEX IF NOT EXISTS summaries_lru ON summaries(last_used);
+            """
+        )
+        self.conn.commit()
+
+    def __enter__(self) -> "SummaryCache":
+        """Enter the runtime context related to this object."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        """Close the connection when leaving the context."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        self.conn.close()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the summary stored under ``key`` unless missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT summary, created FROM summaries WHERE key=?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute(
+                "UPDATE summaries SET last_used=? WHERE key=?", (now, key)
+            )
+            self.conn.commit()
+        return row[0]
+
+    def put(self, key: str, summary: str) -> None:
+        """Store ``summary`` under ``key`` and apply TTL/size eviction."""
+        now = time.time()
+        with self._lock:
+            cur = self.conn.cursor()
+            try:
+                cur.execute(
+                    "REPLACE INTO summaries(key, summary, created, last_used)"
+                    " VALUES(?, ?, ?, ?)",
+                    (key, summary, now, now),
+                )
+                cur.execute(
+                    "DELETE FROM summaries WHERE created < ?", (now - self.ttl,)
+                )
+                cur.execute(
+                    "DELETE FROM summaries WHERE key IN ("
+                    " SELECT key FROM summaries ORDER BY last_used DESC"
+                    " LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                self.conn.commit()
+            except sqlite3.DatabaseError:
+                self.conn.rollback()
+                raise
+            finally:
+                cur.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of stored summaries."""
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+class SlackMessageStore:
+    """Local copy of Slack messages with full-text search.
+
+    Messages are kept in ``slack_messages`` and indexed by an FTS5 table
+    kept in sync by triggers. Each message also records whether it was
+    already reported as unread.
+    """
+
+    def __init__(self, db_path: str = "assistant.db") -> None:
+        """Create or connect to the store database.
+
+        Parameters
+        ----------
+        db_path: str, optional
+            Path to the SQLite database file. Defaults to ``"assistant.db"``.
+        """
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS slack_messages(
+              id INTEGER PRIMARY KEY,
+              channel TEXT,
+              ts TEXT,
+              posted REAL,
+              channel_name TEXT,
+              channel_type TEXT,
+              user_id TEXT,
+              user_name TEXT,
+              text TEXT,
+              mentions TEXT,
+              reported INTEGER DEFAULT 0,
+              UNIQUE(channel, ts)
+            );
+            CREATE INDEX IF NOT EXISTS slack_messages_posted ON slack_messages(posted);
+            CREATE INDEX IF NOT EXISTS slack_messages_unreported
+              ON slack_messages(reported, posted);
+            CREATE VIRTUAL TABLE IF NOT EXISTS slack_messages_fts USING fts5(
+              text, user_name, channel_name,
+              content='slack_messages', content_rowid='id'
+            );
+            CREATE TRIGGER IF NOT EXISTS slack_messages_ai AFTER INSERT ON slack_messages BEGIN
+              INSERT INTO slack_messages_fts(rowid, text, user_name, channel_name)
+              VALUES (new.id, new.text, new.user_name, new.channel_name);
+            END;
+            CREATE TRIGGER IF NOT EXISTS slack_messages_ad AFTER DELETE ON slack_messages BEGIN
+              INSERT INTO slack_messages_fts(slack_messages_fts, rowid, text, user_name, channel_name)
+              VALUES ('delete', old.id, old.text, old.user_name, old.channel_name);
+            END;
+            CREATE TRIGGER IF NOT EXISTS slack_messages_au AFTER UPDATE ON slack_messages BEGIN
+              INSERT INTO slack_messages_fts(slack_messages_fts, rowid, text, user_name, channel_name)
+              VALUES ('delete', old.id, old.text, old.user_name, old.channel_name);
+              INSERT INTO slack_messages_fts(rowid, text, user_name, channel_name)
+              VALUES (new.id, new.text, new.user_name, new.channel_name);
+            END;
+            """
+        )
+        self.conn.commit()
+
+    def __enter__(self) -> "SlackMessageStore":
+        """Enter the runtime context related to this object."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        """Close the connection when leaving the context."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        self.conn.close()
+
+    def add(self, messages: Iterable[dict]) -> int:
+        """Store ``messages`` and return how many were new.
+
+        Each message needs ``channel``, ``ts``, ``channel_name``,
+        ``channel_type``, ``user_id``, ``user``, ``text`` and ``mentions``
+        (a list of user IDs). Messages already stored get the new text,
+        names and mentions but keep their reported flag.
+        """
+        rows = [
+            (
+                m["channel"], m["ts"], float(m["ts"]), m["channel_name"], m["channel_type"],
+                m["user_id"], m["user"], m["text"], f" {' '.join(m['mentions'])} ",
+            )
+            for m in messages
+        ]
+        with self._lock:
+            try:
+                last_id = self.conn.execute(
+                    "SELECT COALESCE(MAX(id), 0) FROM slack_messages"
+                ).fetchone()[0]
+                # Only rows whose content changed are rewritten, so the FTS
+                # update trigger does not fire for unchanged re-reads
+                self.conn.executemany(
+                    "INSERT INTO slack_messages(channel, ts, posted, channel_name, channel_type,"
+                    " user_id, user_name, text, mentions) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(channel, ts) DO UPDATE SET"
+                    " channel_name=excluded.channel_name, user_name=excluded.user_name,"
+                    " text=excluded.text, mentions=excluded.mentions"
+                    " WHERE (channel_name, user_name, text, mentions)"
+                    " IS NOT (excluded.channel_name, excluded.user_name, excluded.text,"
+                    " excluded.mentions)",
+                    rows,
+                )
+                added = self.conn.execute(
+                    "SELECT COUNT(*) FROM slack_messages WHERE id > ?", (last_id,)
+                ).fetchone()[0]
+                self.conn.commit()
+            except sqlite3.DatabaseError:
+                self.conn.rollback()
+                raise
+        return added
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> dict:
+        return {
+            "channel": row["channel"] if row["channel_type"] == "DM" else row["channel_name"],
+            "channel_type": row["channel_type"],
+            "user": row["user_name"],
+            "user_id": row["user_id"],
+            "message": row["text"],
+            "ts": row["ts"],
+            "time": time.strftime("%Y-%m-%d %H:%M", time.localtime(row["posted"])),
+        }
+
+    def search(
+        self,
+        query: str = "",
+        dms: bool = False,
+        mentions: bool = False,
+        mention_of: Optional[str] = None,
+        channel: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        unreported: bool = False,
+        limit: int = 50,
+    ) -> List[dict]:
+        """Return stored messages matching every given filter, oldest first.
+
+        Parameters
+        ----------
+        query: str, optional
+            Words that must all appear in the text, author or channel name.
+        dms, mentions: bool, optional
+            Only direct messages and/or messages mentioning someone
+            (``mention_of`` when given); both together select either.
+        channel: str, optional
+            Channel name or ID.
+        since, until: float, optional
+            Unix time range of the messages.
+        unreported: bool, optional
+            Only messages not returned by :meth:`take_unreported` yet.
+        limit: int, optional
+            Maximum number of messages, the most recent ones are kept.
+        """
+        where, params = [], []
+        if query:
+            terms = re.findall(r"\w+", query)
+            if terms:
+                where.append(
+                    "id IN (SELECT rowid FROM slack_messages_fts WHERE slack_messages_fts MATCH ?)"
+                )
+                params.append(" ".join(f'"{t}"' for t in terms))
+        kinds = []
+        if dms:
+            kinds.append("channel_type = 'DM'")
+        if mentions:
+            kinds.append("mentions LIKE ?" if mention_of else "mentions != '  '")
+            if mention_of:
+                params.append(f"% {mention_of} %")
+        if kinds:
+            where.append(f"({' OR '.join(kinds)})")
+        if channel:
+            where.append("(channel = ? OR channel_name = ?)")
+            params += [channel, channel.lstrip("#")]
+        if since is not None:
+            where.append("posted >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("posted < ?")
+            params.append(until)
+        if unreported:
+            where.append("reported = 0")
+        sql = "SELECT * FROM slack_messages"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY posted DESC LIMIT ?"
+        with self._lock:
+            rows = self.conn.execute(sql, (*params, limit)).fetchall()
+        return [self._row(r) for r in reversed(rows)]
+
+    def take_unreported(self, mention_of: Optional[str] = None, limit: int = 200) -> List[dict]:
+        """Return direct messages and mentions not reported yet and mark them."""
+        with self._lock:
+            messages = self.search(
+                dms=True, mentions=True, mention_of=mention_of, unreported=True, limit=limit
+            )
+            try:
+                self.conn.execute(
+                    "UPDATE slack_messages SET reported = 1 WHERE reported = 0"
+                    " AND posted <= ?",
+                    (float(messages[-1]["ts"]) if messages else 0.0,),
+                )
+                self.conn.commit()
+            except sqlite3.DatabaseError:
+                self.conn.rollback()
+                raise
+        return messages
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of stored messages, conversations and unreported ones."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT channel), SUM(reported = 0) FROM slack_messages"
+            ).fetchone()
+        return {"messages": row[0], "conversations": row[1], "unreported": row[2] or 0}
+
+
+class TaskStore:
+    """Local mirror of the Notion todo list, indexed by date and status.
+
+    ``task_sync`` records the newest ``last_edited_time`` mirrored and when
+    the mirror was last synced incrementally and in full.
+    """
+
+    def __init__(self, db_path: str = "assistant.db") -> None:
+        """Create or connect to the mirror database.
+
+        Parameters
+        ----------
+        db_path: str, optional
+            Path to the SQLite database file. Defaults to ``"assistant.db"``.
+        """
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS tasks(
+              id TEXT PRIMARY KEY,
+              title TEXT,
+              status TEXT,
+              due TEXT,
+              due_date TEXT,
+              last_edited TEXT
+            );
+            CREATE INDEX IF NOT EXISTS tasks_due_date ON tasks(due_date, status);
+            CREATE INDEX IF NOT EXISTS tasks_status ON tasks(status);
+            CREATE TABLE IF NOT EXISTS task_sync(
+              id INTEGER PRIMARY KEY CHECK (id = 0),
+              last_edited TEXT,
+              synced REAL,
+              full_synced REAL
+            );
+            INSERT OR IGNORE INTO task_sync(id, last_edited, synced, full_synced)
+              VALUES(0, '', 0, 0);
+            """
+        )
+        self.conn.commit()
+
+    def __enter__(self) -> "TaskStore":
+        """Enter the runtime context related to this object."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        """Close the connection when leaving the context."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        self.conn.close()
+
+    def sync_state(self) -> Dict[str, object]:
+        """Return ``last_edited``, ``synced`` and ``full_synced``."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT last_edited, synced, full_synced FROM task_sync WHERE id=0"
+            ).fetchone()
+        return {"last_edited": row[0], "synced": row[1], "full_synced": row[2]}
+
+    def apply(
+        self,
+        tasks: Iterable[dict],
+        removed: Iterable[str] = (),
+        synced: Optional[float] = None,
+        full: bool = False,
+    ) -> None:
+        """Upsert ``tasks``, delete ``removed`` IDs and record a sync.
+
+        Each task needs ``id``, ``title``, ``status``, ``due`` (ISO date or
+        date-time, or ``None``) and ``last_edited``. With ``full`` every
+        task not in ``tasks`` is deleted.
+
+        ``synced`` is the time a sync with Notion started; only then does
+        the ``last_edited`` watermark move (forward). Writing a single new
+        task through leaves it alone, so edits made elsewhere in the
+        meantime are still picked up by the next sync.
+        """
+        rows = [
+            (t["id"], t["title"], t["status"], t["due"], (t["due"] or "")[:10] or None, t["last_edited"])
+            for t in tasks
+        ]
+        with self._lock:
+            cur = self.conn.cursor()
+            try:
+                if full:
+                    cur.execute("DELETE FROM tasks")
+                cur.executemany(
+                    "REPLACE INTO tasks(id, title, status, due, due_date, last_edited)"
+                    " VALUES(?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                cur.executemany("DELETE FROM tasks WHERE id=?", [(i,) for i in removed])
+                if synced is not None:
+                    newest = max((r[5] for r in rows if r[5]), default="")
+                    cur.execute(
+                        "UPDATE task_sync SET last_edited = MAX(last_edited, ?), synced=?"
+                        " WHERE id=0",
+                        (newest, synced),
+                    )
+                    if full:
+                        cur.execute("UPDATE task_sync SET full_synced=? WHERE id=0", (synced,))
+                self.conn.commit()
+            except sqlite3.DatabaseError:
+                self.conn.rollback()
+                raise
+            finally:
+                cur.close()
+
+    def tasks_on(self, date: str, status: Optional[str] = None) -> List[dict]:
+        """Return the tasks due on ``date`` (``YYYY-MM-DD``), optionally by status."""
+        sql = "SELECT id, title, status, due FROM tasks WHERE due_date=?"
+        params: List[str] = [date]
+        if status:
+            sql += " AND status=?"
+            params.append(status)
+        with self._lock:
+            rows = self.conn.execute(sql + " ORDER BY due, title", params).fetchall()
+        return [
+            {"id": r[0], "title": r[1], "status": r[2], "due_date": r[3]}
+            for r in rows
+        ]
+
+    def count(self) -> int:
+        """Return the number of mirrored tasks."""
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+
+_message_cache: Optional[MessageCache] = None
+_message_cache_lock = threading.Lock()
+
+
+def get_message_cache() -> MessageCache:
+    """Return the process-wide :class:`MessageCache`."""
+
+    global _message_cache
+    with _message_cache_lock:
+        if _message_cache is None:
+            _message_cache = MessageCache()
+    return _message_cache
+
+
+_slack_store: Optional[SlackMessageStore] = None
+_slack_store_lock = threading.Lock()
+
+
+def get_slack_store() -> SlackMessageStore:
+    """Return the process-wide :class:`SlackMessageStore`."""
+
+    global _slack_store
+    with _slack_store_lock:
+        if _slack_store is None:
+            _slack_store = SlackMessageStore()
+    return _slack_store
+
+
 def get_db() -> KVStore:
     """Create a ``KVStore`` instance based on ``APP_DB_BACKEND``."""
 
@@ -2,89 +2,242 @@
 
 from __future__ import annotations
 
-import base64
+import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from html.parser import HTMLParser
+from typing import Dict, List, NamedTuple, Optional
 
-from bs4 import BeautifulSoup
-
-from .email_utils import classify_importance
-from .utils import get_llm_by_provider
+from .config import DIGEST_CONCURRENCY, DIGEST_RATE_LIMIT, SUMMARY_TOKEN_BUDGET
+from .gmail_message import parse_message
+from .utils import RateLimiter, get_llm_by_provider
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate
 
-# Gmail service is injected from ``src.app`` when running the program
-gmail_service = None
-
-
-def _decode_html(msg: dict) -> str:
-    """Return the HTML body from a Gmail message."""
-    payload = msg.get("payload", {})
-    parts = payload.get("parts", [])
-    if payload.get("mimeType") == "text/html":
-        data = payload.get("body", {}).get("data", "")
-    else:
-        data = ""
-        for part in parts:
-            if part.get("mimeType") == "text/html":
-                data = part.get("body", {}).get("data", "")
-                break
-    if not data:
-        return ""
-    padded = data + "=" * (-len(data) % 4)
-    html = base64.urlsafe_b64decode(padded.encode("utf-8")).decode("utf-8", "ignore")
-    return html
-
-
-def _extract_links(html: str) -> List[str]:
-    soup = BeautifulSoup(html, "html.parser")
-    return [a.get("href") for a in soup.find_all("a", href=True)][:3]
-
-
-def llm_summarise(html_body: str, sentences: int) -> str:
-    """Summarise HTML content using an LLM."""
-    llm = get_llm_by_provider("openai/gpt-4o-mini", temperature=0.1)
+# The summary cache is injected from ``src.app`` when running the program
+summary_cache = None
+
+SUMMARY_MODEL = "openai/gpt-4o-mini"
+
+
+# Elements whose content is never shown to a reader.
+_SKIP_TAGS = {"head", "style", "script", "noscript", "title", "svg", "template"}
+# Elements that end a line of text.
+_BLOCK_TAGS = {
+    "br", "p", "div", "tr", "li", "ul", "ol", "table", "section", "article",
+    "header", "footer", "blockquote", "h1", "h2", "h3", "h4", "h5", "h6", "hr",
+}
+# Footer lines and links that carry no newsletter content.
+_BOILERPLATE = re.compile(
+    r"unsubscribe|view (this )?(email|message|newsletter )?(in|on) (your |a )?"
+    r"(browser|web)|manage (your )?(preferences|subscription)|privacy policy"
+    r"|all rights reserved|you (are )?receiv(ed|ing) this|update your preferences"
+    r"|forward to a friend",
+    re.IGNORECASE,
+)
+# Rough characters-per-token ratio for English text with GPT tokenisers.
+_CHARS_PER_TOKEN = 4
+_FEED_CHUNK = 8192
+
+
+def estimate_tokens(text: str) -> int:
+    """Return an approximate token count for ``text``."""
+    return -(-len(text) // _CHARS_PER_TOKEN)
+
+
+class ReducedHtml(NamedTuple):
+    """Result of :func:`reduce_html`."""
+
+    text: str
+    links: List[str]
+    raw_tokens: int
+    tokens: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.raw_tokens - self.tokens
+
+
+class _TextReducer(HTMLParser):
+    """Collect visible text and content links in one streaming pass."""
+
+    def __init__(self, max_chars: int, max_links: int) -> None:
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.max_links = max_links
+        self.lines: List[str] = []
+        self.links: List[str] = []
+        self.chars = 0
+        self._line: List[str] = []
+        self._skip_depth = 0
+        self._href: Optional[str] = None
+        self._anchor_text: List[str] = []
+
+    @property
+    def done(self) -> bool:
+        return self.chars >= self.max_chars and len(self.links) >= self.max_links
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self._end_line()
+        elif tag == "a":
+            href = dict(attrs).get("href") or ""
+            self._href = href if href.startswith(("http://", "https://")) else None
+            self._anchor_text = []
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self._end_line()
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in _BLOCK_TAGS:
+            self._end_line()
+        elif tag == "a" and self._href:
+            anchor = "".join(self._anchor_text)
+            if (
+                len(self.links) < self.max_links
+                and self._href not in self.links
+                and not _BOILERPLATE.search(anchor)
+                and not _BOILERPLATE.search(self._href)
+            ):
+                self.links.append(self._href)
+            self._href = None
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if self._href:
+            self._anchor_text.append(data)
+        self._line.append(data)
+
+    def _end_line(self):
+        line = " ".join("".join(self._line).split())
+        self._line = []
+        if not line or self.chars >= self.max_chars or _BOILERPLATE.search(line):
+            return
+        line = line[: self.max_chars - self.chars]
+        self.lines.append(line)
+        self.chars += len(line) + 1
+
+    def close(self):
+        super().close()
+        self._end_line()
+
+
+def reduce_html(
+    html: str, max_tokens: int = SUMMARY_TOKEN_BUDGET, max_links: int = 3
+) -> ReducedHtml:
+    """Reduce newsletter HTML to plain text for summarisation.
+
+    Markup, styles, scripts, images and footer boilerplate are dropped and
+    the text is capped at roughly ``max_tokens`` tokens. The first
+    ``max_links`` content links are extracted in the same pass; parsing
+    stops early once both limits are reached.
+    """
+    reducer = _TextReducer(max_tokens * _CHARS_PER_TOKEN, max_links)
+    for start in range(0, len(html), _FEED_CHUNK):
+        reducer.feed(html[start:start + _FEED_CHUNK])
+        if reducer.done:
+            break
+    reducer.close()
+    text = "\n".join(reducer.lines)
+    return ReducedHtml(text, reducer.links, estimate_tokens(html), estimate_tokens(text))
+
+
+def summary_key(text: str, sentences: int, model: str = SUMMARY_MODEL) -> str:
+    """Return the content-addressed cache key for a summary request."""
+    digest_input = "\0".join([" ".join(text.split()), model, str(sentences)])
+    return hashlib.sha256(digest_input.encode("utf-8")).hexdigest()
+
+
+def llm_summarise(text: str, sentences: int) -> str:
+    """Summarise newsletter text (see :func:`reduce_html`) using an LLM.
+
+    When :data:`summary_cache` is set, summaries are looked up by
+    :func:`summary_key` first so identical content is only summarised once.
+    """
+    key = None
+    if summary_cache is not None:
+        key = summary_key(text, sentences)
+        cached = summary_cache.get(key)
+        if cached is not None:
+            return cached
+    summary = _llm_summarise(text, sentences)
+    if key is not None:
+        summary_cache.put(key, summary)
+    return summary
+
+
+def _llm_summarise(text: str, sentences: int) -> str:
+    llm = get_llm_by_provider(SUMMARY_MODEL, temperature=0.1)
     prompt = ChatPromptTemplate.from_messages(
         [
             SystemMessage(content=f"Summarise the newsletter in {sentences} sentences."),
-            HumanMessage(content=html_body),
+            HumanMessage(content=text),
         ]
     )
     chain = prompt | llm
     return chain.invoke({}).content.strip()
 
 
-def collect_digest(start_ts: int, end_ts: int) -> Dict[str, List[dict]]:
-    """Collect non-VIP Gmail messages in the given time range."""
-    query = f"after:{start_ts} before:{end_ts}"
-    page_token = None
-    msg_refs: List[dict] = []
-
-    while True:
-        kwargs = {"userId": "me", "q": query}
-        if page_token:
-            kwargs["pageToken"] = page_token
-        resp = gmail_service.users().messages().list(**kwargs).execute()
-        msg_refs.extend(resp.get("messages", []))
-        page_token = resp.get("nextPageToken")
-        if not page_token:
-            break
+def summarise_newsletters(
+    texts: List[str],
+    sentences: int,
+    max_workers: int = DIGEST_CONCURRENCY,
+    rate: float = DIGEST_RATE_LIMIT,
+) -> List[str]:
+    """Summarise several newsletters concurrently.
 
-    buckets = {"promo": [], "newsletter": [], "other": []}
-    for ref in msg_refs:
-        msg = (
-            gmail_service.users()
-            .messages()
-            .get(userId="me", id=ref["id"], format="full")
-            .execute()
-        )
-        kind = classify_importance(msg)
-        if kind == "vip":
-            continue
-        if kind not in buckets:
-            kind = "other"
-        buckets[kind].append(msg)
-    return buckets
+    Parameters
+    ----------
+    texts : list of str
+        Newsletter texts to summarise, as produced by :func:`reduce_html`.
+    sentences : int
+        Sentence count for each summary.
+    max_workers : int, optional
+        Maximum number of summaries in flight at once.
+    rate : float, optional
+        Maximum number of LLM calls started per second; ``0`` disables
+        rate limiting.
+
+    Returns
+    -------
+    list of str
+        Summaries in the same order as ``texts``. Texts with the same
+        :func:`summary_key` are summarised once, and each key is looked up
+        in :data:`summary_cache` once.
+    """
+    if not texts:
+        return []
+    keys = [summary_key(text, sentences) for text in texts]
+    summaries: Dict[str, str] = {}
+    if summary_cache is not None:
+        for key in dict.fromkeys(keys):
+            cached = summary_cache.get(key)
+            if cached is not None:
+                summaries[key] = cached
+    pending: Dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key not in summaries:
+            pending.setdefault(key, text)
+    limiter = RateLimiter(rate)
+
+    def summarise(key: str) -> str:
+        limiter.acquire()
+        summary = _llm_summarise(pending[key], sentences)
+        if summary_cache is not None:
+            summary_cache.put(key, summary)
+        return summary
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            summaries.update(zip(pending, pool.map(summarise, pending)))
+    return [summaries[key] for key in keys]
 
 
 def format_digest(buckets: Dict[str, List[dict]]) -> str:
@@ -94,27 +247,25 @@ def format_digest(buckets: Dict[str, List[dict]]) -> str:
     promos = buckets.get("promo", [])
     if promos:
         lines = ["⚡ Time-Sensitive Deals"]
-        for m in promos:
-            headers = {
-                h.get("name"): h.get("value")
-                for h in m.get("payload", {}).get("headers", [])
-                if isinstance(h, dict)
-            }
-            brand = headers.get("From", "").split("<")[0].strip()
-            subject = headers.get("Subject", "(no subject)")
-            exp = datetime.fromtimestamp(int(m.get("internalDate", "0")) / 1000).strftime("%Y-%m-%d")
+        for m in map(parse_message, promos):
+            brand = m.header("From", "").split("<")[0].strip()
+            subject = m.header("Subject", "(no subject)")
+            exp = datetime.fromtimestamp(m.internal_date / 1000).strftime("%Y-%m-%d")
             lines.append(f"- {brand} — {subject} — Expires {exp}")
         sections.append("\n".join(lines))
 
     newsletters = buckets.get("newsletter", [])
     if newsletters:
         lines = ["📰 Newsletters"]
-        for m in newsletters:
-            html = _decode_html(m)
-            summary = llm_summarise(html, 3)
-            links = _extract_links(html)
+        reduced = [reduce_html(parse_message(m).html) for m in newsletters]
+        summaries = summarise_newsletters([r.text for r in reduced], 3)
+        print(
+            f"Digest HTML reduction saved {sum(r.tokens_saved for r in reduced)} "
+            f"of {sum(r.raw_tokens for r in reduced)} newsletter tokens"
+        )
+        for r, summary in zip(reduced, summaries):
             bullet = f"- {summary}"
-            for link in links:
+            for link in r.links:
                 bullet += f"\n  - {link}"
             lines.append(bullet)
         sections.append("\n".join(lines))
@@ -122,13 +273,8 @@ def format_digest(buckets: Dict[str, List[dict]]) -> str:
     others = buckets.get("other", [])
     if others:
         lines = ["📬 Other Mail"]
-        for m in others:
-            headers = {
-                h.get("name"): h.get("value")
-                for h in m.get("payload", {}).get("headers", [])
-                if isinstance(h, dict)
-            }
-            subject = headers.get("Subject", "(no subject)")
+        for m in map(parse_message, others):
+            subject = m.header("Subject", "(no subject)")
             lines.append(f"- {subject}")
         sections.append("\n".join(lines))
 
@@ -0,0 +1,134 @@
+"""Concurrent, per-conversation ordered message dispatch."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from .config import CONVERSATION_QUEUE_SIZE, CONVERSATION_WORKERS
+
+logger = logging.getLogger(__name__)
+
+
+class DispatcherFull(Exception):
+    """Raised by :meth:`ConversationDispatcher.submit` when the queue is full."""
+
+
+class ConversationDispatcher:
+    """Handle messages of independent conversations concurrently.
+
+    Each conversation (e.g. a Telegram chat) has its own FIFO queue and at
+    most one message of a conversation is handled at a time, so replies
+    keep their order. Different conversations share a pool of
+    ``max_workers`` threads; after every message a conversation goes to
+    the back of the line so one busy chat cannot starve the others.
+
+    At most ``max_pending`` messages may be queued or in progress overall.
+    Beyond that :meth:`submit` blocks (or fails) until a worker catches up,
+    which keeps bursts from overrunning the LLM quota.
+
+    Parameters
+    ----------
+    handler : callable
+        ``handler(conversation_id, item)`` called for every message.
+    max_workers : int, optional
+        Number of conversations handled in parallel.
+    max_pending : int, optional
+        Bound on queued plus in-progress messages.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Hashable, Any], None],
+        max_workers: int = CONVERSATION_WORKERS,
+        max_pending: int = CONVERSATION_QUEUE_SIZE,
+    ) -> None:
+        self.handler = handler
+        self.max_pending = max(1, max_pending)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="conversation"
+        )
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._queues: Dict[Hashable, deque] = {}
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def submit(
+        self,
+        conversation_id: Hashable,
+        item: Any,
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Queue ``item`` for ``conversation_id``.
+
+        Blocks while ``max_pending`` messages are outstanding, unless
+        ``block`` is false or ``timeout`` expires, in which case
+        :class:`DispatcherFull` is raised.
+        """
+        if not self._slots.acquire(blocking=block, timeout=timeout if block else None):
+            with self._lock:
+                self.rejected += 1
+            raise DispatcherFull(f"{self.max_pending} messages already pending")
+        with self._lock:
+            self._pending += 1
+            queue = self._queues.get(conversation_id)
+            if queue is not None:
+                # A worker already owns this conversation; it will get here.
+                queue.append(item)
+                return
+            self._queues[conversation_id] = deque([item])
+        self._executor.submit(self._run_next, conversation_id)
+
+    def _run_next(self, conversation_id: Hashable) -> None:
+        with self._lock:
+            item = self._queues[conversation_id][0]
+        try:
+            self.handler(conversation_id, item)
+        except Exception:
+            logger.exception("Failed to handle message for %s", conversation_id)
+            with self._lock:
+                self.failed += 1
+        finally:
+            with self._lock:
+                queue = self._queues[conversation_id]
+                queue.popleft()
+                self.processed += 1
+                self._pending -= 1
+                more = bool(queue)
+                if not more:
+                    del self._queues[conversation_id]
+                    self._idle.notify_all()
+            self._slots.release()
+        if more:
+            # Requeue behind the other conversations waiting for a worker.
+            self._executor.submit(self._run_next, conversation_id)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every submitted message has been handled."""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Return queue depth and counters."""
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "conversations": len(self._queues),
+                "processed": self.processed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+
+    def close(self, wait: bool = True) -> None:
+        """Stop the worker pool, by default after the queued messages."""
+        if wait:
+            self.join()
+        self._executor.shutdown(wait=wait)
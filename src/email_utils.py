@@ -4,10 +4,20 @@ from __future__ import annotations
 
 import json
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Union
+
+from .gmail_message import ParsedMessage, parse_message
 
 VIP_PATH = Path("data/vip_addresses.json")
 
+# Headers read by :func:`classify_importance`.
+CLASSIFY_HEADERS = ["From", "List-Id"]
+# Headers requested for ``format="metadata"`` fetches: enough to classify a
+# message and to render it in a digest or notification without its body.
+METADATA_HEADERS = CLASSIFY_HEADERS + ["Subject"]
+# Kinds whose consumers need the full payload (parts and bodies).
+FULL_PAYLOAD_KINDS = {"vip", "newsletter"}
+
 
 def _load_vip_addresses() -> set[str]:
     """Load VIP email addresses from :data:`VIP_PATH`."""
@@ -20,13 +30,15 @@ def _load_vip_addresses() -> set[str]:
 VIP_ADDRESSES = _load_vip_addresses()
 
 
-def classify_importance(msg: Dict[str, Any]) -> str:
+def classify_importance(msg: Union[Dict[str, Any], ParsedMessage]) -> str:
     """Classify a Gmail message by importance level.
 
     Parameters
     ----------
-    msg : dict
+    msg : dict or ParsedMessage
         Gmail API message resource containing ``labelIds`` and ``payload``.
+        A ``format="metadata"`` resource with :data:`CLASSIFY_HEADERS` is
+        sufficient.
 
     Returns
     -------
@@ -34,18 +46,14 @@ def classify_importance(msg: Dict[str, Any]) -> str:
         One of ``"vip"``, ``"promo"``, ``"newsletter"`` or ``"other"``.
     """
 
-    headers = {
-        h.get("name"): h.get("value")
-        for h in msg.get("payload", {}).get("headers", [])
-        if isinstance(h, dict)
-    }
-    from_addr = headers.get("From", "")
-    labels = set(msg.get("labelIds", []))
+    parsed = parse_message(msg)
+    from_addr = parsed.header("From", "")
+    labels = parsed.labels
 
     if from_addr in VIP_ADDRESSES or "\\Starred" in labels:
         return "vip"
     if "CATEGORY_PROMOTIONS" in labels:
         return "promo"
-    if "List-Id" in headers:
+    if "List-Id" in parsed:
         return "newsletter"
     return "other"
@@ -0,0 +1,116 @@
+"""Parsed view of a Gmail API message resource."""
+
+from __future__ import annotations
+
+import base64
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+
+def _decode_body(data: str) -> str:
+    """Decode a base64url Gmail body, tolerating missing padding."""
+    padded = data + "=" * (-len(data) % 4)
+    return base64.urlsafe_b64decode(padded.encode("utf-8")).decode("utf-8", "ignore")
+
+
+class ParsedMessage:
+    """Gmail message with a header index and lazily decoded bodies.
+
+    Headers are indexed once, case-insensitively, when the object is
+    built. The MIME tree is walked recursively on first access to
+    :attr:`parts`, and bodies are only base64-decoded when :attr:`html` or
+    :attr:`text` is read.
+
+    Parameters
+    ----------
+    msg : dict
+        Gmail API message resource (any ``format``).
+    """
+
+    __slots__ = ("raw", "_headers", "_parts", "_bodies")
+
+    def __init__(self, msg: Dict[str, Any]) -> None:
+        self.raw = msg
+        self._headers: Dict[str, str] = {}
+        for h in msg.get("payload", {}).get("headers", []):
+            if isinstance(h, dict) and h.get("name"):
+                # Keep the first occurrence, as mail clients do.
+                self._headers.setdefault(h["name"].lower(), h.get("value", ""))
+        self._parts: Optional[List[Dict[str, Any]]] = None
+        self._bodies: Dict[str, str] = {}
+
+    @property
+    def id(self) -> Optional[str]:
+        return self.raw.get("id")
+
+    @property
+    def thread_id(self) -> Optional[str]:
+        return self.raw.get("threadId")
+
+    @property
+    def labels(self) -> set[str]:
+        return set(self.raw.get("labelIds", []))
+
+    @property
+    def snippet(self) -> str:
+        return self.raw.get("snippet", "")
+
+    @property
+    def internal_date(self) -> int:
+        """Receive time in milliseconds since the epoch."""
+        return int(self.raw.get("internalDate", "0"))
+
+    def header(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Return the value of header ``name`` (case-insensitive)."""
+        return self._headers.get(name.lower(), default)
+
+    def __contains__(self, name: str) -> bool:
+        """Return whether header ``name`` is present (case-insensitive)."""
+        return name.lower() in self._headers
+
+    @property
+    def parts(self) -> List[Dict[str, Any]]:
+        """All MIME parts of the payload, depth first, the root included."""
+        if self._parts is None:
+            self._parts = list(self._walk(self.raw.get("payload", {})))
+        return self._parts
+
+    @classmethod
+    def _walk(cls, part: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        if not part:
+            return
+        yield part
+        for child in part.get("parts", []):
+            yield from cls._walk(child)
+
+    def has_part(self, mime_type: str) -> bool:
+        """Return whether any MIME part has the given ``mimeType``."""
+        return any(p.get("mimeType") == mime_type for p in self.parts)
+
+    def body(self, mime_type: str) -> str:
+        """Return the decoded body of the first ``mime_type`` part, or ``""``."""
+        if mime_type not in self._bodies:
+            data = next(
+                (
+                    p.get("body", {}).get("data", "")
+                    for p in self.parts
+                    if p.get("mimeType") == mime_type and p.get("body", {}).get("data")
+                ),
+                "",
+            )
+            self._bodies[mime_type] = _decode_body(data) if data else ""
+        return self._bodies[mime_type]
+
+    @property
+    def html(self) -> str:
+        return self.body("text/html")
+
+    @property
+    def text(self) -> str:
+        return self.body("text/plain")
+
+
+def parse_message(msg: Union[Dict[str, Any], ParsedMessage]) -> ParsedMessage:
+    """Return ``msg`` as a :class:`ParsedMessage`, parsing it if needed."""
+    if isinstance(msg, ParsedMessage):
+        return msg
+    return ParsedMessage(msg)
@@ -0,0 +1,128 @@
+"""Shared Google credentials and API clients.
+
+Building a client with ``googleapiclient.discovery.build`` parses its
+discovery document and opens a new HTTP transport, and reading
+``token.json`` costs a disk read, so doing both for every tool call adds
+up. Here the credentials are loaded once and refreshed in memory, and the
+Gmail, Calendar and People clients are built once per thread from the
+discovery documents bundled with ``google-api-python-client``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+SCOPES = [
+    "https://www.googleapis.com/auth/calendar.events",
+    "https://www.googleapis.com/auth/contacts.readonly",
+    "https://www.googleapis.com/auth/gmail.readonly",
+]
+TOKEN_FILE = "token.json"
+CLIENT_SECRETS_FILE = "credentials.json"
+
+_lock = threading.Lock()
+_creds = None
+_saved_token: Optional[str] = None
+# httplib2 transports are not thread-safe, so each thread builds its own clients
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {"builds": 0, "hits": 0, "refreshes": 0, "token_writes": 0}
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _save(creds) -> None:
+    """Write ``creds`` to ``TOKEN_FILE`` unless it already holds them."""
+    global _saved_token
+    token = creds.to_json()
+    if token == _saved_token:
+        return
+    with open(TOKEN_FILE, "w") as f:
+        f.write(token)
+    _saved_token = token
+    _count("token_writes")
+
+
+def get_credentials():
+    """Return valid Google credentials, shared by the whole process.
+
+    ``token.json`` is only read the first time. Expired credentials are
+    refreshed under a lock, so concurrent callers wait for one refresh
+    instead of each starting their own, and the token is written back only
+    when it changed.
+    """
+    global _creds, _saved_token
+    creds = _creds
+    if creds is not None and creds.valid:
+        return creds
+    with _lock:
+        creds = _creds
+        if creds is not None and creds.valid:
+            return creds  # refreshed by another thread meanwhile
+        # Imported here to keep google-auth off the start-up path.
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+
+        if creds is None and os.path.exists(TOKEN_FILE):
+            with open(TOKEN_FILE) as f:
+                _saved_token = f.read()
+            creds = Credentials.from_authorized_user_info(json.loads(_saved_token), SCOPES)
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+                _count("refreshes")
+            else:
+                from google_auth_oauthlib.flow import InstalledAppFlow
+
+                flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRETS_FILE, SCOPES)
+                creds = flow.run_local_server(port=0)
+            _save(creds)
+        _creds = creds
+        return creds
+
+
+def get_service(name: str, version: str) -> Any:
+    """Return this thread's client for the Google API ``name``/``version``.
+
+    Clients are rebuilt when the credentials object changes, e.g. after a
+    new sign-in.
+    """
+    creds = get_credentials()
+    services: Dict[tuple, tuple] = _local.__dict__.setdefault("services", {})
+    cached = services.get((name, version))
+    if cached is not None and cached[0] is creds:
+        _count("hits")
+        return cached[1]
+
+    from googleapiclient.discovery import build
+
+    service = build(
+        name, version, credentials=creds, static_discovery=True, cache_discovery=False
+    )
+    services[(name, version)] = (creds, service)
+    _count("builds")
+    return service
+
+
+def service_stats() -> Dict[str, int]:
+    """Return client builds and cache hits, token refreshes and writes."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_google_services() -> None:
+    """Forget the credentials and clients, e.g. after replacing ``token.json``."""
+    global _creds, _saved_token
+    with _lock:
+        _creds = None
+        _saved_token = None
+    _local.__dict__.pop("services", None)
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
@@ -0,0 +1,197 @@
+"""Gmail change notifications for event-driven ingestion.
+
+Gmail ``users.watch`` publishes a message to a Cloud Pub/Sub topic whenever
+the mailbox changes. :class:`NotificationSource` implementations let the
+poller sleep until such a notification arrives instead of on a fixed timer.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .config import (
+    GMAIL_NOTIFY_DIR,
+    GMAIL_PUBSUB_SUBSCRIPTION,
+    GMAIL_PUBSUB_TOPIC,
+    GMAIL_PUSH_SOURCE,
+)
+
+
+class NotificationSource(ABC):
+    """Abstract source of Gmail mailbox change notifications."""
+
+    @abstractmethod
+    async def wait(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for a notification.
+
+        Returns ``True`` if at least one notification arrived. Notifications
+        that queued up meanwhile are consumed together, since a single
+        ``history().list`` call picks up all of their changes.
+        """
+
+    def close(self) -> None:
+        """Release any resources held by the source."""
+
+
+class QueueNotificationSource(NotificationSource):
+    """In-process notification source, mainly for tests."""
+
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def notify(self, history_id: Optional[str] = None) -> None:
+        """Signal that the mailbox changed."""
+        self.queue.put_nowait(history_id)
+
+    async def wait(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        return True
+
+
+class FileNotificationSource(NotificationSource):
+    """Spool-directory stand-in for Pub/Sub.
+
+    Each file dropped into ``directory`` is one notification (typically the
+    JSON body of a Pub/Sub push, ``{"emailAddress": ..., "historyId": ...}``)
+    and is deleted once consumed.
+    """
+
+    def __init__(
+        self, directory: str = GMAIL_NOTIFY_DIR, interval: float = 0.5
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.interval = interval
+
+    def _drain(self) -> bool:
+        found = False
+        for path in sorted(self.directory.iterdir()):
+            if path.is_file():
+                path.unlink(missing_ok=True)
+                found = True
+        return found
+
+    async def wait(self, timeout: float) -> bool:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            if self._drain():
+                return True
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(self.interval, remaining))
+
+
+class PubSubNotificationSource(NotificationSource):
+    """Pull Gmail notifications from a Cloud Pub/Sub subscription.
+
+    Requires the optional ``google-cloud-pubsub`` package.
+    """
+
+    def __init__(
+        self, subscription: str = GMAIL_PUBSUB_SUBSCRIPTION, interval: float = 0.5
+    ) -> None:
+        try:
+            from google.cloud import pubsub_v1
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError(
+                "GMAIL_PUSH_SOURCE=pubsub requires the google-cloud-pubsub package"
+            ) from exc
+        self.subscription = subscription
+        self.client = pubsub_v1.SubscriberClient()
+        self.interval = interval
+
+    def _pull(self, timeout: float) -> bool:
+        response = self.client.pull(
+            request={"subscription": self.subscription, "max_messages": 100},
+            timeout=timeout,
+        )
+        ack_ids = [m.ack_id for m in response.received_messages]
+        if ack_ids:
+            self.client.acknowledge(
+                request={"subscription": self.subscription, "ack_ids": ack_ids}
+            )
+        return bool(ack_ids)
+
+    async def wait(self, timeout: float) -> bool:
+        from google.api_core.exceptions import DeadlineExceeded
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                if await asyncio.to_thread(self._pull, remaining):
+                    return True
+            except DeadlineExceeded:
+                pass
+            except Exception as e:
+                # A bad subscription or missing permission fails every pull;
+                # sleep out the timeout so the poller keeps its fallback pace.
+                print(f"Failed to pull Gmail notifications: {e}")
+                await asyncio.sleep(max(0.0, deadline - loop.time()))
+                return False
+            # Pulls may return empty before the timeout; pull again
+            await asyncio.sleep(min(self.interval, max(0.0, deadline - loop.time())))
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def start_watch(
+    service, topic_name: str = GMAIL_PUBSUB_TOPIC, label_ids: Iterable[str] = ("INBOX",)
+) -> dict:
+    """Ask Gmail to publish mailbox changes to ``topic_name``.
+
+    A watch expires after seven days and must be renewed; calling this again
+    simply extends it. Returns the Gmail response with ``historyId`` and
+    ``expiration``.
+    """
+    body = {"topicName": topic_name, "labelIds": list(label_ids)}
+    return service.users().watch(userId="me", body=body).execute()
+
+
+def get_notification_source() -> Optional[NotificationSource]:
+    """Create the source selected by ``GMAIL_PUSH_SOURCE``, if any."""
+
+    backend = GMAIL_PUSH_SOURCE.lower()
+    if backend == "pubsub":
+        return PubSubNotificationSource()
+    if backend == "file":
+        return FileNotificationSource()
+    return None
+
+
+class AdaptiveBackoff:
+    """Polling interval that grows while the mailbox is idle.
+
+    Starts at ``min_interval``, is multiplied by ``factor`` after every idle
+    poll up to ``max_interval``, and resets once new messages show up.
+    """
+
+    def __init__(
+        self, min_interval: float, max_interval: float, factor: float = 2.0
+    ) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.factor = factor
+        self.interval = min_interval
+
+    def next(self, active: bool) -> float:
+        """Return the delay before the next poll."""
+        if active:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.factor)
+        return self.interval
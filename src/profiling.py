@@ -0,0 +1,96 @@
+"""Import-time profiling of the service entry points.
+
+Runs an import in a fresh interpreter with ``python -X importtime`` and
+reports which modules dominate cold start::
+
+    python -m src.profiling                  # src.agents.personal_assistant
+    python -m src.profiling app --top 30     # the Telegram entry point
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from typing import Dict, Iterable, List, NamedTuple
+
+DEFAULT_MODULES = ["src.agents.personal_assistant"]
+
+
+class ImportTiming(NamedTuple):
+    """One line of ``-X importtime`` output, times in microseconds."""
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(lines: Iterable[str]) -> List[ImportTiming]:
+    """Parse the ``import time:`` lines written to stderr by ``-X importtime``."""
+    timings = []
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        timings.append(
+            ImportTiming(
+                name=stripped,
+                self_us=int(fields[0]),
+                cumulative_us=int(fields[1]),
+                depth=(len(name) - len(stripped) - 1) // 2,
+            )
+        )
+    return timings
+
+
+def profile_imports(modules: Iterable[str]) -> List[ImportTiming]:
+    """Import ``modules`` in a fresh interpreter and return the timings."""
+    statement = "; ".join(f"import {m}" for m in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr.splitlines())
+
+
+def top_packages(timings: Iterable[ImportTiming]) -> Dict[str, int]:
+    """Sum self time per top-level package, largest first."""
+    totals: Dict[str, int] = {}
+    for t in timings:
+        package = t.name.split(".", 1)[0]
+        totals[package] = totals.get(package, 0) + t.self_us
+    return dict(sorted(totals.items(), key=lambda kv: kv[1], reverse=True))
+
+
+def format_report(timings: List[ImportTiming], top: int = 20) -> str:
+    """Render the total import time, the heaviest packages and modules."""
+    total = sum(t.self_us for t in timings)
+    lines = [f"total import time: {total / 1e6:.3f}s ({len(timings)} modules)", ""]
+    lines.append("heaviest packages (self time):")
+    for package, us in list(top_packages(timings).items())[:top]:
+        lines.append(f"  {us / 1e3:9.1f} ms  {package}")
+    lines.append("")
+    lines.append("heaviest modules (self time):")
+    for t in sorted(timings, key=lambda t: t.self_us, reverse=True)[:top]:
+        lines.append(f"  {t.self_us / 1e3:9.1f} ms  {t.name}")
+    return "\n".join(lines)
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+    print(format_report(profile_imports(args.modules), args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""Cache of recent assistant answers, matched on the normalised question."""
+
+import functools
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from .config import (
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_SIMILARITY,
+    RESPONSE_CACHE_TTL,
+)
+
+# Words that do not change what a question asks for
+_STOP_WORDS = frozenset(
+    "a an and any are am be can could do does for give i in is list me my of on "
+    "please show tell the to what whats you".split()
+)
+# Words referring back to the conversation; the answer depends on context
+_CONTEXT_WORDS = frozenset(
+    "he her him it its no ok okay she sure that thats them these they "
+    "those thanks thank yes".split()
+)
+_EMBEDDING_DIM = 512
+
+
+def normalise_query(message: str) -> str:
+    """Lower-case ``message`` and reduce it to its words.
+
+    The ``Message:`` prefix and ``Current Date/time:`` line added by the
+    chat front-ends are dropped, so only the question itself is compared.
+    """
+    lines = [
+        line for line in message.splitlines()
+        if not line.strip().lower().startswith("current date/time:")
+    ]
+    text = re.sub(r"^\s*message:\s*", "", " ".join(lines), flags=re.IGNORECASE)
+    # Dates and times ("2024-05-01", "10:30", "5pm") stay single words
+    return " ".join(re.findall(r"\d+(?:[-/.:]\d+)*\w*|\w+", text.lower().replace("'", "")))
+
+
+def _numbers(query: str) -> List[str]:
+    """Return the words of ``query`` containing digits, e.g. dates and times."""
+    return sorted(w for w in query.split() if any(c.isdigit() for c in w))
+
+
+def embed_query(query: str, dim: int = _EMBEDDING_DIM) -> array:
+    """Return a unit-length hashed bag of words and word pairs of ``query``.
+
+    Cheap and local: good enough to match rewordings such as "what is on my
+    calendar today" and "whats on my calendar for today", while "today" and
+    "tomorrow" stay apart.
+    """
+    words = [w for w in query.split() if w not in _STOP_WORDS]
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vector = array("f", [0.0]) * dim
+    for feature in features:
+        h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+        vector[h % dim] += 1.0 if h >> 63 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm:
+        vector = array("f", (v / norm for v in vector))
+    return vector
+
+
+class ResponseCache:
+    """Recent assistant answers keyed on the normalised question.
+
+    Answers are kept for the current time bucket of ``ttl`` seconds only.
+    With ``similarity`` above zero a question that misses the exact lookup
+    is compared with the other questions of its bucket and scope, and the
+    answer of the closest one is reused when its cosine similarity reaches
+    the threshold.
+
+    Any write (a new event, task, email, ...) calls :meth:`invalidate`,
+    which drops every answer and bumps a generation counter. An answer is
+    only stored if no write happened while it was produced, so turns that
+    changed something are never replayed. The state lives in SQLite so that
+    writes made by other processes invalidate the cache too.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "assistant.db",
+        ttl: int = RESPONSE_CACHE_TTL,
+        similarity: float = RESPONSE_CACHE_SIMILARITY,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+    ) -> None:
+        """Create or connect to the cache database.
+
+        Parameters
+        ----------
+        db_path: str, optional
+            Path to the SQLite database file. Defaults to ``"assistant.db"``.
+        ttl: int, optional
+            Width of a time bucket in seconds.
+        similarity: float, optional
+            Minimum similarity of a reworded question, ``0`` to disable.
+        max_entries: int, optional
+            Maximum number of stored answers.
+        """
+        self.ttl = max(1, ttl)
+        self.similarity = similarity
+        self.max_entries = max_entries
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses(
+              key TEXT PRIMARY KEY,
+              scope TEXT,
+              bucket INTEGER,
+              query TEXT,
+              embedding BLOB,
+              answer TEXT,
+              created REAL
+            );
+            CREATE INDEX IF NOT EXISTS responses_bucket ON responses(scope, bucket);
+            CREATE TABLE IF NOT EXISTS response_generation(
+              id INTEGER PRIMARY KEY CHECK (id = 0),
+              value INTEGER
+            );
+            INSERT OR IGNORE INTO response_generation(id, value) VALUES(0, 0);
+            """
+        )
+        self.conn.commit()
+
+    def __enter__(self) -> "ResponseCache":
+        """Enter the runtime context related to this object."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        """Close the connection when leaving the context."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        self.conn.close()
+
+    @staticmethod
+    def cacheable(query: str) -> bool:
+        """Whether the answer to normalised ``query`` stands on its own.
+
+        Follow-ups such as "yes" or "move it to 5pm" depend on the previous
+        turns and are never cached.
+        """
+        words = query.split()
+        return (
+            any(w not in _STOP_WORDS for w in words)
+            and not any(w in _CONTEXT_WORDS for w in words)
+        )
+
+    def _bucket(self, now: float) -> int:
+        # Buckets are aligned to the epoch, so with a ttl dividing a day
+        # none straddles midnight and "today" keeps its meaning.
+        return int(now // self.ttl)
+
+    def _key(self, scope: str, bucket: int, query: str) -> str:
+        return hashlib.sha256(f"{scope}\0{bucket}\0{query}".encode()).hexdigest()
+
+    def generation(self) -> int:
+        """Return the number of invalidations so far."""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT value FROM response_generation WHERE id=0"
+            ).fetchone()[0]
+
+    def get(self, message: str, scope: str = "") -> Optional[str]:
+        """Return a cached answer to ``message`` within ``scope``, if any."""
+        query = normalise_query(message)
+        if not self.cacheable(query):
+            return None
+        bucket = self._bucket(time.time())
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT answer FROM responses WHERE key=?",
+                (self._key(scope, bucket, query),),
+            ).fetchone()
+            if row is not None:
+                self.hits += 1
+                return row[0]
+            if self.similarity > 0:
+                vector = embed_query(query)
+                numbers = _numbers(query)
+                best, answer = self.similarity, None
+                for other_query, blob, candidate in self.conn.execute(
+                    "SELECT query, embedding, answer FROM responses WHERE scope=? AND bucket=?",
+                    (scope, bucket),
+                ):
+                    # A question about another day or time is never similar
+                    if _numbers(other_query) != numbers:
+                        continue
+                    other = array("f")
+                    other.frombytes(blob)
+                    score = sum(a * b for a, b in zip(vector, other))
+                    if score >= best:
+                        best, answer = score, candidate
+                if answer is not None:
+                    self.hits += 1
+                    self.similar_hits += 1
+                    return answer
+            self.misses += 1
+        return None
+
+    def put(
+        self,
+        message: str,
+        answer: str,
+        scope: str = "",
+        generation: Optional[int] = None,
+    ) -> bool:
+        """Store ``answer`` to ``message`` and evict old answers.
+
+        When ``generation`` (taken before the answer was produced) is no
+        longer current, a write happened in the meantime and nothing is
+        stored. Returns whether the answer was cached.
+        """
+        query = normalise_query(message)
+        if not answer or not self.cacheable(query):
+            return False
+        now = time.time()
+        bucket = self._bucket(now)
+        with self._lock:
+            cur = self.conn.cursor()
+            try:
+                current = cur.execute(
+                    "SELECT value FROM response_generation WHERE id=0"
+                ).fetchone()[0]
+                if generation is not None and generation != current:
+                    return False
+                cur.execute(
+                    "REPLACE INTO responses(key, scope, bucket, query, embedding, answer, created)"
+                    " VALUES(?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        self._key(scope, bucket, query), scope, bucket, query,
+                        embed_query(query).tobytes(), answer, now,
+                    ),
+                )
+                cur.execute("DELETE FROM responses WHERE bucket < ?", (bucket,))
+                cur.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY created DESC"
+                    " LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                self.conn.commit()
+            except sqlite3.DatabaseError:
+                self.conn.rollback()
+                raise
+            finally:
+                cur.close()
+        return True
+
+    def invalidate(self) -> None:
+        """Drop every cached answer after data changed."""
+        with self._lock:
+            try:
+                self.conn.execute("UPDATE response_generation SET value = value + 1 WHERE id=0")
+                self.conn.execute("DELETE FROM responses")
+                self.conn.commit()
+            except sqlite3.DatabaseError:
+                self.conn.rollback()
+                raise
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of stored answers."""
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "entries": entries,
+        }
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide :class:`ResponseCache`."""
+
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+    return _response_cache
+
+
+F = TypeVar("F", bound=Callable)
+
+
+def invalidates_responses(func: F) -> F:
+    """Decorate a tool that changes data to clear the response cache.
+
+    The cache is cleared even when the tool fails, as it may have changed
+    something before failing. The wrapper is marked with an
+    ``invalidates_responses`` attribute, by which agents tell their write
+    tools apart.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            get_response_cache().invalidate()
+
+    wrapper.invalidates_responses = True
+    return wrapper
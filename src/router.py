@@ -0,0 +1,263 @@
+"""Rule-based fast path for simple, unambiguous requests.
+
+Requests such as "todo list for 2026-10-18" or "events tomorrow" otherwise
+take a manager LLM call, a ``SendMessage`` hop and a sub-agent LLM call
+before the tool runs. :class:`IntentRouter` matches the whole message
+against a few anchored patterns and, on a match, reads the data the tool
+would read and renders the reply itself. Anything it does not fully
+understand goes to the agents as before.
+"""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = "%Y-%m-%d"
+
+# "today", "tomorrow", "yesterday", "this week", "next week" or an ISO date
+_WHEN = r"(?:(?:for|on|from)\s+)?(?P<when>today|tomorrow|yesterday|this week|next week|\d{4}-\d{2}-\d{2})"
+_ASK = r"(?:(?:show|get|list|check|read)(?:\s+me)?\s+|what(?:s| is| are)(?:\s+on)?\s+)?(?:my\s+)?"
+
+
+@dataclass(frozen=True)
+class Intent:
+    """A request the router answers by reading ``source`` directly.
+
+    ``source`` is a ``"module:attribute"`` path to a function, imported on
+    first use, returning the data to show and raising on failure.
+    ``arguments`` turns the matched period into its keyword arguments, or
+    returns ``None`` when it cannot answer for that period, and ``reply``
+    renders the data and the arguments as the reply to the user.
+    """
+
+    name: str
+    pattern: Pattern[str]
+    source: str
+    arguments: Callable[[datetime, datetime], Optional[dict]]
+    reply: Callable[[object, dict], str]
+
+
+def _period(when: Optional[str], now: datetime) -> Tuple[datetime, datetime]:
+    """Return the start and end of the period named by ``when``."""
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if when in (None, "today"):
+        return today, today + timedelta(days=1)
+    if when == "tomorrow":
+        return today + timedelta(days=1), today + timedelta(days=2)
+    if when == "yesterday":
+        return today - timedelta(days=1), today
+    if when in ("this week", "next week"):
+        start = today - timedelta(days=today.weekday())
+        if when == "next week":
+            start += timedelta(days=7)
+        return start, start + timedelta(days=7)
+    start = datetime.strptime(when, DATE_FORMAT)
+    return start, start + timedelta(days=1)
+
+
+def _pattern(nouns: str) -> Pattern[str]:
+    # The period may come before or after the noun ("today's events").
+    return re.compile(
+        rf"^(?:{_ASK}(?:{nouns})(?:\s+{_WHEN})?|{_WHEN.replace('when', 'when2')}s?\s+(?:{nouns}))$"
+    )
+
+
+def _day(value: str) -> str:
+    return datetime.fromisoformat(value).strftime("%A %d %B")
+
+
+def _period_name(start: str, end: str) -> str:
+    first, last = datetime.fromisoformat(start), datetime.fromisoformat(end)
+    if last - first == timedelta(days=1):
+        return f"on {_day(start)}"
+    return f"from {_day(start)} to {(last - timedelta(days=1)).strftime('%A %d %B')}"
+
+
+def _todo_reply(tasks: List[dict], arguments: dict) -> str:
+    day = _day(arguments["date"])
+    if not tasks:
+        return f"You have no tasks on {day}."
+    lines = [f"Your todo list for {day}:"]
+    lines += [f"- {task['title']} ({task['status']})" for task in tasks]
+    return "\n".join(lines)
+
+
+def _event_reply(events: List[dict], arguments: dict) -> str:
+    period = _period_name(arguments["start_date"], arguments["end_date"])
+    if not events:
+        return f"You have no events {period}."
+    lines = [f"Your events {period}:"]
+    for event in events:
+        title = event.get("summary", "(no title)")
+        start = event["start"]
+        if "dateTime" in start:
+            # Shown in the event's own time zone
+            at = datetime.fromisoformat(start["dateTime"]).strftime("%a %d %b %H:%M")
+        else:
+            at = datetime.fromisoformat(start["date"]).strftime("%a %d %b") + ", all day"
+        lines.append(f"- {at}: {title}")
+    return "\n".join(lines)
+
+
+def _email_reply(messages: list, arguments: dict) -> str:
+    period = _period_name(arguments["from_date"], arguments["to_date"])
+    if not messages:
+        return f"You have no emails {period}."
+    lines = [f"Your emails {period}:"]
+    for msg in messages:
+        sender = msg.header("From", "Unknown sender").split("<")[0].strip().strip('"')
+        lines.append(f"- {sender}: {msg.header('Subject', '(no subject)')}")
+    return "\n".join(lines)
+
+
+INTENTS: List[Intent] = [
+    Intent(
+        name="todo_list",
+        pattern=_pattern(r"todo list|to do list|todos|to dos|tasks"),
+        source="src.tools.notion.mirror:tasks_on",
+        # The todo list is read one day at a time
+        arguments=lambda start, end: (
+            {"date": start.strftime(DATE_FORMAT)} if end - start == timedelta(days=1) else None
+        ),
+        reply=_todo_reply,
+    ),
+    Intent(
+        name="calendar_events",
+        pattern=_pattern(r"calendar|events|meetings|schedule|agenda"),
+        source="src.tools.calendar.cache:events_between",
+        arguments=lambda start, end: {
+            "start_date": start.isoformat(), "end_date": end.isoformat(),
+        },
+        reply=_event_reply,
+    ),
+    Intent(
+        name="emails",
+        pattern=_pattern(r"emails|inbox|mails|mail"),
+        source="src.tools.email.read_emails:list_emails",
+        arguments=lambda start, end: {
+            "from_date": start.isoformat(), "to_date": end.isoformat(), "email": None,
+        },
+        reply=_email_reply,
+    ),
+]
+
+
+def _split_message(message: str) -> Tuple[str, Optional[datetime]]:
+    """Return the request text and the ``Current Date/time`` sent with it."""
+    match = re.search(r"^Current Date/time:\s*(\d{4}-\d{2}-\d{2} \d{2}:\d{2})", message, re.MULTILINE)
+    now = datetime.strptime(match.group(1), "%Y-%m-%d %H:%M") if match else None
+    text = re.sub(r"^Current Date/time:.*$", "", message, flags=re.MULTILINE)
+    text = re.sub(r"^\s*Message:\s*", "", text.strip(), flags=re.IGNORECASE)
+    text = re.sub(r"[^\w\s-]", "", text.lower().replace("'", ""))
+    # Hyphens only matter inside dates: "to-do list" reads as "to do list"
+    text = re.sub(r"(?<!\d)-|-(?!\d)", " ", text)
+    return " ".join(text.split()), now
+
+
+class IntentRouter:
+    """Answer high-confidence requests without the agents.
+
+    Only messages matching an intent pattern as a whole are routed, so
+    "events tomorrow" is answered directly while "move tomorrow's events"
+    falls back. Requests whose source fails fall back as well.
+
+    :meth:`stats` reports how many requests were routed and, from the time
+    taken by routed and fallback requests, the latency saved.
+    """
+
+    def __init__(
+        self,
+        intents: Optional[List[Intent]] = None,
+        sources: Optional[Dict[str, Callable[..., object]]] = None,
+    ):
+        self.intents = INTENTS if intents is None else intents
+        self._sources: Dict[str, Callable[..., object]] = dict(sources or {})
+        self._lock = threading.Lock()
+        self.routed: Dict[str, int] = {}
+        self.fallbacks = 0
+        self.routed_seconds = 0.0
+        self.fallback_seconds = 0.0
+
+    def match(self, message: str, now: Optional[datetime] = None) -> Optional[Tuple[Intent, dict]]:
+        """Return the intent matching ``message`` and the tool arguments."""
+        text, sent_at = _split_message(message)
+        for intent in self.intents:
+            m = intent.pattern.match(text)
+            if m is None:
+                continue
+            when = m.groupdict().get("when") or m.groupdict().get("when2")
+            try:
+                start, end = _period(when, now or sent_at or datetime.now())
+            except ValueError:  # e.g. 2026-02-30
+                return None
+            arguments = intent.arguments(start, end)
+            return (intent, arguments) if arguments is not None else None
+        return None
+
+    def _source(self, path: str) -> Callable[..., object]:
+        if path not in self._sources:
+            module_name, _, attr = path.partition(":")
+            self._sources[path] = getattr(importlib.import_module(module_name), attr)
+        return self._sources[path]
+
+    def route(self, message: str, now: Optional[datetime] = None) -> Optional[str]:
+        """Answer ``message`` directly, or return ``None`` to fall back."""
+        matched = self.match(message, now)
+        if matched is None:
+            return None
+        intent, arguments = matched
+        started = time.perf_counter()
+        try:
+            answer = intent.reply(self._source(intent.source)(**arguments), arguments)
+        except Exception:
+            logger.exception("Routed %s failed, falling back to the agents", intent.name)
+            return None
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.routed[intent.name] = self.routed.get(intent.name, 0) + 1
+            self.routed_seconds += elapsed
+        print(f"--- Routed to {intent.name} ({elapsed * 1000:.0f} ms) ---")
+        return answer
+
+    def record_fallback(self, seconds: float) -> None:
+        """Record the time the agents took for a request that was not routed."""
+        with self._lock:
+            self.fallbacks += 1
+            self.fallback_seconds += seconds
+
+    def stats(self) -> Dict[str, object]:
+        """Return the hit rate, mean latencies and estimated time saved."""
+        with self._lock:
+            routed = sum(self.routed.values())
+            total = routed + self.fallbacks
+            routed_ms = self.routed_seconds / routed * 1000 if routed else 0.0
+            agent_ms = self.fallback_seconds / self.fallbacks * 1000 if self.fallbacks else 0.0
+            return {
+                "requests": total,
+                "routed": routed,
+                "fallbacks": self.fallbacks,
+                "hit_rate": routed / total if total else 0.0,
+                "intents": dict(self.routed),
+                "routed_ms": round(routed_ms, 1),
+                "agent_ms": round(agent_ms, 1),
+                # Estimated from the mean time of requests the agents handled
+                "saved_ms": round(routed * max(0.0, agent_ms - routed_ms), 1),
+            }
+
+    def format_stats(self) -> str:
+        """Render :meth:`stats` on one line."""
+        s = self.stats()
+        return (
+            f"router: {s['routed']}/{s['requests']} routed ({s['hit_rate']:.0%}), "
+            f"{s['routed_ms']} ms vs {s['agent_ms']} ms via agents, "
+            f"~{s['saved_ms'] / 1000:.1f} s saved"
+        )
@@ -1,4 +1,6 @@
+from .check_availability import check_availability
 from .create_event import add_event_to_calendar
 from .get_events import get_calendar_events
+from .next_events import get_next_events
 
-__all__ = ['add_event_to_calendar', 'get_calendar_events']
+__all__ = ['add_event_to_calendar', 'check_availability', 'get_calendar_events', 'get_next_events']
@@ -0,0 +1,202 @@
+"""In-memory cache of the primary Google Calendar.
+
+The first sync lists every event, following ``nextPageToken`` to the
+last page, and keeps the ``nextSyncToken`` it ends with. Later syncs send
+that token and receive only the events created, changed or cancelled
+since, so a quiet calendar costs one small request. A sync runs when the
+cache is older than ``max_age`` seconds or has been invalidated by a
+change made from the assistant.
+
+Events are kept sorted by start time along with the longest event
+duration, so the events overlapping a range are found by bisecting to
+``range start - longest duration`` and scanning until ``range end``.
+Range queries, free/busy checks and "what's next" are answered from it.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+
+from src.config import CALENDAR_SYNC_MAX_AGE
+from src.google_services import get_service
+
+
+def parse_datetime(value: str) -> datetime:
+    """Parse an ISO date or date-time, taken as UTC when it has no offset."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _event_time(value: dict) -> datetime:
+    # All-day events only have a date
+    return parse_datetime(value.get("dateTime") or value["date"])
+
+
+class CalendarCache:
+    """Events of a calendar kept in sync with ``syncToken`` incremental sync.
+
+    Parameters
+    ----------
+    service : callable, optional
+        Returns the Calendar API client; :func:`~src.google_services.get_service`
+        by default, since clients are per thread.
+    calendar_id : str, optional
+        Calendar to mirror.
+    max_age : float, optional
+        Seconds after which a read syncs the cache first.
+    """
+
+    def __init__(
+        self,
+        service: Optional[Callable[[], object]] = None,
+        calendar_id: str = "primary",
+        max_age: float = CALENDAR_SYNC_MAX_AGE,
+    ) -> None:
+        self._service = service or (lambda: get_service("calendar", "v3"))
+        self.calendar_id = calendar_id
+        self.max_age = max_age
+        self._events: Dict[str, dict] = {}
+        self._sync_token: Optional[str] = None
+        self._synced = 0.0
+        # Interval index: events sorted by start, and the longest duration
+        self._starts: List[Tuple[datetime, str]] = []
+        self._index: List[Tuple[datetime, datetime, dict]] = []
+        self._max_duration = timedelta(0)
+        self._lock = threading.RLock()
+        self.stats = {"full_syncs": 0, "incremental_syncs": 0, "requests": 0}
+
+    def _list(self, **params) -> Tuple[List[dict], Optional[str]]:
+        """Return the events of every page of ``events().list`` and the sync token."""
+        events: List[dict] = []
+        service = self._service()
+        page_token = None
+        while True:
+            response = service.events().list(
+                calendarId=self.calendar_id,
+                singleEvents=True,
+                pageToken=page_token,
+                maxResults=2500,
+                **params,
+            ).execute()
+            self.stats["requests"] += 1
+            events.extend(response.get("items", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return events, response.get("nextSyncToken")
+
+    def _reindex(self) -> None:
+        index = []
+        for event in self._events.values():
+            try:
+                index.append((_event_time(event["start"]), _event_time(event["end"]), event))
+            except (KeyError, ValueError):
+                continue
+        index.sort(key=lambda item: (item[0], item[2]["id"]))
+        self._index = index
+        self._starts = [(start, event["id"]) for start, _, event in index]
+        self._max_duration = max((end - start for start, end, _ in index), default=timedelta(0))
+
+    def sync(self, full: bool = False) -> int:
+        """Fetch the events changed since the last sync, or all of them.
+
+        A full sync also runs when there is no sync token yet or Google
+        expired it. Returns the number of events received.
+        """
+        with self._lock:
+            started = time.time()
+            items = None
+            if self._sync_token and not full:
+                try:
+                    items, token = self._list(syncToken=self._sync_token)
+                    self.stats["incremental_syncs"] += 1
+                except HttpError as error:
+                    # 410 Gone: the token expired and the calendar must be listed again
+                    if error.resp.status != 410:
+                        raise
+            if items is None:
+                items, token = self._list()
+                self._events = {}
+                self.stats["full_syncs"] += 1
+            for event in items:
+                if event.get("status") == "cancelled":
+                    self._events.pop(event["id"], None)
+                else:
+                    self._events[event["id"]] = event
+            self._sync_token = token
+            self._synced = started
+            self._reindex()
+            return len(items)
+
+    def invalidate(self) -> None:
+        """Make the next read sync, after the calendar was changed."""
+        with self._lock:
+            self._synced = 0.0
+
+    def ensure_fresh(self) -> None:
+        """Sync unless the cache is younger than ``max_age`` seconds."""
+        with self._lock:
+            if time.time() - self._synced > self.max_age:
+                self.sync()
+
+    def events_between(self, start: datetime, end: datetime) -> List[dict]:
+        """Return the events overlapping ``[start, end)``, by start time."""
+        with self._lock:
+            self.ensure_fresh()
+            # No event starting before this can still be running at ``start``
+            first = bisect_left(self._starts, (start - self._max_duration,))
+            last = bisect_left(self._starts, (end,), lo=first)
+            return [
+                event
+                for event_start, event_end, event in self._index[first:last]
+                # Zero-length events only count when they start in the range
+                if event_end > start or event_start >= start
+            ]
+
+    def busy(self, start: datetime, end: datetime) -> List[dict]:
+        """Return the events that make ``[start, end)`` busy.
+
+        Events marked as free (``transparency: transparent``) and events
+        declined by the user are ignored.
+        """
+        return [
+            event
+            for event in self.events_between(start, end)
+            if event.get("transparency") != "transparent"
+            and not any(
+                a.get("self") and a.get("responseStatus") == "declined"
+                for a in event.get("attendees", [])
+            )
+        ]
+
+    def next_events(self, after: datetime, limit: int = 1) -> List[dict]:
+        """Return the next ``limit`` events starting at or after ``after``."""
+        with self._lock:
+            self.ensure_fresh()
+            first = bisect_left(self._starts, (after,))
+            return [event for _, _, event in self._index[first:first + limit]]
+
+
+_cache: Optional[CalendarCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_calendar_cache() -> CalendarCache:
+    """Return the process-wide calendar cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CalendarCache()
+        return _cache
+
+
+def events_between(start_date: str, end_date: str) -> List[dict]:
+    """Return the events between two ISO dates from the process-wide cache."""
+    return get_calendar_cache().events_between(parse_datetime(start_date), parse_datetime(end_date))
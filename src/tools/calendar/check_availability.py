@@ -0,0 +1,23 @@
+from langsmith import traceable
+from pydantic import BaseModel, Field
+from langchain_core.tools import tool
+from googleapiclient.errors import HttpError
+from .cache import get_calendar_cache, parse_datetime
+from .get_events import format_event
+
+class CheckAvailabilityInput(BaseModel):
+    start_time: str = Field(description="Start of the time slot to check")
+    end_time: str = Field(description="End of the time slot to check")
+
+@tool("CheckAvailability", args_schema=CheckAvailabilityInput)
+@traceable(run_type="tool", name="CheckAvailability")
+def check_availability(start_time: str, end_time: str):
+    "Use this to check if I am free between 2 times"
+    try:
+        busy = get_calendar_cache().busy(parse_datetime(start_time), parse_datetime(end_time))
+        if not busy:
+            return f"Free between {start_time} and {end_time}."
+        return "Busy with:\n" + "\n".join(format_event(event) for event in busy)
+
+    except (HttpError, ValueError) as error:
+        return f"An error occurred: {error}"
@@ -2,9 +2,10 @@ from datetime import datetime, timedelta
 from langsmith import traceable
 from pydantic import BaseModel, Field
 from langchain_core.tools import tool
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from src.utils import get_credentials
+from src.google_services import get_service
+from src.response_cache import invalidates_responses
+from .cache import get_calendar_cache
 
 class AddEventToCalendarInput(BaseModel):
     title: str = Field(description="Title of the event")
@@ -13,11 +14,11 @@ class AddEventToCalendarInput(BaseModel):
 
 @tool("AddEventToCalendar", args_schema=AddEventToCalendarInput)
 @traceable(run_type="tool", name="AddEventToCalendar")
+@invalidates_responses
 def add_event_to_calendar(title: str, description: str, start_time: str):
     "Use this to create a new event in my calendar"
     try:
-        creds = get_credentials()
-        service = build("calendar", "v3", credentials=creds)
+        service = get_service("calendar", "v3")
 
         # Convert the string to a datetime object
         event_datetime = datetime.fromisoformat(start_time)
@@ -36,6 +37,7 @@ def add_event_to_calendar(title: str, description: str, start_time: str):
         }
 
         event = service.events().insert(calendarId='primary', body=event).execute()
+        get_calendar_cache().invalidate()
         return f"Event created successfully. Event ID: {event.get('id')}"
 
     except HttpError as error:
@@ -0,0 +1,23 @@
+from datetime import datetime, timezone
+from langsmith import traceable
+from pydantic import BaseModel, Field
+from langchain_core.tools import tool
+from googleapiclient.errors import HttpError
+from .cache import get_calendar_cache
+from .get_events import format_event
+
+class GetNextEventsInput(BaseModel):
+    count: int = Field(default=1, description="Number of upcoming events to return")
+
+@tool("GetNextEvents", args_schema=GetNextEventsInput)
+@traceable(run_type="tool", name="GetNextEvents")
+def get_next_events(count: int = 1):
+    "Use this to get my next upcoming calendar events"
+    try:
+        events = get_calendar_cache().next_events(datetime.now(timezone.utc), limit=max(1, count))
+        if events:
+            return "\n".join(format_event(event) for event in events)
+        return "No upcoming events."
+
+    except HttpError as error:
+        return f"An error occurred: {error}"
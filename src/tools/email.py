@@ -5,7 +5,7 @@ from __future__ import annotations
 import sqlite3
 from typing import Dict, Any
 
-from openai import OpenAI
+from src.utils import get_openai_client
 
 
 def generate_reply(msg: Dict[str, Any]) -> str:
@@ -28,7 +28,7 @@ def generate_reply(msg: Dict[str, Any]) -> str:
         f"{body}\n---"
     )
 
-    client = OpenAI()
+    client = get_openai_client()
     response = client.chat.completions.create(
         model="gpt-4o-mini",
         messages=[{"role": "user", "content": prompt}],
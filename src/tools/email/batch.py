@@ -0,0 +1,94 @@
+"""Batched retrieval of Gmail messages."""
+
+from __future__ import annotations
+
+import time
+from typing import Dict, Iterable, List, Optional
+
+from src.config import GMAIL_BATCH_RETRIES, GMAIL_BATCH_SIZE
+
+# HTTP statuses worth retrying; anything else (e.g. 404 for a message deleted
+# between the history walk and the fetch) is dropped.
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _status(exc: Exception) -> int | None:
+    resp = getattr(exc, "resp", None)
+    status = getattr(resp, "status", None)
+    return int(status) if status is not None else None
+
+
+def batch_get_messages(
+    service,
+    msg_ids: Iterable[str],
+    format: str = "full",
+    metadata_headers: Optional[List[str]] = None,
+    batch_size: int = GMAIL_BATCH_SIZE,
+    max_retries: int = GMAIL_BATCH_RETRIES,
+    backoff: float = 1.0,
+    failed_ids: Optional[List[str]] = None,
+) -> List[Dict]:
+    """Fetch Gmail messages using batch HTTP requests.
+
+    Parameters
+    ----------
+    service :
+        Authorised Gmail API service.
+    msg_ids : iterable of str
+        IDs of the messages to fetch.
+    format : str, optional
+        Gmail ``format`` parameter passed to ``messages().get``.
+    metadata_headers : list of str, optional
+        Headers to include when ``format`` is ``"metadata"``.
+    batch_size : int, optional
+        Maximum number of sub-requests per batch round trip.
+    max_retries : int, optional
+        How many times failed sub-requests are re-submitted.
+    backoff : float, optional
+        Base delay in seconds between retry rounds, doubled each round.
+    failed_ids : list of str, optional
+        Receives the IDs whose sub-requests still failed with a retryable
+        status after the last retry, so callers can fetch them again later.
+
+    Returns
+    -------
+    list of dict
+        Successfully fetched messages, in the order of ``msg_ids``.
+    """
+
+    ids = list(dict.fromkeys(msg_ids))
+    pending = ids
+    get_kwargs = {"userId": "me", "format": format}
+    if metadata_headers is not None:
+        get_kwargs["metadataHeaders"] = metadata_headers
+    fetched: Dict[str, Dict] = {}
+    batch_size = max(1, batch_size)
+
+    for attempt in range(max_retries + 1):
+        if not pending:
+            break
+        if attempt:
+            time.sleep(backoff * 2 ** (attempt - 1))
+
+        failed: List[str] = []
+
+        def callback(request_id, response, exception):
+            if exception is None:
+                fetched[request_id] = response
+            elif _status(exception) in RETRYABLE_STATUSES:
+                failed.append(request_id)
+
+        for start in range(0, len(pending), batch_size):
+            batch = service.new_batch_http_request(callback=callback)
+            for msg_id in pending[start:start + batch_size]:
+                batch.add(
+                    service.users().messages().get(id=msg_id, **get_kwargs),
+                    request_id=msg_id,
+                )
+            batch.execute()
+
+        pending = failed
+
+    if failed_ids is not None:
+        failed_ids.extend(pending)
+    return [fetched[msg_id] for msg_id in ids if msg_id in fetched]
@@ -0,0 +1,153 @@
+"""Gmail message retrieval shared by the poller, digest and tools."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional
+
+from .batch import batch_get_messages
+
+
+class IncompleteFetchError(Exception):
+    """Raised by :func:`fetch_new_messages` when some messages could not be fetched.
+
+    ``messages`` holds the messages changed before the first one that
+    failed, and ``history_id`` a history ID to resume from so that the
+    failed messages are listed again.
+    """
+
+    def __init__(self, failed_ids: List[str], messages: List[Dict], history_id: str) -> None:
+        super().__init__(f"{len(failed_ids)} Gmail message(s) could not be fetched")
+        self.failed_ids = failed_ids
+        self.messages = messages
+        self.history_id = history_id
+
+
+def get_messages(
+    service,
+    msg_ids: Iterable[str],
+    format: str = 'full',
+    metadata_headers: Optional[List[str]] = None,
+    batch_size: Optional[int] = None,
+    cache=None,
+    min_history_ids: Optional[Dict[str, int]] = None,
+    failed_ids: Optional[List[str]] = None,
+) -> List[Dict]:
+    """Fetch Gmail messages by ID, preserving the order of ``msg_ids``.
+
+    Messages are fetched one request at a time unless ``batch_size`` is
+    given, in which case :func:`batch_get_messages` is used. When a
+    :class:`~src.db.MessageCache` is passed as ``cache``, cached copies are
+    returned without a request unless they predate the ``historyId`` given
+    for that message in ``min_history_ids``; fetched messages are stored.
+    IDs that still failed after the batch retries are added to
+    ``failed_ids``.
+    """
+    msg_ids = list(dict.fromkeys(msg_ids))
+    min_history_ids = min_history_ids or {}
+    found: Dict[str, Dict] = {}
+    if cache is not None:
+        for msg_id in msg_ids:
+            msg = cache.get(msg_id, format, min_history_ids.get(msg_id))
+            if msg is not None:
+                found[msg_id] = msg
+    missing = [msg_id for msg_id in msg_ids if msg_id not in found]
+
+    if not missing:
+        fetched = []
+    elif batch_size:
+        fetched = batch_get_messages(
+            service,
+            missing,
+            format=format,
+            metadata_headers=metadata_headers,
+            batch_size=batch_size,
+            failed_ids=failed_ids,
+        )
+    else:
+        get_kwargs = {'userId': 'me', 'format': format}
+        if metadata_headers is not None:
+            get_kwargs['metadataHeaders'] = metadata_headers
+        fetched = [
+            service.users().messages().get(id=msg_id, **get_kwargs).execute()
+            for msg_id in missing
+        ]
+
+    for msg in fetched:
+        if cache is not None:
+            cache.put(msg, format)
+        found[msg['id']] = msg
+    return [found[msg_id] for msg_id in msg_ids if msg_id in found]
+
+
+def fetch_new_messages(
+    service,
+    history_id: str,
+    batch_size: Optional[int] = None,
+    format: str = 'full',
+    metadata_headers: Optional[List[str]] = None,
+    cache=None,
+    history_types: Optional[List[str]] = None,
+) -> List[Dict]:
+    """Fetch Gmail messages newer than a specific history ID.
+
+    When ``batch_size`` is given, messages are retrieved through Gmail batch
+    requests of at most ``batch_size`` sub-requests each instead of one
+    ``messages().get`` round trip per message. ``format`` and
+    ``metadata_headers`` allow a cheap ``"metadata"`` fetch when only
+    headers and labels are needed. With a ``cache``, a message is only
+    re-fetched if a history record newer than the cached copy touched it.
+    ``history_types`` restricts the changes listed, e.g. to
+    ``["messageAdded"]`` so that label changes do not list a message again.
+
+    Raises :class:`IncompleteFetchError` when some messages could not be
+    fetched, so the caller does not move its history cursor past them.
+    """
+    latest_change: Dict[str, int] = {}
+    page_token = None
+
+    while True:
+        kwargs = {'userId': 'me', 'startHistoryId': history_id}
+        if page_token:
+            kwargs['pageToken'] = page_token
+        if history_types:
+            kwargs['historyTypes'] = history_types
+        response = (
+            service.users()
+            .history()
+            .list(**kwargs)
+            .execute()
+        )
+        for record in response.get('history', []):
+            record_id = int(record.get('id', 0))
+            for msg in record.get('messages', []):
+                msg_id = msg.get('id')
+                if msg_id:
+                    latest_change[msg_id] = max(
+                        latest_change.get(msg_id, 0), record_id
+                    )
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+
+    failed_ids: List[str] = []
+    messages = get_messages(
+        service,
+        latest_change,
+        format=format,
+        metadata_headers=metadata_headers,
+        batch_size=batch_size,
+        cache=cache,
+        min_history_ids=latest_change,
+        failed_ids=failed_ids,
+    )
+    messages.sort(key=lambda m: int(m.get('internalDate', '0')))
+    if failed_ids:
+        # Resume just before the first change to a failed message; the
+        # messages changed after it are listed again then.
+        cutoff = min(latest_change[msg_id] for msg_id in failed_ids)
+        raise IncompleteFetchError(
+            failed_ids,
+            [m for m in messages if latest_change[m['id']] < cutoff],
+            str(cutoff - 1),
+        )
+    return messages
@@ -2,9 +2,8 @@ import re
 from langsmith import traceable
 from pydantic import BaseModel, Field
 from langchain_core.tools import tool
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from src.utils import get_credentials
+from src.google_services import get_service
 
 class FindContactEmailInput(BaseModel):
     name: str = Field(description="Name of the contact")
@@ -14,8 +13,7 @@ class FindContactEmailInput(BaseModel):
 def find_contact_email(name: str):
     "Use this to get the a contact email from his name"
     try:
-        creds = get_credentials()
-        service = build('people', 'v1', credentials=creds)
+        service = get_service('people', 'v1')
 
         # Search for the contact
         results = service.people().searchContacts(
@@ -5,6 +5,7 @@ from langchain_core.tools import tool
 from pydantic import BaseModel, Field
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from src.response_cache import invalidates_responses
 
 class SendEmailInput(BaseModel):
     to: str = Field(description="Email of the recipient")
@@ -13,6 +14,7 @@ class SendEmailInput(BaseModel):
 
 @tool("SendEmail", args_schema=SendEmailInput)
 @traceable(run_type="tool", name="SendEmail")
+@invalidates_responses
 def send_email(to: str, subject: str, body: str):
     "Use this to send an email to my contacts"
     try:
@@ -1,9 +1,9 @@
-import os
 from enum import Enum
 from langsmith import traceable
 from pydantic import BaseModel, Field
 from langchain_core.tools import tool
-from notion_client import Client
+from .mirror import get_task_mirror
+from src.response_cache import invalidates_responses
 
 class TaskStatus(Enum):
     NOT_STARTED = "Not started"
@@ -16,12 +16,10 @@ class AddTaskInTodoListInput(BaseModel):
 
 @tool("AddTaskInTodoList", args_schema=AddTaskInTodoListInput)
 @traceable(run_type="tool", name="AddTaskInTodoList")
+@invalidates_responses
 def add_task_in_todo_list(task: str, date: str):
     "Use this to add a new task to my todo list"
     try:
-        # Initialize the Notion client
-        notion = Client(auth=os.getenv("NOTION_TOKEN"))
-
         # Create new task
         new_task = {
             "Title": {"title": [{"text": {"content": task}}]},
@@ -30,11 +28,8 @@ def add_task_in_todo_list(task: str, date: str):
         if date:
             new_task["Date"] = {"date": {"start": date}}
 
-        # Add task to Notion
-        notion.pages.create(
-            parent={"database_id": os.getenv("NOTION_DATABASE_ID")}, # Your database ID
-            properties=new_task
-        )
+        # Add task to Notion and to the local mirror
+        get_task_mirror().add_task(new_task)
 
         return f"Task '{task}' added successfully to Todo list for {date}."
     except Exception as e:
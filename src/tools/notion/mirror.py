@@ -0,0 +1,160 @@
+"""Local mirror of the Notion todo list.
+
+Instead of querying the whole database for every question, the mirror
+fetches only the pages edited since its ``last_edited_time`` watermark,
+following ``next_cursor`` until ``has_more`` is false, and answers
+todo-list questions from SQLite. It is synced when older than
+``max_age`` seconds, and rebuilt from a full query every
+``full_sync_hours`` since deleted pages never show up in a delta. New
+tasks are written to Notion and to the mirror at once.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Iterator, List, Optional
+
+from src.config import NOTION_FULL_SYNC_HOURS, NOTION_SYNC_MAX_AGE
+from src.db import TaskStore
+
+PAGE_SIZE = 100
+
+
+def _title(prop: dict) -> str:
+    return "".join(
+        part.get("plain_text") or part.get("text", {}).get("content", "")
+        for part in prop.get("title") or []
+    )
+
+
+def parse_task(page: dict) -> dict:
+    """Return the mirrored fields of a Notion task page."""
+    props = page["properties"]
+    date = (props.get("Date") or {}).get("date") or {}
+    status = (props.get("Status") or {}).get("status") or {}
+    return {
+        "id": page["id"],
+        "title": _title(props.get("Title") or {}),
+        "status": status.get("name", ""),
+        "due": date.get("start"),
+        "last_edited": page.get("last_edited_time", ""),
+    }
+
+
+class TaskMirror:
+    """Todo list answered from a :class:`~src.db.TaskStore` kept in sync with Notion.
+
+    Parameters
+    ----------
+    client : notion_client.Client
+        Notion API client.
+    store : TaskStore
+        Local mirror.
+    database_id : str
+        ID of the todo list database.
+    max_age : float, optional
+        Seconds after which a read syncs the mirror first.
+    full_sync_hours : float, optional
+        Hours between full syncs.
+    """
+
+    def __init__(
+        self,
+        client,
+        store: TaskStore,
+        database_id: str,
+        max_age: float = NOTION_SYNC_MAX_AGE,
+        full_sync_hours: float = NOTION_FULL_SYNC_HOURS,
+    ) -> None:
+        self.client = client
+        self.store = store
+        self.database_id = database_id
+        self.max_age = max_age
+        self.full_sync_hours = full_sync_hours
+        self._sync_lock = threading.Lock()
+
+    def _pages(self, **query) -> Iterator[dict]:
+        """Yield every page matching ``query``, one API page at a time."""
+        cursor = None
+        while True:
+            if cursor:
+                query["start_cursor"] = cursor
+            response = self.client.databases.query(
+                database_id=self.database_id, page_size=PAGE_SIZE, **query
+            )
+            yield from response["results"]
+            if not response.get("has_more"):
+                return
+            cursor = response["next_cursor"]
+
+    def sync(self, full: bool = False) -> int:
+        """Fetch the pages edited since the last sync, or all of them.
+
+        A full sync also runs when the last one is older than
+        ``full_sync_hours``. Returns the number of pages fetched.
+        """
+        with self._sync_lock:
+            started = time.time()
+            state = self.store.sync_state()
+            full = (
+                full
+                or not state["last_edited"]
+                or started - state["full_synced"] > self.full_sync_hours * 3600
+            )
+            query = {"sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}]}
+            if not full:
+                # Notion rounds edit times to the minute, so re-read the last one
+                query["filter"] = {
+                    "timestamp": "last_edited_time",
+                    "last_edited_time": {"on_or_after": state["last_edited"]},
+                }
+            pages = list(self._pages(**query))
+            removed = [p["id"] for p in pages if p.get("archived") or p.get("in_trash")]
+            tasks = [parse_task(p) for p in pages if p["id"] not in removed]
+            self.store.apply(tasks, removed, synced=started, full=full)
+            return len(pages)
+
+    def ensure_fresh(self) -> None:
+        """Sync unless the mirror is younger than ``max_age`` seconds."""
+        if time.time() - self.store.sync_state()["synced"] > self.max_age:
+            self.sync()
+
+    def tasks_on(self, date: str, status: Optional[str] = None) -> List[dict]:
+        """Return the tasks due on ``date`` (``YYYY-MM-DD``)."""
+        self.ensure_fresh()
+        return self.store.tasks_on(date, status)
+
+    def add_task(self, properties: dict) -> dict:
+        """Create a task page in Notion and mirror it straight away."""
+        page = self.client.pages.create(
+            parent={"database_id": self.database_id}, properties=properties
+        )
+        task = parse_task(page)
+        self.store.apply([task])
+        return task
+
+
+_mirror: Optional[TaskMirror] = None
+_mirror_lock = threading.Lock()
+
+
+def get_task_mirror() -> TaskMirror:
+    """Return the process-wide mirror, sharing one Notion client."""
+    global _mirror
+    with _mirror_lock:
+        if _mirror is None:
+            from notion_client import Client
+
+            _mirror = TaskMirror(
+                Client(auth=os.getenv("NOTION_TOKEN")),
+                TaskStore(),
+                os.getenv("NOTION_DATABASE_ID"),
+            )
+        return _mirror
+
+
+def tasks_on(date: str) -> List[dict]:
+    """Return the tasks due on ``date`` from the process-wide mirror."""
+    return get_task_mirror().tasks_on(date)
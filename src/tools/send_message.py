@@ -1,16 +1,41 @@
-from typing import Optional, Type, Dict
-from langchain_core.callbacks import CallbackManagerForToolRun
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Optional, Tuple, Type, Dict
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
+from langchain_core.tools import BaseTool
 from langsmith import traceable
 from pydantic import BaseModel
-from langchain.tools import BaseTool
 from src.agents.base import Agent
+from src.config import CONVERSATION_WORKERS, SUBAGENT_CONCURRENCY, SUBAGENT_TIMEOUT
+
+# Shared by every fan-out so its threads, and the Google clients they build,
+# are reused; sized for each conversation worker fanning out at once.
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, SUBAGENT_CONCURRENCY) * max(1, CONVERSATION_WORKERS),
+                thread_name_prefix="subagent",
+            )
+        return _executor
 
 
 class SendMessage(BaseTool):
     name: str = "SendMessage"
     description: str = "Use this to send a message to one of your sub-agents"
     args_schema: Type[BaseModel]
-    agent_mapping: Dict[str, "Agent"] = None 
+    agent_mapping: Dict[str, "Agent"] = None
 
     def send_message(self, recipient: str, message: str) -> str:
         agent = self.agent_mapping.get(recipient)
@@ -20,6 +45,14 @@ class SendMessage(BaseTool):
         else:
             return f"Invalid recipient: {recipient}"
 
+    async def asend_message(self, recipient: str, message: str) -> str:
+        agent = self.agent_mapping.get(recipient)
+        if agent:
+            response = await agent.ainvoke({"messages": [("human", message)]})
+            return response["messages"][-1].content
+        else:
+            return f"Invalid recipient: {recipient}"
+
     @traceable(run_type="tool", name="SendMessage")
     def _run(
         self,
@@ -27,4 +60,137 @@ class SendMessage(BaseTool):
         message: str,
         run_manager: Optional[CallbackManagerForToolRun] = None,
     ) -> str:
-        return self.send_message(recipient, message)
\ No newline at end of file
+        return self.send_message(recipient, message)
+
+    async def _arun(
+        self,
+        recipient: str,
+        message: str,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> str:
+        return await self.asend_message(recipient, message)
+
+
+class SendMessages(SendMessage):
+    """Send messages to several sub-agents at once and collect their answers.
+
+    The calls run concurrently, at most ``max_workers`` at a time, so the
+    manager waits for the slowest sub-agent rather than for all of them in
+    turn. A call to a read-only sub-agent that takes longer than
+    ``timeout`` seconds is reported as still running while the others'
+    answers are returned. Sub-agents that can change data, such as sending
+    an email, are always waited for: giving up on them could make the
+    manager ask again and do the change twice.
+    """
+
+    name: str = "SendMessages"
+    description: str = (
+        "Use this to send messages to several of your sub-agents in parallel "
+        "when their tasks do not depend on each other"
+    )
+    timeout: float = SUBAGENT_TIMEOUT
+    max_workers: int = SUBAGENT_CONCURRENCY
+
+    @staticmethod
+    def _pairs(messages) -> List[Tuple[str, str]]:
+        return [
+            (m["recipient"], m["message"]) if isinstance(m, dict)
+            else (m.recipient, m.message)
+            for m in messages
+        ]
+
+    @staticmethod
+    def merge_answers(recipients: List[str], answers: List[str]) -> str:
+        """Combine the answers into one tool result, one section per call."""
+        return "\n\n".join(
+            f"## {recipient}\n{answer}" for recipient, answer in zip(recipients, answers)
+        )
+
+    def _can_write(self, recipient: str) -> bool:
+        return bool(getattr(self.agent_mapping.get(recipient), "can_write", False))
+
+    def _still_running(self, recipient: str) -> str:
+        return (
+            f"{recipient} did not answer within {self.timeout:g}s and is still "
+            "running; it may still complete the request, so do not retry it."
+        )
+
+    def send_messages(self, messages) -> str:
+        pairs = self._pairs(messages)
+        if not pairs:
+            return "No messages to send."
+        executor = _get_executor()
+        writes = [self._can_write(recipient) for recipient, _ in pairs]
+        answers: List[Optional[str]] = [None] * len(pairs)
+        queued = list(range(len(pairs)))
+        running = {}
+        deadline = time.monotonic() + self.timeout
+        while queued or running:
+            # The pool is shared by every conversation, so each fan-out
+            # only holds ``max_workers`` of its threads.
+            while queued and len(running) < max(1, self.max_workers):
+                i = queued.pop(0)
+                if not writes[i] and time.monotonic() >= deadline:
+                    answers[i] = f"{pairs[i][0]} was not asked: the time limit of {self.timeout:g}s was reached."
+                    continue
+                # Copy the context so tracing keeps the calls under this run.
+                future = executor.submit(contextvars.copy_context().run, self.send_message, *pairs[i])
+                running[future] = i
+            if not running:
+                break
+            timeout = None
+            if not all(writes[i] for i in running.values()):
+                timeout = max(0.0, deadline - time.monotonic())
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                try:
+                    answers[i] = future.result()
+                except Exception as e:
+                    answers[i] = f"{pairs[i][0]} failed: {e}"
+            if not done:
+                # Past the deadline: stop waiting for the read-only calls,
+                # which finish in the background.
+                for future, i in list(running.items()):
+                    if not writes[i]:
+                        del running[future]
+                        answers[i] = self._still_running(pairs[i][0])
+        return self.merge_answers([r for r, _ in pairs], answers)
+
+    async def asend_messages(self, messages) -> str:
+        pairs = self._pairs(messages)
+        if not pairs:
+            return "No messages to send."
+        semaphore = asyncio.Semaphore(max(1, self.max_workers))
+
+        async def call(recipient, message):
+            async with semaphore:
+                try:
+                    if self._can_write(recipient):
+                        return await self.asend_message(recipient, message)
+                    return await asyncio.wait_for(
+                        self.asend_message(recipient, message), self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    # Cancelled, so unlike the threaded calls it is not running
+                    return f"{recipient} did not answer within {self.timeout:g}s."
+                except Exception as e:
+                    return f"{recipient} failed: {e}"
+
+        answers = await asyncio.gather(*(call(*pair) for pair in pairs))
+        return self.merge_answers([r for r, _ in pairs], list(answers))
+
+    @traceable(run_type="tool", name="SendMessages")
+    def _run(
+        self,
+        messages: list,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+    ) -> str:
+        return self.send_messages(messages)
+
+    async def _arun(
+        self,
+        messages: list,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> str:
+        return await self.asend_messages(messages)
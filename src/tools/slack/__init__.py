@@ -1,4 +1,5 @@
 from .send_messages import send_slack_message
 from .get_messages import get_slack_messages
+from .search_messages import search_slack_messages
 
-__all__ = ['send_slack_message', 'get_slack_messages']
+__all__ = ['send_slack_message', 'get_slack_messages', 'search_slack_messages']
@@ -0,0 +1,354 @@
+"""Incremental, concurrent ingestion of Slack messages.
+
+Only conversations the bot is a member of are listed (``users.conversations``
+with cursor pagination), and each is read from its local watermark, the
+timestamp of the newest message already fetched. Conversations whose
+``latest`` message is listed and not newer than the watermark are skipped.
+Slack does not list it for channels to bot tokens, so channels are read on
+every run unless ``SLACK_QUIET_MAX_INTERVAL`` is raised above
+``SLACK_INGEST_INTERVAL``: quiet channels are then checked less and less
+often, up to that interval, at the cost of seeing their new messages and
+mentions that much later. Calls are spread over
+a few threads and paced per Slack rate-limit tier; user names come from a
+cached bulk ``users.list``. Messages are copied into a
+:class:`~src.db.SlackMessageStore`, which the Slack tools query.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from slack_sdk.errors import SlackApiError
+
+from src.config import (
+    SLACK_CONCURRENCY,
+    SLACK_INGEST_INTERVAL,
+    SLACK_LOOKBACK_HOURS,
+    SLACK_QUIET_MAX_INTERVAL,
+    SLACK_USER_CACHE_TTL,
+    SLACK_USER_ID,
+)
+from src.db import KVStore, SlackMessageStore, get_db, get_slack_store
+from src.utils import RateLimiter
+
+# Calls per minute allowed by Slack's rate-limit tiers
+TIER_RATES = {2: 20, 3: 50, 4: 100}
+METHOD_TIERS = {
+    "users_conversations": 3,
+    "conversations_history": 3,
+    "users_list": 2,
+    "users_info": 4,
+}
+WATERMARK_KEY = "slack_watermark:{}"
+# "<next check>,<interval>" of a quiet channel, in seconds
+QUIET_KEY = "slack_quiet:{}"
+LAST_INGEST_KEY = "slack_last_ingest"
+PAGE_SIZE = 200
+
+_MENTION = re.compile(r"<@(\w+)>")
+
+
+class SlackApi:
+    """A Slack ``WebClient`` whose calls are paced per rate-limit tier.
+
+    Parameters
+    ----------
+    client : slack_sdk.WebClient
+        Client making the calls.
+    tier_rates : dict, optional
+        Calls per minute allowed for each tier, see :data:`TIER_RATES`.
+    """
+
+    def __init__(self, client, tier_rates: Optional[Dict[int, float]] = None) -> None:
+        self.client = client
+        rates = TIER_RATES if tier_rates is None else tier_rates
+        self._limiters = {tier: RateLimiter(rate / 60) for tier, rate in rates.items()}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def call(self, method: str, **kwargs):
+        """Call ``method`` once its tier allows another request."""
+        limiter = self._limiters.get(METHOD_TIERS.get(method, 3))
+        if limiter is not None:
+            limiter.acquire()
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        return getattr(self.client, method)(**kwargs)
+
+    def paginate(self, method: str, key: str, **kwargs) -> Iterator[dict]:
+        """Yield the ``key`` items of every page of ``method``."""
+        cursor = None
+        while True:
+            response = self.call(method, cursor=cursor, **kwargs)
+            yield from response.get(key) or []
+            cursor = (response.get("response_metadata") or {}).get("next_cursor")
+            if not cursor:
+                return
+
+
+class UserDirectory:
+    """Display names of workspace users, loaded in bulk and kept ``ttl`` seconds.
+
+    Users missing from the directory (e.g. who joined since it was loaded)
+    are looked up one by one and added to it.
+    """
+
+    def __init__(self, api: SlackApi, ttl: float = SLACK_USER_CACHE_TTL) -> None:
+        self.api = api
+        self.ttl = ttl
+        self._names: Dict[str, str] = {}
+        self._loaded = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _display_name(user: dict) -> str:
+        return user.get("real_name") or user.get("name") or user.get("id", "")
+
+    def _refresh(self) -> None:
+        self._names = {
+            user["id"]: self._display_name(user)
+            for user in self.api.paginate("users_list", "members", limit=PAGE_SIZE)
+        }
+        self._loaded = time.monotonic()
+
+    def name(self, user_id: str) -> str:
+        """Return the display name of ``user_id``."""
+        with self._lock:
+            if not self._loaded or time.monotonic() - self._loaded > self.ttl:
+                self._refresh()
+            if user_id not in self._names:
+                try:
+                    user = self.api.call("users_info", user=user_id)["user"]
+                    self._names[user_id] = self._display_name(user)
+                except SlackApiError:
+                    self._names[user_id] = user_id
+            return self._names[user_id]
+
+
+class SlackScanner:
+    """Copy new Slack messages into the local message store.
+
+    Parameters
+    ----------
+    api : SlackApi
+        Rate-limited client.
+    store : KVStore, optional
+        Where per-conversation watermarks are kept; the application
+        database by default.
+    messages : SlackMessageStore, optional
+        Where messages are copied to; the process-wide store by default.
+    users : UserDirectory, optional
+        Cache of user names; one sharing ``api`` by default.
+    max_workers : int, optional
+        Conversations read in parallel.
+    lookback_hours : float, optional
+        How far back a conversation without a watermark is read.
+    mention_of : str, optional
+        Slack user ID whose mentions are reported as unread; any mention
+        when empty.
+    quiet_max_interval : float, optional
+        Longest time a quiet channel goes without being checked; channels
+        are read on every run when it is not above ``SLACK_INGEST_INTERVAL``.
+    """
+
+    def __init__(
+        self,
+        api: SlackApi,
+        store: Optional[KVStore] = None,
+        messages: Optional[SlackMessageStore] = None,
+        users: Optional[UserDirectory] = None,
+        max_workers: int = SLACK_CONCURRENCY,
+        lookback_hours: float = SLACK_LOOKBACK_HOURS,
+        mention_of: str = SLACK_USER_ID,
+        quiet_max_interval: float = SLACK_QUIET_MAX_INTERVAL,
+    ) -> None:
+        self.api = api
+        self._store = store
+        self._messages = messages
+        self.users = users or UserDirectory(api)
+        self.max_workers = max(1, max_workers)
+        self.lookback_hours = lookback_hours
+        self.mention_of = mention_of or None
+        self.quiet_max_interval = quiet_max_interval
+        self._ingest_lock = threading.Lock()
+
+    @property
+    def store(self) -> KVStore:
+        if self._store is None:
+            self._store = get_db()
+        return self._store
+
+    @property
+    def messages(self) -> SlackMessageStore:
+        if self._messages is None:
+            self._messages = get_slack_store()
+        return self._messages
+
+    def conversations(self) -> List[dict]:
+        """Return the DMs and channels the bot is a member of."""
+        return list(self.api.paginate(
+            "users_conversations", "channels",
+            types="im,public_channel,private_channel",
+            exclude_archived=True,
+            limit=PAGE_SIZE,
+        ))
+
+    def _watermark(self, channel_id: str, now: float) -> str:
+        stored = self.store.get(WATERMARK_KEY.format(channel_id))
+        return stored or f"{now - self.lookback_hours * 3600:.6f}"
+
+    @staticmethod
+    def _latest(channel: dict) -> Optional[str]:
+        """Return the timestamp of the newest message listed for ``channel``."""
+        latest = channel.get("latest")
+        if isinstance(latest, dict):
+            return latest.get("ts")
+        return None
+
+    @property
+    def _backs_off(self) -> bool:
+        # Up to SLACK_INGEST_INTERVAL, every run is due anyway
+        return self.quiet_max_interval > SLACK_INGEST_INTERVAL
+
+    def _due(self, channel: dict, now: float) -> bool:
+        """Return whether ``channel`` may have messages newer than its watermark."""
+        watermark = self.store.get(WATERMARK_KEY.format(channel["id"]))
+        if not watermark:
+            return True
+        latest = self._latest(channel)
+        if latest is not None:
+            return float(latest) > float(watermark)
+        if channel.get("is_im") or not self._backs_off:
+            return True
+        quiet = self.store.get(QUIET_KEY.format(channel["id"]))
+        return not quiet or now >= float(quiet.split(",")[0])
+
+    def _quiet_state(self, channel: dict, active: bool, now: float) -> Optional[Tuple[str, str]]:
+        """Return the new quiet-channel entry of a channel just read, if it has one."""
+        if channel.get("is_im") or self._latest(channel) is not None or not self._backs_off:
+            return None
+        key = QUIET_KEY.format(channel["id"])
+        if active:
+            return key, ""
+        quiet = self.store.get(key)
+        interval = float(quiet.split(",")[1]) * 2 if quiet else SLACK_INGEST_INTERVAL
+        interval = min(interval, self.quiet_max_interval)
+        return key, f"{now + interval},{interval}"
+
+    def _new_messages(self, channel: dict, oldest: str) -> List[dict]:
+        """Return the messages of ``channel`` posted after ``oldest``, oldest first."""
+        messages = list(self.api.paginate(
+            "conversations_history", "messages",
+            channel=channel["id"], oldest=oldest, limit=PAGE_SIZE,
+        ))
+        return sorted(messages, key=lambda m: float(m["ts"]))
+
+    def _record(self, channel: dict, message: dict) -> Optional[dict]:
+        # An edit carries the edited message, which replaces the stored copy
+        if message.get("subtype") == "message_changed":
+            message = message.get("message") or {}
+        # Skip joins, deletions and the bot's own messages
+        if message.get("subtype") or message.get("bot_id") or not message.get("user"):
+            return None
+        text = message.get("text", "")
+        return {
+            "channel": channel["id"],
+            "ts": message["ts"],
+            "channel_name": channel.get("name") or channel["id"],
+            "channel_type": "DM" if channel.get("is_im") else "channel",
+            "user_id": message["user"],
+            "user": self.users.name(message["user"]),
+            "text": text,
+            "mentions": _MENTION.findall(text),
+        }
+
+    def _fetch_channel(self, channel: dict, now: float) -> Optional[Tuple[List[dict], Optional[str], str]]:
+        """Return the new records of ``channel``, its newest timestamp and the watermark read from.
+
+        Returns ``None`` when the channel could not be read.
+        """
+        oldest = self._watermark(channel["id"], now)
+        try:
+            messages = self._new_messages(channel, oldest)
+            # Naming users may reload the directory, which can fail as well
+            records = [r for r in (self._record(channel, m) for m in messages) if r]
+        except SlackApiError as e:
+            if e.response["error"] != "not_in_channel":
+                print(f"Error fetching history for channel {channel.get('name') or channel['id']}: {e}")
+            return None
+        return records, messages[-1]["ts"] if messages else None, oldest
+
+    def ingest(self) -> int:
+        """Copy messages posted since the last run and advance the watermarks.
+
+        Only conversations that may have new messages are read. Returns the
+        number of new messages stored.
+        """
+        with self._ingest_lock:
+            now = time.time()
+            channels = [c for c in self.conversations() if self._due(c, now)]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                fetched = pool.map(lambda c: self._fetch_channel(c, now), channels)
+                results = [(c, r) for c, r in zip(channels, fetched) if r is not None]
+            added = self.messages.add(r for _, (records, _, _) in results for r in records)
+            # Watermarks move only once the messages are stored; a channel
+            # without new messages keeps the one it was read from, so it is
+            # not read from the lookback window again
+            self.store.transaction([
+                *(
+                    (WATERMARK_KEY.format(channel["id"]), latest or oldest)
+                    for channel, (_, latest, oldest) in results
+                ),
+                *(
+                    entry
+                    for channel, (_, latest, _) in results
+                    if (entry := self._quiet_state(channel, latest is not None, now))
+                ),
+                (LAST_INGEST_KEY, str(now)),
+            ])
+            return added
+
+    def ingest_if_stale(self, max_age: float = SLACK_INGEST_INTERVAL) -> int:
+        """Run :meth:`ingest` unless it ran less than ``max_age`` seconds ago."""
+        last = float(self.store.get(LAST_INGEST_KEY) or 0)
+        if time.time() - last < max_age:
+            return 0
+        return self.ingest()
+
+    def scan(self, max_age: float = SLACK_INGEST_INTERVAL) -> List[dict]:
+        """Return direct messages and mentions not reported before.
+
+        The background ingestion job keeps the store current; messages are
+        only ingested here when it last ran more than ``max_age`` seconds
+        ago. Messages are in time order.
+        """
+        self.ingest_if_stale(max_age)
+        return self.messages.take_unreported(self.mention_of)
+
+
+_scanner: Optional[SlackScanner] = None
+_scanner_lock = threading.Lock()
+
+
+def _client():
+    from slack_sdk import WebClient
+    from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
+
+    client = WebClient(token=os.getenv("SLACK_BOT_TOKEN"))
+    # Wait out Retry-After on HTTP 429 instead of failing
+    client.retry_handlers.append(RateLimitErrorRetryHandler(max_retry_count=2))
+    return client
+
+
+def get_scanner() -> SlackScanner:
+    """Return the process-wide scanner, so its user directory is reused."""
+    global _scanner
+    with _scanner_lock:
+        if _scanner is None:
+            _scanner = SlackScanner(SlackApi(_client()))
+        return _scanner
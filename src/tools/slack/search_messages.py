@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import Optional
+from langsmith import traceable
+from pydantic import BaseModel, Field
+from langchain_core.tools import tool
+from slack_sdk.errors import SlackApiError
+from .scanner import get_scanner
+
+class SearchSlackMessagesInput(BaseModel):
+    query: str = Field(default="", description="Words to look for in the messages, their authors or channel names")
+    only_dms: bool = Field(default=False, description="Only direct messages")
+    only_mentions: bool = Field(default=False, description="Only messages mentioning me")
+    channel: Optional[str] = Field(default=None, description="Name of the channel to search in")
+    from_date: Optional[str] = Field(default=None, description="Start of the time range (YYYY-MM-DD or YYYY-MM-DDTHH:MM)")
+    to_date: Optional[str] = Field(default=None, description="End of the time range (YYYY-MM-DD or YYYY-MM-DDTHH:MM)")
+
+@tool("SearchSlackMessages", args_schema=SearchSlackMessagesInput)
+@traceable(run_type="tool", name="SearchSlackMessages")
+def search_slack_messages(
+    query: str = "",
+    only_dms: bool = False,
+    only_mentions: bool = False,
+    channel: Optional[str] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+):
+    """
+    Use this tool to search Slack messages, including ones already read, by words, channel, DMs, mentions or dates.
+    """
+    try:
+        since = datetime.fromisoformat(from_date).timestamp() if from_date else None
+        until = datetime.fromisoformat(to_date).timestamp() if to_date else None
+    except ValueError as e:
+        return f"Invalid date: {e}"
+    try:
+        scanner = get_scanner()
+        # Normally kept fresh by the background ingestion
+        scanner.ingest_if_stale()
+        messages = scanner.messages.search(
+            query,
+            dms=only_dms,
+            mentions=only_mentions,
+            mention_of=scanner.mention_of,
+            channel=channel,
+            since=since,
+            until=until,
+        )
+        if not messages:
+          return "No messages found."
+
+        return messages
+
+    except SlackApiError as e:
+        print(f"Error searching messages: {e}")
+        return f"Error searching messages: {e}"
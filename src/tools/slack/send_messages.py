@@ -4,6 +4,7 @@ from pydantic import BaseModel, Field
 from langchain_core.tools import tool
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from src.response_cache import invalidates_responses
 
 class SendSlackMessageInput(BaseModel):
     channel: str = Field(..., description="The ID or name of the channel to send the message to.")
@@ -11,6 +12,7 @@ class SendSlackMessageInput(BaseModel):
 
 @tool("SendSlackMessage", args_schema=SendSlackMessageInput)
 @traceable(run_type="tool", name="SendSlackMessage")
+@invalidates_responses
 def send_slack_message(channel: str, message: str):
     """
     Use this tool to send a message to a specific Slack channel.
@@ -1,45 +1,167 @@
-import os 
+import asyncio
+import threading
+import time
+import weakref
 from datetime import datetime
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-
-SCOPES = [
-    "https://www.googleapis.com/auth/calendar.events",
-    "https://www.googleapis.com/auth/contacts.readonly",
-    'https://www.googleapis.com/auth/gmail.readonly'
-]
+from src.config import LLM_KEEPALIVE_EXPIRY, LLM_MAX_CONNECTIONS
 
 def get_current_date_time():
     return datetime.now().strftime("%Y-%m-%d %H:%M")
         
 def get_credentials():
     """
-    Get and refresh Google Contacts API credentials
+    Get the shared, refreshed Google API credentials (see ``src.google_services``)
     """
-    creds = None
-    if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open('token.json', 'w') as token:
-            token.write(creds.to_json())
-    return creds
+    from src.google_services import get_credentials as _get_credentials
+
+    return _get_credentials()
+
+
+class RateLimiter:
+    """Space out calls so at most ``rate`` start per second across threads."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until the caller may start its next call."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
 
 def extract_provider_and_model(model_string: str):
     return model_string.split("/", 1)
 
-def get_llm_by_provider(model_string, temperature=0.1):
-    llm_provider, model = extract_provider_and_model(model_string)
-    # Else find provider
+# Process-wide registry of LLM clients, keyed by (provider, model, temperature)
+_llm_clients = {}
+_llm_lock = threading.RLock()
+_llm_stats = {"hits": 0, "misses": 0, "requests": 0}
+_http_client = None
+_async_http_client = None
+_openai_client = None
+
+
+def _count_request(request):
+    with _llm_lock:
+        _llm_stats["requests"] += 1
+
+
+async def _acount_request(request):
+    _count_request(request)
+
+
+def _limits():
+    import httpx
+
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_http_client():
+    """Return the keep-alive HTTP client shared by all LLM clients.
+
+    Reusing one connection pool lets warm calls skip the TCP and TLS
+    handshakes.
+    """
+    global _http_client
+    with _llm_lock:
+        if _http_client is None:
+            import httpx
+
+            _http_client = httpx.Client(
+                limits=_limits(),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                event_hooks={"request": [_count_request]},
+            )
+        return _http_client
+
+
+class _LoopPools:
+    """Async transport keeping one keep-alive connection pool per event loop.
+
+    Connections belong to the loop that opened them and the app runs an
+    event loop per thread, so every loop gets its own pool; a pool goes
+    away with its loop.
+    """
+
+    def __init__(self):
+        self._pools = weakref.WeakKeyDictionary()
+
+    def transport(self):
+        loop = asyncio.get_running_loop()
+        with _llm_lock:
+            transport = self._pools.get(loop)
+            if transport is None:
+                import httpx
+
+                transport = self._pools[loop] = httpx.AsyncHTTPTransport(limits=_limits())
+            return transport
+
+    def connections(self):
+        """Return the connections of the pools of loops still open."""
+        with _llm_lock:
+            pools = [t for loop, t in self._pools.items() if not loop.is_closed()]
+        return [c for t in pools for c in t._pool.connections]
+
+    async def handle_async_request(self, request):
+        return await self.transport().handle_async_request(request)
+
+    async def aclose(self):
+        with _llm_lock:
+            transport = self._pools.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+def get_async_http_client():
+    """Return the async counterpart of :func:`get_http_client`.
+
+    Used by ``ainvoke``; each event loop keeps its own warm connections.
+    """
+    global _async_http_client
+    with _llm_lock:
+        if _async_http_client is None:
+            import httpx
+
+            _async_http_client = httpx.AsyncClient(
+                transport=_LoopPools(),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                event_hooks={"request": [_acount_request]},
+            )
+        return _async_http_client
+
+
+def get_openai_client():
+    """Return a shared raw ``OpenAI`` client using the pooled HTTP client."""
+    global _openai_client
+    with _llm_lock:
+        if _openai_client is None:
+            from openai import OpenAI
+
+            _openai_client = OpenAI(http_client=get_http_client())
+        return _openai_client
+
+
+def _build_llm(llm_provider, model, temperature):
     if llm_provider == "openai":
         from langchain_openai import ChatOpenAI
-        llm = ChatOpenAI(model=model, temperature=temperature)
+        llm = ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+        )
     elif llm_provider == "anthropic":
         from langchain_anthropic import ChatAnthropic
         llm = ChatAnthropic(model=model, temperature=temperature)  # Use the correct model name
@@ -52,4 +174,62 @@ def get_llm_by_provider(model_string, temperature=0.1):
     # ... add elif blocks for other providers ...
     else:
         raise ValueError(f"Unsupported LLM provider: {llm_provider}")
-    return llm
\ No newline at end of file
+    return llm
+
+
+def get_llm_by_provider(model_string, temperature=0.1):
+    """Return the shared chat model for ``model_string`` and ``temperature``.
+
+    Models are created once per process and reused by every caller; chat
+    models are safe to call from several threads at once.
+    """
+    llm_provider, model = extract_provider_and_model(model_string)
+    key = (llm_provider, model, temperature)
+    with _llm_lock:
+        llm = _llm_clients.get(key)
+        if llm is not None:
+            _llm_stats["hits"] += 1
+            return llm
+        _llm_stats["misses"] += 1
+        llm = _build_llm(llm_provider, model, temperature)
+        _llm_clients[key] = llm
+        return llm
+
+
+def _pool_usage():
+    """Return the open and idle connections of the LLM HTTP pools.
+
+    The pools are httpx internals, so when they are not laid out as
+    expected both counts are ``"unknown"`` rather than an error.
+    """
+    try:
+        connections = []
+        if _http_client is not None:
+            connections += _http_client._transport._pool.connections
+        if _async_http_client is not None:
+            connections += _async_http_client._transport.connections()
+        return len(connections), sum(1 for c in connections if c.is_idle())
+    except (AttributeError, TypeError):
+        return "unknown", "unknown"
+
+
+def llm_pool_stats():
+    """Return registry hits/misses, cached models and HTTP pool usage."""
+    with _llm_lock:
+        stats = dict(_llm_stats, models=sorted("/".join(map(str, k)) for k in _llm_clients))
+        stats["connections"], stats["idle_connections"] = _pool_usage()
+        return stats
+
+
+def reset_llm_clients():
+    """Close the shared HTTP client and forget every cached model."""
+    global _http_client, _async_http_client, _openai_client
+    with _llm_lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
+        # Async pools cannot be closed from here; they go with their loops
+        _async_http_client = None
+        _openai_client = None
+        _llm_clients.clear()
+        _llm_stats.update(hits=0, misses=0, requests=0)
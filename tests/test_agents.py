@@ -0,0 +1,249 @@
+import asyncio
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import langgraph.prebuilt
+
+import src.agents.base.agent as agent_module
+from src.agents.base import Agent, AgentsOrchestrator
+from src.profiling import parse_importtime, top_packages
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def make_agent(name, tools=None, sub_agents=None, memory=None):
+    return Agent(
+        name=name,
+        description=f"{name} agent",
+        system_prompt="be helpful",
+        tools=list(tools or []),
+        sub_agents=list(sub_agents or []),
+        model="openai/gpt-4o-mini",
+        temperature=0.1,
+        memory=memory,
+    )
+
+
+def fake_compile(monkeypatch, delay=0.0):
+    compiled = []
+
+    def create_react_agent(llm, tools, **kwargs):
+        time.sleep(delay)
+        compiled.append((tools, kwargs))
+        return object()
+
+    monkeypatch.setattr(langgraph.prebuilt, "create_react_agent", create_react_agent)
+    monkeypatch.setattr(agent_module, "get_llm_by_provider", lambda *a: "llm")
+    return compiled
+
+
+def test_personal_assistant_startup_defers_heavy_imports():
+    code = (
+        "import sqlite3, sys\n"
+        "from src.agents.personal_assistant import PersonalAssistant\n"
+        "PersonalAssistant(sqlite3.connect(':memory:'))\n"
+        "heavy = ['langgraph.prebuilt', 'langgraph.checkpoint.sqlite', 'selenium',\n"
+        "         'tavily', 'notion_client', 'slack_sdk', 'twilio', 'langchain']\n"
+        "print(','.join(m for m in heavy if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+
+def test_tools_and_graph_are_built_on_first_use(monkeypatch):
+    compiled = fake_compile(monkeypatch)
+    worker = make_agent("worker", tools=["src.gmail_message:parse_message"])
+    manager = make_agent("manager", sub_agents=[worker], memory=lambda: "saver")
+    AgentsOrchestrator(main_agent=manager, agents=[manager, worker])
+
+    assert compiled == []
+    assert worker.tools == ["src.gmail_message:parse_message"]
+
+    manager._ensure_agent()
+    worker._ensure_agent()
+
+    (manager_tools, manager_kwargs), (worker_tools, _) = compiled
+    assert [t.name for t in manager_tools] == ["SendMessage", "SendMessages"]
+    assert manager_kwargs["checkpointer"] == "saver"
+    from src.gmail_message import parse_message
+    assert worker_tools == [parse_message]
+
+
+def test_concurrent_first_calls_compile_once(monkeypatch):
+    compiled = fake_compile(monkeypatch, delay=0.05)
+    worker = make_agent("worker")
+
+    threads = [threading.Thread(target=worker._ensure_agent) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(compiled) == 1
+
+
+def test_parse_importtime():
+    lines = [
+        "import time: self [us] | cumulative | imported package",
+        "import time:       100 |        100 |     yaml.error",
+        "import time:       300 |        400 |   yaml",
+        "import time:        50 |        450 | app",
+        "not an import line",
+    ]
+
+    timings = parse_importtime(lines)
+
+    assert [(t.name, t.self_us, t.cumulative_us, t.depth) for t in timings] == [
+        ("yaml.error", 100, 100, 2),
+        ("yaml", 300, 400, 1),
+        ("app", 50, 450, 0),
+    ]
+    assert top_packages(timings) == {"yaml": 400, "app": 50}
+
+
+class SlowAgent:
+    """Stands in for a sub-agent that takes ``delay`` seconds to answer."""
+
+    def __init__(self, name, delay):
+        self.name = name
+        self.delay = delay
+
+    def _answer(self, payload):
+        [(_, message)] = payload["messages"]
+        return {"messages": [SimpleNamespace(content=f"{self.name}: {message}")]}
+
+    def invoke(self, payload):
+        time.sleep(self.delay)
+        return self._answer(payload)
+
+    async def ainvoke(self, payload):
+        await asyncio.sleep(self.delay)
+        return self._answer(payload)
+
+
+def make_fan_out_tool(delays, timeout=5.0):
+    manager = make_agent("manager", sub_agents=[make_agent(n) for n in delays])
+    orchestrator = AgentsOrchestrator(main_agent=manager, agents=[manager])
+    tool = orchestrator._create_dynamic_send_messages_tool(manager)
+    tool.agent_mapping = {n: SlowAgent(n, d) for n, d in delays.items()}
+    tool.timeout = timeout
+    return tool
+
+
+FAN_OUT = {"messages": [
+    {"recipient": "calendar_agent", "message": "today"},
+    {"recipient": "notion_agent", "message": "todos"},
+    {"recipient": "slack_agent", "message": "unread"},
+]}
+
+
+def test_send_messages_runs_sub_agents_in_parallel():
+    tool = make_fan_out_tool(
+        {"calendar_agent": 0.3, "notion_agent": 0.3, "slack_agent": 0.3}
+    )
+
+    started = time.monotonic()
+    result = tool.invoke(FAN_OUT)
+    elapsed = time.monotonic() - started
+
+    # The slowest branch, not the sum of all three.
+    assert elapsed < 0.6
+    assert result == (
+        "## calendar_agent\ncalendar_agent: today\n\n"
+        "## notion_agent\nnotion_agent: todos\n\n"
+        "## slack_agent\nslack_agent: unread"
+    )
+
+
+def test_send_messages_reports_timeouts_and_keeps_other_answers():
+    tool = make_fan_out_tool(
+        {"calendar_agent": 0.01, "notion_agent": 2.0, "slack_agent": 0.01},
+        timeout=0.2,
+    )
+
+    started = time.monotonic()
+    result = tool.invoke(FAN_OUT)
+
+    assert time.monotonic() - started < 1.0
+    assert "calendar_agent: today" in result
+    # The call keeps running, so the manager must not send it again
+    assert "notion_agent did not answer within 0.2s and is still running" in result
+    assert "do not retry it" in result
+    assert "slack_agent: unread" in result
+
+
+def test_send_messages_waits_for_sub_agents_that_change_data():
+    tool = make_fan_out_tool(
+        {"calendar_agent": 0.01, "notion_agent": 0.4, "slack_agent": 0.4},
+        timeout=0.1,
+    )
+    tool.agent_mapping["notion_agent"].can_write = True
+
+    result = tool.invoke(FAN_OUT)
+
+    assert "notion_agent: todos" in result
+    assert "slack_agent did not answer within 0.1s" in result
+
+
+def test_send_messages_limits_calls_in_flight():
+    tool = make_fan_out_tool(
+        {"calendar_agent": 0.05, "notion_agent": 0.05, "slack_agent": 0.05}
+    )
+    tool.max_workers = 2
+    running, peak = [], []
+    for agent in tool.agent_mapping.values():
+        answer = agent._answer
+
+        def counted(payload, answer=answer):
+            running.append(1)
+            peak.append(len(running))
+            time.sleep(0.05)
+            running.pop()
+            return answer(payload)
+
+        agent._answer = counted
+
+    assert tool.invoke(FAN_OUT).count("## ") == 3
+    assert max(peak) == 2
+
+
+def test_agents_with_write_tools_can_write():
+    assert make_agent("notion", tools=["src.tools.notion:add_task_in_todo_list"]).can_write
+    assert not make_agent("notion", tools=["src.tools.notion:get_my_todo_list"]).can_write
+
+
+def test_send_messages_reuses_worker_threads():
+    tool = make_fan_out_tool(
+        {"calendar_agent": 0.05, "notion_agent": 0.05, "slack_agent": 0.05}
+    )
+    threads = []
+    for agent in tool.agent_mapping.values():
+        answer = agent._answer
+        agent._answer = lambda payload, answer=answer: threads.append(threading.current_thread()) or answer(payload)
+
+    tool.invoke(FAN_OUT)
+    first = set(threads)
+    threads.clear()
+    tool.invoke(FAN_OUT)
+
+    # Per-thread clients built during the first fan-out are reused
+    assert set(threads) <= first
+
+
+def test_send_messages_async_fan_out():
+    tool = make_fan_out_tool(
+        {"calendar_agent": 0.3, "notion_agent": 0.3, "slack_agent": 0.3}
+    )
+
+    started = time.monotonic()
+    result = asyncio.run(tool.ainvoke(FAN_OUT))
+
+    assert time.monotonic() - started < 0.6
+    assert result.count("## ") == 3
@@ -0,0 +1,175 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.tools.email import IncompleteFetchError, batch_get_messages, fetch_new_messages
+
+
+class FakeHttpError(Exception):
+    def __init__(self, status):
+        super().__init__(status)
+        self.resp = SimpleNamespace(status=status)
+
+
+class FakeRequest:
+    def __init__(self, service, msg_id):
+        self.service = service
+        self.msg_id = msg_id
+
+    def execute(self):
+        self.service.round_trips += 1
+        return self.service.resolve(self.msg_id)
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.round_trips += 1
+        for request_id, request in self.requests:
+            try:
+                resp = self.service.resolve(request.msg_id)
+            except FakeHttpError as exc:
+                self.callback(request_id, None, exc)
+            else:
+                self.callback(request_id, resp, None)
+
+
+class FakeGmail:
+    """Minimal Gmail service counting HTTP round trips."""
+
+    def __init__(self, message_map, history_pages, failures=None):
+        self.message_map = message_map
+        self.history_pages = list(history_pages)
+        self.failures = dict(failures or {})
+        self.round_trips = 0
+
+    def resolve(self, msg_id):
+        status = self.failures.pop(msg_id, None)
+        if status:
+            raise FakeHttpError(status)
+        return self.message_map[msg_id]
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+    def users(self):
+        return self
+
+    def history(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, **kwargs):
+        page = self.history_pages.pop(0)
+
+        def execute():
+            self.round_trips += 1
+            return page
+
+        return SimpleNamespace(execute=execute)
+
+    def get(self, userId, id, format):
+        return FakeRequest(self, id)
+
+
+def make_mailbox(count):
+    ids = [str(i) for i in range(count)]
+    message_map = {i: {'id': i, 'internalDate': str(1000 - int(i))} for i in ids}
+    history = [{'history': [{'messages': [{'id': i} for i in ids]}]}]
+    return message_map, history
+
+
+def test_batched_fetch_matches_serial_order():
+    message_map, history = make_mailbox(120)
+
+    serial = fetch_new_messages(FakeGmail(message_map, history), '1')
+    batched = fetch_new_messages(FakeGmail(message_map, history), '1', batch_size=50)
+
+    assert [m['id'] for m in batched] == [m['id'] for m in serial]
+
+
+def test_batched_fetch_round_trip_benchmark():
+    message_map, history = make_mailbox(120)
+
+    serial_service = FakeGmail(message_map, history)
+    fetch_new_messages(serial_service, '1')
+
+    batched_service = FakeGmail(message_map, history)
+    fetch_new_messages(batched_service, '1', batch_size=50)
+
+    # One history page plus one request per message vs. one per batch.
+    assert serial_service.round_trips == 1 + 120
+    assert batched_service.round_trips == 1 + 3
+    print(
+        f"\nround trips for 120 messages: serial={serial_service.round_trips} "
+        f"batched={batched_service.round_trips}"
+    )
+
+
+def test_batch_retries_only_failed_requests():
+    message_map, _ = make_mailbox(10)
+    service = FakeGmail(message_map, [], failures={'3': 429, '7': 503, '9': 404})
+
+    msgs = batch_get_messages(service, list(message_map), batch_size=5, backoff=0)
+
+    assert sorted(m['id'] for m in msgs) == [str(i) for i in range(9)]
+    # Two initial batches plus a single retry batch for '3' and '7'.
+    assert service.round_trips == 3
+
+
+
+def fail_always(service, msg_id, status):
+    resolve = service.resolve
+
+    def wrapped(requested_id):
+        if requested_id == msg_id:
+            raise FakeHttpError(status)
+        return resolve(requested_id)
+
+    service.resolve = wrapped
+
+
+def test_batch_reports_requests_failing_every_retry():
+    message_map, _ = make_mailbox(4)
+    service = FakeGmail(message_map, [])
+    fail_always(service, '2', 503)
+    failed = []
+
+    msgs = batch_get_messages(service, list(message_map), backoff=0, max_retries=2, failed_ids=failed)
+
+    assert [m['id'] for m in msgs] == ['0', '1', '3']
+    assert failed == ['2']
+
+
+def test_fetch_new_messages_stops_cursor_before_failed_message(monkeypatch):
+    monkeypatch.setattr("src.tools.email.batch.time.sleep", lambda seconds: None)
+    message_map = {i: {'id': i, 'internalDate': str(100 + int(i))} for i in '1234'}
+    history = [{'history': [
+        {'id': '51', 'messages': [{'id': '1'}]},
+        {'id': '52', 'messages': [{'id': '2'}]},
+        {'id': '53', 'messages': [{'id': '3'}]},
+        {'id': '54', 'messages': [{'id': '4'}]},
+    ]}]
+    service = FakeGmail(message_map, history)
+    fail_always(service, '3', 429)
+
+    with pytest.raises(IncompleteFetchError) as info:
+        fetch_new_messages(service, '50', batch_size=10)
+
+    # '4' was fetched but changed after the failure, so it is listed again next time
+    assert [m['id'] for m in info.value.messages] == ['1', '2']
+    assert info.value.failed_ids == ['3']
+    assert info.value.history_id == '52'
@@ -0,0 +1,177 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+import src.tools.calendar.cache as cache_module
+from src.tools.calendar import check_availability, get_calendar_events
+from src.tools.calendar.cache import CalendarCache
+
+DAY = datetime(2026, 10, 19, tzinfo=timezone.utc)
+
+
+def _event(event_id, start, hours=1, **extra):
+    end = start + timedelta(hours=hours)
+    return {
+        "id": event_id,
+        "summary": f"event {event_id}",
+        "start": {"dateTime": start.isoformat()},
+        "end": {"dateTime": end.isoformat()},
+        **extra,
+    }
+
+
+class _Request:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class FakeCalendar:
+    """Stand-in for the Calendar API client with paging and sync tokens.
+
+    Every change made through :meth:`change` is numbered; a sync token is
+    the number of changes already seen.
+    """
+
+    def __init__(self, events, page_size=3):
+        self.changes = list(events)
+        self.page_size = page_size
+        self.calls = []
+        self.expired = False
+
+    def change(self, event):
+        self.changes.append(event)
+
+    def events(self):
+        return self
+
+    def list(self, calendarId, singleEvents, pageToken=None, maxResults=None, syncToken=None):
+        self.calls.append({"syncToken": syncToken, "pageToken": pageToken})
+        if syncToken is not None and self.expired:
+            return _Request(HttpError(httplib2.Response({"status": 410}), b"Sync token is no longer valid"))
+        seen = int(syncToken or 0)
+        latest = {}
+        for event in self.changes[seen:]:
+            latest[event["id"]] = event
+        items = list(latest.values())
+        if syncToken is None:
+            items = [e for e in items if e.get("status") != "cancelled"]
+        start = int(pageToken or 0)
+        page = {"items": items[start:start + self.page_size]}
+        if start + self.page_size < len(items):
+            page["nextPageToken"] = str(start + self.page_size)
+        else:
+            page["nextSyncToken"] = str(len(self.changes))
+        return _Request(page)
+
+
+@pytest.fixture
+def calendar():
+    return FakeCalendar([
+        _event("standup", DAY.replace(hour=9), hours=0.25),
+        _event("offsite", DAY - timedelta(days=1), hours=72),
+        _event("lunch", DAY.replace(hour=12), transparency="transparent"),
+        _event("review", DAY.replace(hour=15), description="Q3 numbers"),
+        _event("skipped", DAY.replace(hour=16), attendees=[{"self": True, "responseStatus": "declined"}]),
+        {
+            "id": "holiday",
+            "summary": "Holiday",
+            "start": {"date": "2026-10-21"},
+            "end": {"date": "2026-10-22"},
+        },
+    ])
+
+
+@pytest.fixture
+def cache(calendar):
+    return CalendarCache(service=lambda: calendar, max_age=60)
+
+
+def _ids(events):
+    return [e["id"] for e in events]
+
+
+def test_first_sync_follows_page_tokens(cache, calendar):
+    assert cache.sync() == 6
+    assert [c["pageToken"] for c in calendar.calls] == [None, "3"]
+    assert cache.stats["full_syncs"] == 1
+
+
+def test_range_query_uses_interval_index(cache):
+    # The three-day offsite started the day before but still overlaps
+    assert _ids(cache.events_between(DAY.replace(hour=10), DAY.replace(hour=13))) == ["offsite", "lunch"]
+    assert _ids(cache.events_between(DAY.replace(hour=9, minute=15), DAY.replace(hour=9, minute=30))) == ["offsite"]
+    assert _ids(cache.events_between(DAY + timedelta(days=1), DAY + timedelta(days=3))) == ["offsite", "holiday"]
+    assert cache.events_between(DAY + timedelta(days=5), DAY + timedelta(days=6)) == []
+
+
+def test_busy_ignores_free_and_declined_events(cache):
+    busy = cache.busy(DAY.replace(hour=11), DAY.replace(hour=17))
+    assert _ids(busy) == ["offsite", "review"]
+
+
+def test_next_events(cache):
+    assert _ids(cache.next_events(DAY.replace(hour=9, minute=1), limit=2)) == ["lunch", "review"]
+    assert cache.next_events(DAY + timedelta(days=10)) == []
+
+
+def test_reads_within_max_age_stay_in_memory(cache, calendar):
+    cache.events_between(DAY, DAY + timedelta(days=1))
+    calendar.calls.clear()
+
+    started = time.perf_counter()
+    for hour in range(24):
+        cache.events_between(DAY.replace(hour=hour), DAY.replace(hour=hour) + timedelta(hours=1))
+    assert time.perf_counter() - started < 0.05
+    assert calendar.calls == []
+
+
+def test_invalidate_runs_incremental_sync(cache, calendar):
+    cache.sync()
+    calendar.calls.clear()
+    calendar.change(_event("planning", DAY.replace(hour=11)))
+    calendar.change({"id": "review", "status": "cancelled"})
+
+    cache.invalidate()
+    events = cache.events_between(DAY.replace(hour=10), DAY.replace(hour=18))
+
+    assert _ids(events) == ["offsite", "planning", "lunch", "skipped"]
+    assert calendar.calls == [{"syncToken": "6", "pageToken": None}]
+    assert cache.stats["incremental_syncs"] == 1
+
+
+def test_expired_sync_token_falls_back_to_full_sync(cache, calendar):
+    cache.sync()
+    calendar.change({"id": "standup", "status": "cancelled"})
+    calendar.expired = True
+
+    assert cache.sync() == 5
+    assert "standup" not in _ids(cache.events_between(DAY, DAY + timedelta(days=1)))
+    assert cache.stats["full_syncs"] == 2
+
+
+def test_tools_read_cache(cache, monkeypatch):
+    monkeypatch.setattr(cache_module, "_cache", cache)
+
+    result = get_calendar_events.invoke({"start_date": "2026-10-19T14:00:00", "end_date": "2026-10-19T15:30:00"})
+    # Events without a description no longer fail
+    assert result.splitlines() == [
+        "Event: event offsite, Description: , Start: 2026-10-18T00:00:00+00:00",
+        "Event: event review, Description: Q3 numbers, Start: 2026-10-19T15:00:00+00:00",
+    ]
+    assert get_calendar_events.invoke({"start_date": "2026-11-01", "end_date": "2026-11-02"}) == (
+        "No event found for this dates"
+    )
+    assert check_availability.invoke({"start_time": "2026-10-22T10:00:00", "end_time": "2026-10-22T11:00:00"}) == (
+        "Free between 2026-10-22T10:00:00 and 2026-10-22T11:00:00."
+    )
+    assert check_availability.invoke({"start_time": "2026-10-19T15:00:00", "end_time": "2026-10-19T15:30:00"}).startswith(
+        "Busy with:\nEvent: event offsite"
+    )
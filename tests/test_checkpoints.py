@@ -0,0 +1,119 @@
+import sqlite3
+import warnings
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.prebuilt import create_react_agent
+
+from src import checkpoints
+
+
+class ChatModel(FakeListChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+@pytest.fixture
+def saver(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "checkpoints.sqlite"), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    yield SqliteSaver(conn)
+    conn.close()
+
+
+def make_graph(saver):
+    model = ChatModel(responses=[f"answer {i} " + "x" * 500 for i in range(100)])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return create_react_agent(model, tools=[], prompt="sys", checkpointer=saver)
+
+
+def chat(graph, thread_id, turns):
+    config = {"configurable": {"thread_id": thread_id}}
+    for i in range(turns):
+        graph.invoke({"messages": [("human", f"question {i}")]}, config)
+    return config
+
+
+def test_prune_keeps_latest_checkpoints_per_thread(saver):
+    graph = make_graph(saver)
+    config = chat(graph, "1", 10)
+    chat(graph, "telegram:7", 2)
+    latest = saver.get_tuple(config).checkpoint["id"]
+
+    pruned = checkpoints.prune_checkpoints(saver, keep_last=4)
+
+    counts = dict(saver.conn.execute(
+        "SELECT thread_id, COUNT(*) FROM checkpoints GROUP BY thread_id"
+    ))
+    assert counts == {"1": 4, "telegram:7": 4}
+    assert pruned["checkpoints"] == 3 * 10 - 4 + 3 * 2 - 4
+    orphans = saver.conn.execute(
+        "SELECT COUNT(*) FROM writes w WHERE NOT EXISTS (SELECT 1 FROM checkpoints c "
+        "WHERE c.thread_id = w.thread_id AND c.checkpoint_id = w.checkpoint_id)"
+    ).fetchone()[0]
+    assert orphans == 0
+    # The conversation carries on from the same state.
+    assert saver.get_tuple(config).checkpoint["id"] == latest
+    result = graph.invoke({"messages": [("human", "one more")]}, config)
+    assert len(result["messages"]) == 22
+
+
+def test_maintenance_shrinks_database_and_reports(saver):
+    graph = make_graph(saver)
+    chat(graph, "1", 15)
+
+    report = checkpoints.run_maintenance(saver, keep_last=3)
+
+    before, after = report["before"], report["after"]
+    assert after["bytes"] + after["wal_bytes"] < before["bytes"] + before["wal_bytes"]
+    assert after["wal_bytes"] == 0
+    assert after["threads"]["1"]["checkpoints"] == 3
+    assert after["threads"]["1"]["load_ms"] >= 0
+    assert "thread 1: 3 checkpoints" in checkpoints.format_report(report)
+
+
+def test_summarise_thread_folds_old_messages(saver):
+    graph = make_graph(saver)
+    config = chat(graph, "1", 6)
+    summarised = []
+
+    def summarise(messages):
+        summarised.extend(m.content for m in messages)
+        return "talked about six questions"
+
+    changed = checkpoints.summarise_thread(
+        graph, "1", max_messages=8, keep_messages=4, summarise=summarise
+    )
+
+    messages = graph.get_state(config).values["messages"]
+    assert changed
+    assert summarised[0] == "question 0"
+    assert messages[0].type == "system"
+    assert "talked about six questions" in messages[0].content
+    assert [m.content for m in messages[1:] if m.type == "human"] == [
+        "question 4", "question 5"
+    ]
+    assert not checkpoints.summarise_thread(
+        graph, "1", max_messages=8, keep_messages=4, summarise=summarise
+    )
+
+
+def test_summarise_thread_keeps_turns_committed_meanwhile(saver):
+    graph = make_graph(saver)
+    config = chat(graph, "1", 6)
+
+    def summarise(messages):
+        # The user sends a message while the summary is being written
+        chat(graph, "1", 1)
+        return "talked about six questions"
+
+    changed = checkpoints.summarise_thread(
+        graph, "1", max_messages=8, keep_messages=4, summarise=summarise
+    )
+
+    messages = graph.get_state(config).values["messages"]
+    assert not changed
+    assert len(messages) == 14
+    assert [m.type for m in messages[-2:]] == ["human", "ai"]
@@ -3,7 +3,8 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from src.db import SqliteKV
+import src.db as db
+from src.db import DigestStore, MessageCache, SqliteKV, SummaryCache
 
 
 def test_set_get(tmp_path):
@@ -25,3 +26,92 @@ def test_set_many(tmp_path):
 
         for key, val in items:
             assert kv.get(key) == val
+
+
+def test_message_cache_hits_and_formats(tmp_path):
+    db_file = tmp_path / "assistant.db"
+    with MessageCache(str(db_file)) as cache:
+        cache.put({"id": "m1", "historyId": "5", "snippet": "hi"}, "metadata")
+
+        assert cache.get("m1", "metadata") == {
+            "id": "m1", "historyId": "5", "snippet": "hi"
+        }
+        # A metadata copy cannot serve a full request.
+        assert cache.get("m1", "full") is None
+
+        cache.put({"id": "m1", "historyId": "5", "payload": {}}, "full")
+        assert cache.get("m1", "full")["payload"] == {}
+        # Nor does a later metadata fetch downgrade the full entry.
+        cache.put({"id": "m1", "historyId": "5"}, "metadata")
+        assert cache.get("m1", "full") is not None
+
+        # Entries older than a known change are stale.
+        assert cache.get("m1", "full", min_history_id=6) is None
+
+        stats = cache.stats()
+        assert stats["hits"] == 3
+        assert stats["misses"] == 2
+        assert stats["entries"] == 1
+
+
+def test_message_cache_lru_eviction(tmp_path):
+    db_file = tmp_path / "assistant.db"
+    with MessageCache(str(db_file), max_bytes=10**9) as cache:
+        for i in range(3):
+            cache.put({"id": str(i), "historyId": "1", "body": "x" * 100})
+        # Room for three entries but not four.
+        cache.max_bytes = cache.stats()["bytes"] + 10
+
+        cache.get("0")  # "1" is now least recently used
+        cache.put({"id": "3", "historyId": "1", "body": "x" * 100})
+
+        assert cache.get("1") is None
+        assert cache.get("0") is not None
+        assert cache.stats()["evictions"] == 1
+
+
+def test_digest_store_buckets_and_prune(tmp_path):
+    db_file = tmp_path / "assistant.db"
+    with DigestStore(str(db_file)) as store:
+        store.add({"id": "n", "internalDate": "3000"}, "newsletter")
+        store.add({"id": "p", "internalDate": "2000"}, "promo")
+        store.add({"id": "o", "internalDate": "1000"}, "other")
+        store.add({"id": "x", "internalDate": "1500"}, "unknown")
+        store.add({"id": "v", "internalDate": "1500"}, "other")
+        # Starred later: no longer part of the digest.
+        store.add({"id": "v", "internalDate": "1500"}, "vip")
+
+        buckets = store.buckets()
+        assert [m["id"] for m in buckets["other"]] == ["o", "x"]
+        assert [m["id"] for m in buckets["promo"]] == ["p"]
+        assert [m["id"] for m in buckets["newsletter"]] == ["n"]
+
+        store.prune(["o", "x", "p"])
+        # Received before the pruned ones but added after the digest was built
+        store.add({"id": "late", "internalDate": "500"}, "promo")
+        assert store.buckets() == {
+            "promo": [{"id": "late", "internalDate": "500"}],
+            "newsletter": [{"id": "n", "internalDate": "3000"}],
+            "other": [],
+        }
+
+
+def test_summary_cache_ttl_and_size(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(db.time, "time", lambda: now[0])
+    db_file = tmp_path / "assistant.db"
+    with SummaryCache(str(db_file), ttl=60, max_entries=2) as cache:
+        cache.put("a", "A")
+        now[0] += 1
+        cache.put("b", "B")
+        now[0] += 1
+        assert cache.get("a") == "A"  # "b" is now least recently used
+        now[0] += 1
+        cache.put("c", "C")
+
+        assert cache.get("b") is None
+        assert cache.get("c") == "C"
+
+        now[0] += 61
+        assert cache.get("a") is None
+        assert cache.stats() == {"hits": 2, "misses": 2, "entries": 2}
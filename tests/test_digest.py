@@ -1,48 +1,175 @@
+import base64
 import sys
+import time
 from pathlib import Path
-from unittest.mock import Mock
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 import src.digest as digest
+from src.db import SummaryCache
 
 
-def make_service(message_ids, message_map):
-    service = Mock()
-    users = service.users.return_value
+def fake_llm(delay):
+    def summarise(html, sentences):
+        time.sleep(delay)
+        return f"summary of {html}"
 
-    messages = users.messages.return_value
-    list_call = messages.list.return_value
-    list_call.execute.return_value = {
-        'messages': [{'id': m} for m in message_ids]
-    }
+    return summarise
 
-    def get_side_effect(userId, id, format):
-        call = Mock()
-        call.execute.return_value = message_map[id]
-        return call
 
-    messages.get.side_effect = get_side_effect
-    return service
+def test_summarise_newsletters_keeps_order(monkeypatch):
+    monkeypatch.setattr(digest, '_llm_summarise', fake_llm(0.01))
+    htmls = [f'n{i}' for i in range(12)]
 
+    summaries = digest.summarise_newsletters(htmls, 3, max_workers=4, rate=0)
 
-def test_collect_digest_groups(monkeypatch):
-    msgs = {
-        '1': {'id': '1'},
-        '2': {'id': '2'},
-        '3': {'id': '3'},
-    }
+    assert summaries == [f'summary of n{i}' for i in range(12)]
 
-    service = make_service(['1', '2', '3'], msgs)
-    monkeypatch.setattr(digest, 'gmail_service', service)
 
-    def classify(msg):
-        return {'1': 'promo', '2': 'vip', '3': 'other'}[msg['id']]
+def test_summarise_newsletters_benchmark(monkeypatch):
+    monkeypatch.setattr(digest, '_llm_summarise', fake_llm(0.02))
 
-    monkeypatch.setattr(digest, 'classify_importance', classify)
+    rows = []
+    for count in (4, 8, 16):
+        htmls = [f'n{i}' for i in range(count)]
+        timings = {}
+        for workers in (1, 8):
+            start = time.perf_counter()
+            digest.summarise_newsletters(htmls, 3, max_workers=workers, rate=0)
+            timings[workers] = time.perf_counter() - start
+        rows.append((count, timings[1], timings[8]))
+        assert timings[8] < timings[1]
 
-    buckets = digest.collect_digest(0, 100)
+    print("\nnewsletters  serial_s  parallel_s")
+    for count, serial, parallel in rows:
+        print(f"{count:>11}  {serial:8.3f}  {parallel:10.3f}")
 
-    assert buckets['promo'] == [msgs['1']]
-    assert buckets['newsletter'] == []
-    assert buckets['other'] == [msgs['3']]
+
+def test_rate_limiter_spaces_calls():
+    limiter = digest.RateLimiter(50)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    assert time.monotonic() - start >= 5 / 50
+
+
+def test_format_digest_summarises_newsletters_in_order(monkeypatch, capsys):
+    def encoded(html):
+        return base64.urlsafe_b64encode(html.encode()).decode()
+
+    newsletters = [
+        {'payload': {'mimeType': 'text/html', 'body': {'data': encoded(f'<p>{i}</p>')}}}
+        for i in range(3)
+    ]
+    calls = []
+
+    def summarise(htmls, sentences):
+        calls.append(htmls)
+        return [f'S{i}' for i in range(len(htmls))]
+
+    monkeypatch.setattr(digest, 'summarise_newsletters', summarise)
+
+    text = digest.format_digest({'newsletter': newsletters})
+
+    assert calls == [['0', '1', '2']]
+    assert text == '📰 Newsletters\n- S0\n- S1\n- S2'
+    assert 'Digest HTML reduction saved' in capsys.readouterr().out
+
+
+def test_llm_summarise_uses_content_addressed_cache(monkeypatch, tmp_path):
+    calls = []
+
+    def summarise(html, sentences):
+        calls.append(html)
+        return 'summary'
+
+    monkeypatch.setattr(digest, '_llm_summarise', summarise)
+    cache = SummaryCache(str(tmp_path / 'assistant.db'))
+    monkeypatch.setattr(digest, 'summary_cache', cache)
+
+    issue = digest.reduce_html('<html><body><p>Weekly   news</p></body></html>').text
+    resend = digest.reduce_html('<div style="color:red">Weekly news</div>').text
+
+    assert digest.llm_summarise(issue, 3) == 'summary'
+    assert digest.llm_summarise(resend, 3) == 'summary'
+    assert calls == [issue]
+
+    # Different sentence counts are cached separately.
+    digest.llm_summarise(issue, 5)
+    assert calls == [issue, issue]
+    cache.close()
+
+
+def test_summarise_newsletters_dedupes_identical_content(monkeypatch):
+    calls = []
+
+    def summarise(html, sentences):
+        calls.append(html)
+        return f'summary of {html}'
+
+    monkeypatch.setattr(digest, '_llm_summarise', summarise)
+    monkeypatch.setattr(digest, 'summary_cache', None)
+
+    summaries = digest.summarise_newsletters(['a  news', 'a news\n', 'b'], 3, rate=0)
+
+    assert sorted(calls) == ['a  news', 'b']
+    assert summaries == ['summary of a  news', 'summary of a  news', 'summary of b']
+
+
+def test_summarise_newsletters_counts_each_cache_lookup_once(monkeypatch, tmp_path):
+    calls = []
+
+    def summarise(html, sentences):
+        calls.append(html)
+        return f'summary of {html}'
+
+    monkeypatch.setattr(digest, '_llm_summarise', summarise)
+    cache = SummaryCache(str(tmp_path / 'assistant.db'))
+    monkeypatch.setattr(digest, 'summary_cache', cache)
+
+    first = digest.summarise_newsletters(['a', 'b', 'a'], 3, rate=0)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    second = digest.summarise_newsletters(['a', 'b'], 3, rate=0)
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert sorted(calls) == ['a', 'b']
+    assert first == ['summary of a', 'summary of b', 'summary of a']
+    assert second == ['summary of a', 'summary of b']
+    cache.close()
+
+
+NEWSLETTER_HTML = """
+<html><head><title>Issue 42</title><style>td { color: red; }</style></head>
+<body>
+<table><tr><td><a href="https://example.com/browser">View in browser</a></td></tr>
+<tr><td><h1>Big news</h1><p>Widgets are <b>back</b>.</p>
+<img src="https://track.example.com/pixel.gif" width="1" height="1">
+<a href="https://example.com/story">Read the story</a>
+<a href="mailto:editor@example.com">Write to us</a>
+<a href="https://example.com/story">Read it again</a>
+<a href="https://example.com/more">More</a></td></tr>
+<tr><td><script>track()</script>
+<a href="https://example.com/unsubscribe?u=1">Unsubscribe</a> from this list.</td></tr>
+</table></body></html>
+"""
+
+
+def test_reduce_html_strips_markup_and_boilerplate():
+    reduced = digest.reduce_html(NEWSLETTER_HTML)
+
+    assert reduced.text == (
+        'Big news\nWidgets are back.\n'
+        'Read the story Write to us Read it again More'
+    )
+    assert reduced.links == ['https://example.com/story', 'https://example.com/more']
+    assert reduced.tokens < reduced.raw_tokens
+    assert reduced.tokens_saved == reduced.raw_tokens - reduced.tokens
+
+
+def test_reduce_html_caps_text_at_token_budget():
+    html = '<p>' + 'word ' * 5000 + '</p><a href="https://example.com/late">x</a>'
+
+    reduced = digest.reduce_html(html, max_tokens=100)
+
+    assert len(reduced.text) <= 400
+    assert reduced.tokens <= 100
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from src.dispatcher import ConversationDispatcher, DispatcherFull
+
+
+def test_conversations_run_concurrently_and_stay_ordered():
+    handled = []
+    lock = threading.Lock()
+
+    def handler(chat, item):
+        time.sleep(0.1)
+        with lock:
+            handled.append((chat, item))
+
+    dispatcher = ConversationDispatcher(handler, max_workers=3, max_pending=20)
+    started = time.monotonic()
+    for i in range(3):
+        for chat in ("a", "b", "c"):
+            dispatcher.submit(chat, i)
+    assert dispatcher.join(timeout=5)
+    elapsed = time.monotonic() - started
+    dispatcher.close()
+
+    # Three chats in parallel: ~3 rounds of 0.1s instead of 9.
+    assert elapsed < 0.6
+    for chat in ("a", "b", "c"):
+        assert [i for c, i in handled if c == chat] == [0, 1, 2]
+    assert dispatcher.stats()["processed"] == 9
+
+
+def test_one_message_per_conversation_at_a_time():
+    active = set()
+    overlaps = []
+
+    def handler(chat, item):
+        if chat in active:
+            overlaps.append(chat)
+        active.add(chat)
+        time.sleep(0.02)
+        active.discard(chat)
+
+    dispatcher = ConversationDispatcher(handler, max_workers=4, max_pending=20)
+    for i in range(10):
+        dispatcher.submit("a", i)
+    dispatcher.close()
+
+    assert overlaps == []
+
+
+def test_bounded_queue_applies_backpressure():
+    release = threading.Event()
+    dispatcher = ConversationDispatcher(
+        lambda chat, item: release.wait(), max_workers=1, max_pending=2
+    )
+    dispatcher.submit("a", 1)
+    dispatcher.submit("b", 2)
+
+    with pytest.raises(DispatcherFull):
+        dispatcher.submit("c", 3, block=False)
+    with pytest.raises(DispatcherFull):
+        dispatcher.submit("c", 3, timeout=0.05)
+
+    release.set()
+    dispatcher.submit("c", 3, timeout=5)
+    dispatcher.close()
+    assert dispatcher.stats() == {
+        "pending": 0,
+        "conversations": 0,
+        "processed": 3,
+        "failed": 0,
+        "rejected": 2,
+    }
+
+
+def test_failed_message_does_not_stall_conversation():
+    handled = []
+
+    def handler(chat, item):
+        if item == 0:
+            raise RuntimeError("LLM error")
+        handled.append(item)
+
+    dispatcher = ConversationDispatcher(handler, max_workers=2)
+    for i in range(3):
+        dispatcher.submit("a", i)
+    dispatcher.close()
+
+    assert handled == [1, 2]
+    assert dispatcher.stats()["failed"] == 1
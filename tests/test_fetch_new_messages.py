@@ -4,6 +4,7 @@ from unittest.mock import Mock
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
+from src.db import MessageCache
 from src.tools.email import fetch_new_messages
 
 
@@ -16,8 +17,10 @@ def make_service(history_responses, message_map):
     list_call.execute.side_effect = history_responses
 
     messages = users.messages.return_value
+    service.fetched = fetched = []
 
     def get_side_effect(userId, id, format):
+        fetched.append(id)
         resp = message_map[id]
         call = Mock()
         call.execute.return_value = resp
@@ -51,3 +54,29 @@ def test_fetch_new_messages_pagination_and_sorting():
 
     assert ids == ['2', '1', '3']
 
+
+
+def test_fetch_new_messages_uses_cache_until_history_changes(tmp_path):
+    message_map = {
+        '1': {'id': '1', 'historyId': '20', 'internalDate': '100'},
+        '2': {'id': '2', 'historyId': '20', 'internalDate': '50'},
+    }
+    first = [{'history': [{'id': '20', 'messages': [{'id': '1'}, {'id': '2'}]}]}]
+    # Message 2 had its labels changed in history record 30.
+    second = [{'history': [
+        {'id': '19', 'messages': [{'id': '1'}]},
+        {'id': '30', 'messages': [{'id': '2'}]},
+    ]}]
+
+    with MessageCache(str(tmp_path / 'assistant.db')) as cache:
+        service = make_service(first, message_map)
+        fetch_new_messages(service, '10', cache=cache)
+        assert sorted(service.fetched) == ['1', '2']
+
+        message_map['2'] = dict(message_map['2'], historyId='30')
+        service = make_service(second, message_map)
+        messages = fetch_new_messages(service, '20', cache=cache)
+
+        assert service.fetched == ['2']
+        assert [m['id'] for m in messages] == ['2', '1']
+        assert messages[0]['historyId'] == '30'
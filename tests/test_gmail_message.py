@@ -0,0 +1,85 @@
+import base64
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.gmail_message import ParsedMessage, parse_message
+
+
+def encoded(text):
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+MSG = {
+    "id": "m1",
+    "threadId": "t1",
+    "labelIds": ["INBOX", "\\Starred"],
+    "snippet": "Hello there",
+    "internalDate": "1700000000000",
+    "payload": {
+        "mimeType": "multipart/mixed",
+        "headers": [
+            {"name": "From", "value": "Alice <alice@example.com>"},
+            {"name": "subject", "value": "Lunch?"},
+            {"name": "Received", "value": "first"},
+            {"name": "Received", "value": "second"},
+        ],
+        "parts": [
+            {
+                "mimeType": "multipart/alternative",
+                "parts": [
+                    {"mimeType": "text/plain", "body": {"data": encoded("plain body")}},
+                    {"mimeType": "text/html", "body": {"data": encoded("<p>html body</p>")}},
+                ],
+            },
+            {"mimeType": "text/calendar", "body": {"attachmentId": "a1"}},
+        ],
+    },
+}
+
+
+def test_header_index_is_case_insensitive():
+    msg = ParsedMessage(MSG)
+
+    assert msg.header("FROM") == "Alice <alice@example.com>"
+    assert msg.header("Subject") == "Lunch?"
+    assert msg.header("received") == "first"
+    assert msg.header("List-Id", "none") == "none"
+    assert "list-id" not in msg
+    assert "from" in msg
+
+
+def test_nested_parts_and_lazy_bodies():
+    msg = ParsedMessage(MSG)
+
+    assert msg.has_part("text/calendar")
+    assert [p["mimeType"] for p in msg.parts] == [
+        "multipart/mixed",
+        "multipart/alternative",
+        "text/plain",
+        "text/html",
+        "text/calendar",
+    ]
+    assert msg.html == "<p>html body</p>"
+    assert msg.text == "plain body"
+    assert msg.body("application/pdf") == ""
+
+
+def test_simple_fields_and_parse_message():
+    msg = parse_message(MSG)
+
+    assert (msg.id, msg.thread_id, msg.snippet) == ("m1", "t1", "Hello there")
+    assert msg.labels == {"INBOX", "\\Starred"}
+    assert msg.internal_date == 1700000000000
+    assert parse_message(msg) is msg
+    assert not hasattr(msg, "__dict__")
+
+
+def test_single_part_html_body():
+    msg = ParsedMessage(
+        {"payload": {"mimeType": "text/html", "body": {"data": encoded("<b>x</b>")}}}
+    )
+
+    assert msg.html == "<b>x</b>"
+    assert msg.header("From") is None
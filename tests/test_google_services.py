@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+import src.google_services as gs
+
+
+def _token(expiry):
+    return {
+        "token": "access",
+        "refresh_token": "refresh",
+        "client_id": "client",
+        "client_secret": "secret",
+        "expiry": expiry.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+@pytest.fixture
+def token_file(tmp_path, monkeypatch):
+    path = tmp_path / "token.json"
+    monkeypatch.setattr(gs, "TOKEN_FILE", str(path))
+    gs.reset_google_services()
+    yield path
+    gs.reset_google_services()
+
+
+def test_valid_token_is_read_once_and_not_rewritten(token_file):
+    token_file.write_text(json.dumps(_token(datetime.utcnow() + timedelta(hours=1))))
+
+    creds = gs.get_credentials()
+    token_file.unlink()  # no further reads
+    assert gs.get_credentials() is creds
+    assert gs.service_stats()["token_writes"] == 0
+    assert not token_file.exists()
+
+
+def test_concurrent_refresh_happens_once(token_file, monkeypatch):
+    token_file.write_text(json.dumps(_token(datetime.utcnow() - timedelta(hours=1))))
+    calls = []
+
+    def refresh(self, request):
+        calls.append(1)
+        time.sleep(0.05)
+        self.token = "new-access"
+        self.expiry = datetime.utcnow() + timedelta(hours=1)
+
+    monkeypatch.setattr(Credentials, "refresh", refresh)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(gs.get_credentials()))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len({id(c) for c in results}) == 1
+    assert json.loads(token_file.read_text())["token"] == "new-access"
+    assert gs.service_stats()["token_writes"] == 1
+    gs.get_credentials()
+    assert gs.service_stats()["token_writes"] == 1
+
+
+def test_services_are_built_once_per_thread(token_file):
+    token_file.write_text(json.dumps(_token(datetime.utcnow() + timedelta(hours=1))))
+
+    gmail = gs.get_service("gmail", "v1")
+    started = time.perf_counter()
+    assert gs.get_service("gmail", "v1") is gmail
+    assert time.perf_counter() - started < 0.01
+    assert gs.get_service("calendar", "v3") is not gmail
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(gs.get_service("gmail", "v1")))
+    thread.start()
+    thread.join()
+    assert other[0] is not gmail
+    assert gs.service_stats()["builds"] == 3
+    assert gs.service_stats()["hits"] == 1
+
+
+def test_services_rebuilt_for_new_credentials(token_file):
+    token_file.write_text(json.dumps(_token(datetime.utcnow() + timedelta(hours=1))))
+    gmail = gs.get_service("gmail", "v1")
+
+    gs.reset_google_services()
+    assert gs.get_service("gmail", "v1") is not gmail
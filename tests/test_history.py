@@ -0,0 +1,128 @@
+import sqlite3
+import warnings
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+import src.agents.base.agent as agent_module
+import src.agents.base.history as history_module
+from src.agents.base import Agent
+from src.agents.base.history import HistoryBudget
+
+
+def count_words(messages):
+    return sum(len(str(m.content).split()) for m in messages)
+
+
+def conversation(turns):
+    messages = []
+    for i in range(turns):
+        messages += [
+            HumanMessage(f"question {i} " + "word " * 8, id=f"h{i}"),
+            AIMessage("", id=f"c{i}", tool_calls=[
+                {"name": "SendMessage", "args": {}, "id": f"call{i}"}
+            ]),
+            ToolMessage("result " * 10, tool_call_id=f"call{i}", id=f"t{i}"),
+            AIMessage(f"answer {i} " + "word " * 8, id=f"a{i}"),
+        ]
+    return messages
+
+
+def make_budget(budget, keep_tokens, summaries):
+    def summarise(summary, messages):
+        summaries.append([m.id for m in messages])
+        return f"summary of {len(summaries)} folds"
+
+    return HistoryBudget(
+        "manager_agent", budget=budget, keep_tokens=keep_tokens,
+        summarise=summarise, count_tokens=count_words,
+    )
+
+
+def test_short_history_is_sent_verbatim():
+    summaries = []
+    hook = make_budget(1000, 500, summaries)
+    messages = conversation(2)
+
+    update = hook({"messages": messages})
+
+    assert update == {"llm_input_messages": messages}
+    assert summaries == []
+    assert hook.last_prompt_tokens == count_words(messages)
+
+
+def test_only_recent_prompt_sizes_are_kept():
+    hook = make_budget(1000, 500, [])
+    for turns in range(1, hook.RECORDED + 11):
+        hook({"messages": conversation(1 + turns % 3)})
+
+    assert len(hook.prompt_tokens) == hook.RECORDED
+    assert hook.prompt_tokens[-1] == hook.last_prompt_tokens
+
+
+def test_long_history_is_folded_into_rolling_summary():
+    summaries = []
+    hook = make_budget(100, 60, summaries)
+    messages = conversation(6)  # 30 words per turn
+
+    update = hook({"messages": messages})
+
+    # Older turns are summarised, cut at a human message, and the recent
+    # turns stay verbatim with their tool calls and results.
+    assert summaries == [[m.id for m in messages[:16]]]
+    assert update["summary_until"] == "a3"
+    summary, *recent = update["llm_input_messages"]
+    assert "summary of 1 folds" in summary.content
+    assert [m.id for m in recent] == ["h4", "c4", "t4", "a4", "h5", "c5", "t5", "a5"]
+    assert hook.last_prompt_tokens <= 100
+
+    # The next turn reuses the cached summary instead of recomputing it.
+    state = {"messages": messages + conversation(7)[-4:], **update}
+    del state["llm_input_messages"]
+    update = hook(state)
+    assert len(summaries) == 1
+    assert [m.id for m in update["llm_input_messages"][1:]] == [
+        "h4", "c4", "t4", "a4", "h5", "c5", "t5", "a5", "h6", "c6", "t6", "a6"
+    ]
+
+
+class RecordingChatModel(FakeListChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        prompts.append(messages)
+        return super()._call(messages, stop, run_manager, **kwargs)
+
+
+prompts = []
+
+
+def test_manager_prompt_stays_within_budget(monkeypatch):
+    prompts.clear()
+    model = RecordingChatModel(responses=["answer " + "word " * 100] * 20)
+    monkeypatch.setattr(agent_module, "get_llm_by_provider", lambda *a: model)
+    monkeypatch.setattr(
+        history_module, "get_llm_by_provider",
+        lambda *a, **k: FakeListChatModel(responses=["rolling summary"] * 20),
+    )
+    saver = SqliteSaver(sqlite3.connect(":memory:", check_same_thread=False))
+    manager = Agent(
+        name="manager_agent", description="", system_prompt="be brief",
+        tools=[], sub_agents=[], model="openai/gpt-4o", temperature=0.1,
+        memory=saver, history_budget=400,
+    )
+    config = {"configurable": {"thread_id": "1"}}
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for i in range(10):
+            manager.invoke({"messages": [("human", f"question {i}")]}, config)
+
+    state = manager.agent.get_state(config).values
+    assert len(state["messages"]) == 20  # full history is still checkpointed
+    assert state["summary"] == "rolling summary"
+    assert max(manager.history.prompt_tokens) <= 400
+    assert len(prompts[-1]) < 10
+    assert prompts[-1][0].content == "be brief"
@@ -0,0 +1,108 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import src.app as app
+from src.notifications import (
+    AdaptiveBackoff,
+    FileNotificationSource,
+    PubSubNotificationSource,
+    QueueNotificationSource,
+)
+
+
+@pytest.mark.asyncio
+async def test_queue_source_times_out_and_coalesces():
+    source = QueueNotificationSource()
+    assert await source.wait(0.01) is False
+
+    source.notify("1")
+    source.notify("2")
+    assert await source.wait(1) is True
+    assert await source.wait(0.01) is False
+
+
+@pytest.mark.asyncio
+async def test_file_source_consumes_spooled_notifications(tmp_path):
+    source = FileNotificationSource(str(tmp_path), interval=0.01)
+    assert await source.wait(0.02) is False
+
+    (tmp_path / "n1.json").write_text('{"historyId": "5"}')
+    (tmp_path / "n2.json").write_text('{"historyId": "6"}')
+    assert await source.wait(1) is True
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_adaptive_backoff():
+    backoff = AdaptiveBackoff(10, 60)
+    assert [backoff.next(False) for _ in range(4)] == [20, 40, 60, 60]
+    assert backoff.next(True) == 10
+
+
+@pytest.mark.asyncio
+async def test_poll_gmail_wakes_on_notification(monkeypatch):
+    source = QueueNotificationSource()
+    monkeypatch.setattr(app, "notification_source", source)
+    monkeypatch.setattr(app, "get_service", lambda name, version: object())
+    monkeypatch.setattr(app, "digest_store", MagicMock())
+    db = MagicMock()
+    db.get.return_value = "0"
+    monkeypatch.setattr(app, "db", db)
+
+    fetched_at = []
+
+    def fetch(service, last, **kwargs):
+        fetched_at.append(time.monotonic())
+        return []
+
+    monkeypatch.setattr(app, "fetch_new_messages", fetch)
+
+    task = asyncio.create_task(app.poll_gmail())
+    await asyncio.sleep(0.05)
+    notified = time.monotonic()
+    source.notify("42")
+    await asyncio.sleep(0.05)
+    task.cancel()
+    await task
+
+    # The fallback poll is minutes away, yet the notification is handled
+    # straight away.
+    assert len(fetched_at) == 2
+    assert fetched_at[1] - notified < 1
+
+
+def _pubsub_source(pull):
+    source = PubSubNotificationSource.__new__(PubSubNotificationSource)
+    source.subscription = "projects/p/subscriptions/s"
+    source.interval = 0.01
+    source._pull = pull
+    return source
+
+
+@pytest.mark.asyncio
+async def test_pubsub_source_waits_out_errors():
+    calls = []
+
+    def pull(timeout):
+        calls.append(timeout)
+        raise PermissionError("403 missing pubsub.subscriptions.consume")
+
+    source = _pubsub_source(pull)
+    started = time.monotonic()
+    assert await source.wait(0.2) is False
+    # One failed pull, then the rest of the timeout is slept, not re-polled
+    assert len(calls) == 1
+    assert time.monotonic() - started >= 0.19
+
+
+@pytest.mark.asyncio
+async def test_pubsub_source_pulls_again_after_early_empty_pull():
+    results = iter([False, False, True])
+    source = _pubsub_source(lambda timeout: next(results))
+    assert await source.wait(1) is True
@@ -0,0 +1,167 @@
+import time
+
+import pytest
+
+import src.tools.notion.mirror as mirror_module
+from src.db import TaskStore
+from src.response_cache import ResponseCache
+from src.tools.notion import add_task_in_todo_list, get_my_todo_list
+from src.tools.notion.mirror import TaskMirror
+
+
+def _page(page_id, title, due, edited, status="Not started", **extra):
+    return {
+        "id": page_id,
+        "last_edited_time": edited,
+        "properties": {
+            "Title": {"title": [{"plain_text": title, "text": {"content": title}}]},
+            "Status": {"status": {"name": status}},
+            "Date": {"date": {"start": due} if due else None},
+        },
+        **extra,
+    }
+
+
+class FakeDatabases:
+    def __init__(self, notion):
+        self.notion = notion
+
+    def query(self, database_id, page_size, start_cursor=None, filter=None, sorts=None):
+        self.notion.queries.append({"filter": filter, "start_cursor": start_cursor})
+        pages = sorted(self.notion.pages_by_id.values(), key=lambda p: p["last_edited_time"])
+        if filter:
+            since = filter["last_edited_time"]["on_or_after"]
+            pages = [p for p in pages if p["last_edited_time"] >= since]
+        else:
+            pages = [p for p in pages if not p.get("archived")]
+        start = int(start_cursor or 0)
+        more = start + page_size < len(pages)
+        return {
+            "results": pages[start:start + page_size],
+            "has_more": more,
+            "next_cursor": str(start + page_size) if more else None,
+        }
+
+
+class FakePages:
+    def __init__(self, notion):
+        self.notion = notion
+
+    def create(self, parent, properties):
+        page_id = f"new-{len(self.notion.pages_by_id)}"
+        page = {
+            "id": page_id,
+            "last_edited_time": "2026-10-18T12:00:00.000Z",
+            "properties": {
+                "Title": {"title": [{"plain_text": properties["Title"]["title"][0]["text"]["content"]}]},
+                "Status": properties["Status"],
+                "Date": properties.get("Date", {"date": None}),
+            },
+        }
+        self.notion.pages_by_id[page_id] = page
+        return page
+
+
+class FakeNotion:
+    """Stand-in for ``notion_client.Client`` over an in-memory database."""
+
+    def __init__(self, pages):
+        self.pages_by_id = {p["id"]: p for p in pages}
+        self.queries = []
+        self.databases = FakeDatabases(self)
+        self.pages = FakePages(self)
+
+
+@pytest.fixture
+def notion():
+    pages = [
+        _page(f"t{i}", f"task {i}", f"2026-10-{18 + i % 2}", f"2026-10-01T09:{i % 60:02d}:00.000Z")
+        for i in range(250)
+    ]
+    return FakeNotion(pages)
+
+
+@pytest.fixture
+def mirror(tmp_path, notion):
+    with TaskStore(str(tmp_path / "tasks.db")) as store:
+        yield TaskMirror(notion, store, "db", max_age=60)
+
+
+def test_first_sync_reads_every_page(mirror, notion):
+    assert mirror.sync() == 250
+    assert mirror.store.count() == 250
+    assert [q["start_cursor"] for q in notion.queries] == [None, "100", "200"]
+    assert len(mirror.tasks_on("2026-10-18")) == 125
+
+
+def test_delta_sync_fetches_only_edited_pages(mirror, notion):
+    mirror.sync()
+    notion.queries.clear()
+    notion.pages_by_id["t3"] = _page("t3", "task 3", "2026-10-20", "2026-10-02T08:00:00.000Z", status="Done")
+    notion.pages_by_id["t4"] = _page("t4", "task 4", "2026-10-18", "2026-10-02T08:01:00.000Z", archived=True)
+
+    # The two edits, plus the four pages already seen in the watermark's minute
+    assert mirror.sync() == 6
+    assert notion.queries[0]["filter"]["last_edited_time"] == {"on_or_after": "2026-10-01T09:59:00.000Z"}
+    assert mirror.store.tasks_on("2026-10-20") == [
+        {"id": "t3", "title": "task 3", "status": "Done", "due_date": "2026-10-20"}
+    ]
+    assert "t4" not in {t["id"] for t in mirror.store.tasks_on("2026-10-18")}
+    assert mirror.store.count() == 249
+
+
+def test_reads_within_max_age_stay_local(mirror, notion):
+    mirror.tasks_on("2026-10-18")
+    notion.queries.clear()
+
+    started = time.perf_counter()
+    tasks = mirror.tasks_on("2026-10-19", status="Not started")
+    assert time.perf_counter() - started < 0.05
+    assert len(tasks) == 125
+    assert notion.queries == []
+
+
+def test_stale_mirror_syncs_before_reading(mirror, notion):
+    mirror.max_age = 0
+    mirror.tasks_on("2026-10-18")
+    notion.queries.clear()
+    mirror.tasks_on("2026-10-18")
+    assert notion.queries and notion.queries[0]["filter"] is not None
+
+
+def test_full_sync_drops_deleted_pages(mirror, notion):
+    mirror.sync()
+    del notion.pages_by_id["t0"]  # deleted pages never appear in a delta
+    mirror.sync()
+    assert mirror.store.count() == 250
+    mirror.sync(full=True)
+    assert mirror.store.count() == 249
+
+
+def test_add_task_writes_through(mirror, notion):
+    mirror.sync()
+    before = mirror.store.sync_state()["last_edited"]
+    notion.queries.clear()
+
+    mirror.add_task({
+        "Title": {"title": [{"text": {"content": "call mum"}}]},
+        "Status": {"status": {"name": "Not started"}},
+        "Date": {"date": {"start": "2026-10-21"}},
+    })
+
+    assert [t["title"] for t in mirror.tasks_on("2026-10-21")] == ["call mum"]
+    assert notion.queries == []
+    # Edits made elsewhere before the write are still picked up by the next delta
+    assert mirror.store.sync_state()["last_edited"] == before
+
+
+def test_tools_use_mirror(mirror, tmp_path, monkeypatch):
+    monkeypatch.setattr(mirror_module, "_mirror", mirror)
+    monkeypatch.setattr("src.response_cache._response_cache", ResponseCache(str(tmp_path / "cache.db")))
+
+    assert add_task_in_todo_list.invoke({"task": "pay rent", "date": "2026-10-22"}) == (
+        "Task 'pay rent' added successfully to Todo list for 2026-10-22."
+    )
+    result = get_my_todo_list.invoke({"date": "2026-10-22"})
+    assert result.startswith("Todo list for 2026-10-22 00:00:00:")
+    assert "'title': 'pay rent'" in result
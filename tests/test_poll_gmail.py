@@ -1,33 +1,41 @@
 import asyncio
+import threading
+import time
 from unittest.mock import MagicMock
 
 import pytest
 
 import src.app as app
+from src.db import SqliteKV
 
 
 @pytest.mark.asyncio
 async def test_poll_gmail_pushes_vip(monkeypatch):
     msgs = [{"id": "1", "historyId": "10"}]
 
-    monkeypatch.setattr(app, "gmail_service", object())
+    monkeypatch.setattr(app, "get_service", lambda name, version: object())
 
-    fetch = lambda service, last: msgs
+    fetch = lambda service, last, **kwargs: msgs
     monkeypatch.setattr(app, "fetch_new_messages", fetch)
 
     classify = lambda m: "vip"
     monkeypatch.setattr(app, "classify_importance", classify)
 
+    full = {m["id"]: m for m in msgs}
+    get_messages = lambda service, ids, **kwargs: [full[i] for i in ids]
+    monkeypatch.setattr(app, "get_messages", get_messages)
+
     pushed = []
 
-    def push_email(msg, kind):
+    async def push_email(msg, kind):
         pushed.append((msg, kind))
 
-    monkeypatch.setattr(app.TelegramChannel, "push_email", push_email)
+    monkeypatch.setattr(app.TelegramChannel, "apush_email", push_email)
 
     db = MagicMock()
     db.get.return_value = "0"
     monkeypatch.setattr(app, "db", db)
+    monkeypatch.setattr(app, "digest_store", MagicMock())
 
     async def fake_sleep(_):
         raise asyncio.CancelledError()
@@ -39,3 +47,290 @@ async def test_poll_gmail_pushes_vip(monkeypatch):
     assert pushed == [(msgs[0], "vip")]
     db.set.assert_called_with("last_history_id", "10")
 
+
+
+@pytest.mark.asyncio
+async def test_poll_gmail_feeds_digest_and_fetches_full_only_when_needed(
+    monkeypatch,
+):
+    msgs = [
+        {"id": "1", "historyId": "10"},
+        {"id": "2", "historyId": "11"},
+        {"id": "3", "historyId": "12"},
+    ]
+    kinds = {"1": "newsletter", "2": "vip", "3": "other"}
+    monkeypatch.setattr(app, "get_service", lambda name, version: object())
+    fetch_kwargs = {}
+
+    def fetch(service, last, **kwargs):
+        fetch_kwargs.update(kwargs)
+        return msgs
+
+    monkeypatch.setattr(app, "fetch_new_messages", fetch)
+    monkeypatch.setattr(app, "classify_importance", lambda m: kinds[m["id"]])
+
+    requested = []
+
+    def get_messages(service, ids, **kwargs):
+        requested.extend(ids)
+        return [{"id": i, "payload": "full"} for i in ids]
+
+    monkeypatch.setattr(app, "get_messages", get_messages)
+
+    pushed = []
+
+    async def push_email(msg, kind):
+        pushed.append(msg)
+
+    monkeypatch.setattr(app.TelegramChannel, "apush_email", push_email)
+
+    db = MagicMock()
+    db.get.return_value = "0"
+    monkeypatch.setattr(app, "db", db)
+    digest_store = MagicMock()
+    monkeypatch.setattr(app, "digest_store", digest_store)
+
+    async def fake_sleep(_):
+        raise asyncio.CancelledError()
+
+    monkeypatch.setattr(app.asyncio, "sleep", fake_sleep)
+
+    await app.poll_gmail()
+
+    assert fetch_kwargs["format"] == "metadata"
+    assert requested == ["1", "2"]
+    assert pushed == [{"id": "2", "payload": "full"}]
+    assert [c.args for c in digest_store.add.call_args_list] == [
+        ({"id": "1", "payload": "full"}, "newsletter"),
+        ({"id": "2", "payload": "full"}, "vip"),
+        ({"id": "3", "historyId": "12"}, "other"),
+    ]
+    db.set.assert_called_with("last_history_id", "12")
+
+
+def test_failed_fetch_keeps_history_cursor_before_it(monkeypatch):
+    monkeypatch.setattr(app, "get_service", lambda name, version: object())
+
+    def fetch(service, last, **kwargs):
+        raise app.IncompleteFetchError(["3"], [{"id": "1", "historyId": "60"}], "52")
+
+    monkeypatch.setattr(app, "fetch_new_messages", fetch)
+    monkeypatch.setattr(app, "classify_importance", lambda m: "other")
+    db = MagicMock()
+    monkeypatch.setattr(app, "db", db)
+    digest_store = MagicMock()
+    monkeypatch.setattr(app, "digest_store", digest_store)
+
+    app._record(*app._fetch_and_classify("50"))
+
+    digest_store.add.assert_called_once_with({"id": "1", "historyId": "60"}, "other")
+    db.set.assert_called_once_with("last_history_id", "52")
+
+
+def test_each_thread_fetches_with_its_own_gmail_client(monkeypatch):
+    monkeypatch.setattr(app, "get_service", lambda name, version: threading.current_thread())
+    used = []
+    monkeypatch.setattr(app, "fetch_new_messages", lambda service, last, **kwargs: used.append(service) or [])
+
+    threads = [threading.Thread(target=app._fetch_and_classify, args=("1",)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+        thread.join()
+
+    assert used == threads
+
+
+@pytest.mark.asyncio
+async def test_run_digest_reads_prebuilt_buckets(monkeypatch, tmp_path):
+    store = app.DigestStore(str(tmp_path / "assistant.db"))
+    # Received long ago but ingested late: still part of the digest
+    store.add({"id": "1", "internalDate": "1000"}, "promo")
+    store.add({"id": "2", "internalDate": "5000"}, "other")
+    monkeypatch.setattr(app, "digest_store", store)
+    # No Gmail access is needed to build the digest.
+    monkeypatch.setattr(app, "get_service", lambda name, version: pytest.fail("Gmail used"))
+
+    formatted = []
+    monkeypatch.setattr(
+        app.digest, "format_digest", lambda b: formatted.append(b) or "digest"
+    )
+    sent = []
+
+    async def asend_long_message(self, text):
+        # Arrives while the digest is being sent: kept for the next one
+        store.add({"id": "3", "internalDate": "4000"}, "other")
+        sent.append(text)
+
+    monkeypatch.setattr(app.TelegramChannel, "__init__", lambda self: None)
+    monkeypatch.setattr(app.TelegramChannel, "asend_long_message", asend_long_message)
+
+    await app.run_digest()
+
+    assert formatted == [{
+        "promo": [{"id": "1", "internalDate": "1000"}],
+        "newsletter": [],
+        "other": [{"id": "2", "internalDate": "5000"}],
+    }]
+    assert sent == ["digest"]
+    assert store.buckets() == {
+        "promo": [],
+        "newsletter": [],
+        "other": [{"id": "3", "internalDate": "4000"}],
+    }
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_digest_does_not_block_polling(monkeypatch):
+    monkeypatch.setattr(app, "notification_source", None)
+    monkeypatch.setattr(app, "get_service", lambda name, version: object())
+    monkeypatch.setattr(app, "POLL_MIN_INTERVAL", 0.01)
+    monkeypatch.setattr(app, "POLL_MAX_INTERVAL", 0.01)
+    monkeypatch.setattr(app, "digest_store", MagicMock())
+    db = MagicMock()
+    db.get.return_value = "0"
+    monkeypatch.setattr(app, "db", db)
+
+    polls = []
+
+    def fetch(service, last, **kwargs):
+        polls.append(time.monotonic())
+        return []
+
+    monkeypatch.setattr(app, "fetch_new_messages", fetch)
+
+    def slow_format(buckets):
+        time.sleep(0.3)
+        return "digest"
+
+    monkeypatch.setattr(app.digest, "format_digest", slow_format)
+
+    async def asend_long_message(self, text):
+        pass
+
+    monkeypatch.setattr(app.TelegramChannel, "__init__", lambda self: None)
+    monkeypatch.setattr(app.TelegramChannel, "asend_long_message", asend_long_message)
+
+    poller = asyncio.create_task(app.poll_gmail())
+    await asyncio.sleep(0.05)
+    started = time.monotonic()
+    await app.start_digest()
+    finished = time.monotonic()
+    poller.cancel()
+    await poller
+
+    # The poller kept running while the digest was being built.
+    during = [t for t in polls if started <= t <= finished]
+    assert finished - started >= 0.3
+    assert len(during) >= 5
+
+
+@pytest.mark.asyncio
+async def test_catchup_requests_start_digest_once(monkeypatch, tmp_path):
+    store = SqliteKV(str(tmp_path / "assistant.db"))
+    store.set(app.CATCHUP_REQUEST_KEY, "1")  # handled before a restart
+    monkeypatch.setattr(app, "db", store)
+    started = []
+    monkeypatch.setattr(app, "start_digest", lambda: started.append(1))
+
+    commands = asyncio.create_task(app.handle_commands(interval=0.01))
+    await asyncio.sleep(0.05)
+    assert started == []
+    store.set(app.CATCHUP_REQUEST_KEY, "2")
+    await asyncio.sleep(0.05)
+    commands.cancel()
+    await commands
+
+    assert started == [1]
+    store.close()
+
+
+class FakeHistoryGmail:
+    """Gmail history and messages honouring ``historyTypes``."""
+
+    def __init__(self):
+        self.records = []
+        self.stored = {}
+
+    def add(self, msg_id, history_id, kind="messageAdded"):
+        self.stored[msg_id] = {
+            "id": msg_id, "historyId": str(history_id), "internalDate": str(history_id),
+        }
+        self.records.append({"id": str(history_id), "type": kind, "messages": [{"id": msg_id}]})
+
+    def users(self):
+        return self
+
+    def history(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, userId, startHistoryId, historyTypes=None):
+        return MagicMock(execute=lambda: {"history": [
+            r for r in self.records
+            if int(r["id"]) > int(startHistoryId)
+            and (historyTypes is None or r["type"] in historyTypes)
+        ]})
+
+    def get(self, userId, id, format, metadataHeaders=None):
+        return MagicMock(execute=lambda: self.stored[id])
+
+
+@pytest.mark.asyncio
+async def test_label_change_after_digest_does_not_digest_again(monkeypatch, tmp_path):
+    gmail = FakeHistoryGmail()
+    monkeypatch.setattr(app, "get_service", lambda name, version: gmail)
+    monkeypatch.setattr(app, "GMAIL_BATCH_SIZE", None)
+    monkeypatch.setattr(app, "message_cache", None)
+    monkeypatch.setattr(app, "classify_importance", lambda m: "other")
+    db = SqliteKV(str(tmp_path / "kv.db"))
+    store = app.DigestStore(str(tmp_path / "digest.db"))
+    monkeypatch.setattr(app, "db", db)
+    monkeypatch.setattr(app, "digest_store", store)
+    monkeypatch.setattr(app.digest, "format_digest", lambda b: str(sum(map(len, b.values()))))
+    sent = []
+
+    async def asend_long_message(self, text):
+        sent.append(text)
+
+    monkeypatch.setattr(app.TelegramChannel, "__init__", lambda self: None)
+    monkeypatch.setattr(app.TelegramChannel, "asend_long_message", asend_long_message)
+
+    gmail.add("1", 10)
+    app._record(*app._fetch_and_classify("0"))
+    await app.run_digest()
+    # The user reads and archives the mail after the digest
+    gmail.records.append({"id": "11", "type": "labelRemoved", "messages": [{"id": "1"}]})
+    gmail.add("2", 12)
+    app._record(*app._fetch_and_classify(db.get("last_history_id")))
+    await app.run_digest()
+
+    assert sent == ["1", "1"]
+    assert store.buckets() == {"promo": [], "newsletter": [], "other": []}
+    store.close()
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_digest_keeps_entries(monkeypatch, tmp_path):
+    store = app.DigestStore(str(tmp_path / "assistant.db"))
+    monkeypatch.setattr(app, "digest_store", store)
+    monkeypatch.setattr(app.digest, "format_digest", lambda b: "digest" if b["other"] else "")
+    sent = []
+
+    async def asend_long_message(self, text):
+        sent.append(text)
+        raise app.TelegramError("Can't parse entities")
+
+    monkeypatch.setattr(app.TelegramChannel, "__init__", lambda self: None)
+    monkeypatch.setattr(app.TelegramChannel, "asend_long_message", asend_long_message)
+
+    await app.run_digest()  # nothing to send
+    store.add({"id": "1", "internalDate": "1000"}, "other")
+    await app.run_digest()
+
+    assert sent == ["digest"]
+    assert store.buckets()["other"] == [{"id": "1", "internalDate": "1000"}]
+    store.close()
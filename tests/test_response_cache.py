@@ -0,0 +1,179 @@
+import time
+import warnings
+from typing import List
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langgraph.prebuilt import create_react_agent
+
+import src.response_cache as response_cache
+from src.agents.base import Agent, AgentsOrchestrator
+from src.response_cache import ResponseCache, invalidates_responses, normalise_query
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with ResponseCache(str(tmp_path / "cache.db"), ttl=600, similarity=0.9) as c:
+        yield c
+
+
+def test_normalise_query_drops_front_end_framing():
+    message = "Message: What's on my Calendar today?\nCurrent Date/time: 2024-05-01 09:00"
+    assert normalise_query(message) == "whats on my calendar today"
+
+
+def test_normalise_query_keeps_dates_and_times_whole():
+    assert normalise_query("Meetings on 2024-05-01 after 10:30 or 5pm?") == (
+        "meetings on 2024-05-01 after 10:30 or 5pm"
+    )
+
+
+def test_exact_hit(cache):
+    assert cache.get("What's on my calendar today?") is None
+    assert cache.put("What's on my calendar today?", "Two meetings.")
+    started = time.perf_counter()
+    assert cache.get("what's on my calendar today") == "Two meetings."
+    assert time.perf_counter() - started < 0.05
+    assert cache.stats() == {"hits": 1, "similar_hits": 0, "misses": 1, "entries": 1}
+
+
+def test_scopes_are_separate(cache):
+    cache.put("my todos", "Buy milk.", scope="1")
+    assert cache.get("my todos", scope="telegram:2") is None
+
+
+def test_next_time_bucket_misses(cache, monkeypatch):
+    now = 600 * 1000 + 10
+    monkeypatch.setattr(response_cache.time, "time", lambda: now)
+    cache.put("my todos", "Buy milk.")
+    now += 599
+    assert cache.get("my todos") is None
+
+
+def test_similar_question_hits(cache):
+    cache.put("What's on my calendar today?", "Two meetings.")
+    assert cache.get("what is on my calendar for today") == "Two meetings."
+    assert cache.get("what's on my calendar tomorrow") is None
+    assert cache.stats()["similar_hits"] == 1
+
+
+def test_question_about_another_date_misses(cache):
+    question = (
+        "summarise the emails from the finance team about the quarterly budget review "
+        "meeting and the hiring plan on {}"
+    )
+    cache.put(question.format("2024-05-01"), "Budget approved.")
+    assert cache.get(question.format("2024-05-02")) is None
+    assert cache.get(question.format("2024-05-01").replace("hiring", "the hiring")) == "Budget approved."
+
+
+def test_similarity_can_be_disabled(tmp_path):
+    with ResponseCache(str(tmp_path / "cache.db"), similarity=0) as cache:
+        cache.put("What's on my calendar today?", "Two meetings.")
+        assert cache.get("what is on my calendar for today") is None
+
+
+def test_follow_ups_are_not_cached(cache):
+    assert not cache.put("yes, send it", "Sent.")
+    assert not cache.put("move it to 5pm", "Moved.")
+    assert cache.stats()["entries"] == 0
+
+
+def test_this_week_is_cached(cache):
+    assert cache.put("events this week", "Three events.")
+    assert cache.get("Events this week?") == "Three events."
+
+
+def test_write_invalidates(cache, monkeypatch):
+    monkeypatch.setattr(response_cache, "_response_cache", cache)
+
+    @invalidates_responses
+    def add_task(task):
+        return f"Task '{task}' added."
+
+    cache.put("my todos", "Buy milk.")
+    generation = cache.generation()
+    assert add_task("call mum") == "Task 'call mum' added."
+    assert cache.get("my todos") is None
+    # An answer produced while the write happened is not stored
+    assert not cache.put("my todos", "Buy milk.", generation=generation)
+
+
+class CountingChatModel(BaseChatModel):
+    """Chat model answering with a numbered reply, optionally running ``on_call``."""
+
+    calls: List[str] = []
+    on_call: object = None
+
+    @property
+    def _llm_type(self):
+        return "counting"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls.append(messages[-1].content)
+        if self.on_call:
+            self.on_call()
+        reply = AIMessage(content=f"answer {len(self.calls)}")
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+
+def _orchestrator(model, cache):
+    manager = Agent(
+        name="manager_agent", description="", system_prompt="", tools=[],
+        sub_agents=[], model="openai/gpt-4o", temperature=0.1,
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        manager.agent = create_react_agent(model, tools=[], prompt="sys")
+    return AgentsOrchestrator(main_agent=manager, agents=[manager], response_cache=lambda: cache)
+
+
+def test_orchestrator_answers_repeats_from_cache(cache):
+    model = CountingChatModel(calls=[])
+    orchestrator = _orchestrator(model, cache)
+
+    assert orchestrator.invoke("Message: my todos\nCurrent Date/time: 09:00") == "answer 1"
+    assert orchestrator.invoke("Message: my todos\nCurrent Date/time: 09:01") == "answer 1"
+    assert list(orchestrator.stream_reply("Message: My todos?")) == ["answer 1"]
+    assert len(model.calls) == 1
+
+    cache.invalidate()
+    assert orchestrator.invoke("Message: my todos") == "answer 2"
+
+
+def test_orchestrator_does_not_cache_turns_with_writes(cache):
+    model = CountingChatModel(calls=[], on_call=cache.invalidate)
+    orchestrator = _orchestrator(model, cache)
+
+    orchestrator.invoke("add buy milk to my todos")
+    orchestrator.invoke("add buy milk to my todos")
+    assert len(model.calls) == 2
+
+
+def test_cached_answer_is_added_to_memory(cache):
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    model = CountingChatModel(calls=[])
+    manager = Agent(
+        name="manager_agent", description="", system_prompt="", tools=[],
+        sub_agents=[], model="openai/gpt-4o", temperature=0.1, memory=InMemorySaver(),
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        manager.agent = create_react_agent(
+            model, tools=[], prompt="sys", checkpointer=manager.memory
+        )
+    orchestrator = AgentsOrchestrator(main_agent=manager, agents=[manager], response_cache=cache)
+    config = {"configurable": {"thread_id": "1"}}
+
+    orchestrator.invoke("my todos", config=config)
+    orchestrator.invoke("my todos", config=config)
+
+    messages = manager.agent.get_state(config).values["messages"]
+    assert [m.content for m in messages] == ["my todos", "answer 1", "my todos", "answer 1"]
+    assert len(model.calls) == 1
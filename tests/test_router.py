@@ -0,0 +1,150 @@
+import importlib
+import sqlite3
+from datetime import datetime
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from src.router import IntentRouter
+
+NOW = datetime(2026, 10, 18, 9, 30)
+
+
+class FakeSource:
+    def __init__(self, result=(), error=None):
+        self.result = result
+        self.error = error
+        self.calls = []
+
+    def __call__(self, **arguments):
+        self.calls.append(arguments)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+@pytest.mark.parametrize("message, intent, arguments", [
+    ("todo list for 2026-10-18", "todo_list", {"date": "2026-10-18"}),
+    ("My to-do list tomorrow", "todo_list", {"date": "2026-10-19"}),
+    ("events tomorrow", "calendar_events",
+     {"start_date": "2026-10-19T00:00:00", "end_date": "2026-10-20T00:00:00"}),
+    ("What's on my calendar today?", "calendar_events",
+     {"start_date": "2026-10-18T00:00:00", "end_date": "2026-10-19T00:00:00"}),
+    ("today's meetings", "calendar_events",
+     {"start_date": "2026-10-18T00:00:00", "end_date": "2026-10-19T00:00:00"}),
+    ("events next week", "calendar_events",
+     {"start_date": "2026-10-19T00:00:00", "end_date": "2026-10-26T00:00:00"}),
+    ("show me my emails from yesterday", "emails",
+     {"from_date": "2026-10-17T00:00:00", "to_date": "2026-10-18T00:00:00", "email": None}),
+])
+def test_match(message, intent, arguments):
+    matched = IntentRouter().match(message, NOW)
+    assert matched is not None
+    assert (matched[0].name, matched[1]) == (intent, arguments)
+
+
+@pytest.mark.parametrize("message", [
+    "emails from bob",
+    "move tomorrow's events to friday",
+    "add a task to my todo list",
+    "tasks this week",  # the todo list tool reads a single day
+    "todo list for 2026-02-30",
+])
+def test_ambiguous_requests_fall_back(message):
+    assert IntentRouter().match(message, NOW) is None
+
+
+def test_uses_date_sent_with_message():
+    message = "Message: events tomorrow\nCurrent Date/time: 2026-12-31 22:00"
+    _, arguments = IntentRouter().match(message)
+    assert arguments["start_date"] == "2027-01-01T00:00:00"
+
+
+def test_route_reads_source_and_reports_stats():
+    source = FakeSource([{
+        "summary": "Standup",
+        "start": {"dateTime": "2026-10-18T09:00:00+02:00"},
+        "end": {"dateTime": "2026-10-18T09:15:00+02:00"},
+    }])
+    router = IntentRouter(sources={"src.tools.calendar.cache:events_between": source})
+
+    assert router.route("events today", NOW) == (
+        "Your events on Sunday 18 October:\n- Sun 18 Oct 09:00: Standup"
+    )
+    assert router.route("plan my week", NOW) is None
+    router.record_fallback(4.0)
+
+    stats = router.stats()
+    assert len(source.calls) == 1
+    assert stats["requests"] == 2
+    assert stats["hit_rate"] == 0.5
+    assert stats["intents"] == {"calendar_events": 1}
+    assert stats["agent_ms"] == 4000.0
+    assert 3900 < stats["saved_ms"] <= 4000
+    assert "1/2 routed (50%)" in router.format_stats()
+
+
+def test_replies_are_written_for_the_user():
+    tasks = FakeSource([{"id": "page-1", "title": "Pay rent", "status": "Not started", "due_date": "2026-10-18"}])
+    events = FakeSource([{"summary": "Holiday", "start": {"date": "2026-10-21"}, "end": {"date": "2026-10-22"}}])
+    router = IntentRouter(sources={
+        "src.tools.notion.mirror:tasks_on": tasks,
+        "src.tools.calendar.cache:events_between": events,
+        "src.tools.email.read_emails:list_emails": FakeSource([]),
+    })
+
+    assert router.route("my todos", NOW) == "Your todo list for Sunday 18 October:\n- Pay rent (Not started)"
+    assert router.route("events next week", NOW) == (
+        "Your events from Monday 19 October to Sunday 25 October:\n- Wed 21 Oct, all day: Holiday"
+    )
+    assert router.route("emails from yesterday", NOW) == "You have no emails on Saturday 17 October."
+
+
+def test_source_failure_falls_back():
+    source = FakeSource(error=RuntimeError("boom"))
+    router = IntentRouter(sources={"src.tools.notion.mirror:tasks_on": source})
+
+    assert router.route("my todos", NOW) is None
+    assert router.stats()["routed"] == 0
+
+
+def test_google_api_error_falls_back(monkeypatch):
+    # The package re-exports the tool under the module's name
+    read_emails = importlib.import_module("src.tools.email.read_emails")
+
+    def get_service(name, version):
+        raise HttpError(httplib2.Response({"status": 500}), b"backend error")
+
+    monkeypatch.setattr(read_emails, "get_service", get_service)
+    router = IntentRouter()
+
+    # The ReadEmails tool turns this into "An error occurred: ..." for the agents
+    assert router.route("emails today", NOW) is None
+    assert router.stats()["routed"] == 0
+
+
+@pytest.mark.filterwarnings("ignore")
+def test_personal_assistant_skips_agents_for_routed_requests(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from src.agents.personal_assistant import PersonalAssistant
+
+    assistant = PersonalAssistant(sqlite3.connect(":memory:", check_same_thread=False))
+    source = FakeSource([])
+    assistant.router._sources["src.tools.notion.mirror:tasks_on"] = source
+    monkeypatch.setattr(
+        assistant.assistant_orchestrator, "invoke",
+        lambda *a, **k: pytest.fail("agents called for a routed request"),
+    )
+    config = {"configurable": {"thread_id": "1"}}
+
+    assert assistant.invoke("Message: my todos\nCurrent Date/time: 2026-10-18 09:00", config=config) == (
+        "You have no tasks on Sunday 18 October."
+    )
+    assert list(assistant.stream_reply("todo list for 2026-10-19", config=config)) == [
+        "You have no tasks on Monday 19 October."
+    ]
+    assert source.calls == [{"date": "2026-10-18"}, {"date": "2026-10-19"}]
+    # Routed turns are part of the conversation for follow-ups
+    messages = assistant.manager_agent.agent.get_state(config).values["messages"]
+    assert [m.type for m in messages] == ["human", "ai", "human", "ai"]
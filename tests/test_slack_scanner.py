@@ -0,0 +1,335 @@
+import threading
+import time
+
+import pytest
+from slack_sdk.errors import SlackApiError
+
+from src.db import SlackMessageStore, SqliteKV
+from src.tools.slack.scanner import SlackApi, SlackScanner, UserDirectory
+
+
+def _page(items, key, cursor, size):
+    start = int(cursor or 0)
+    chunk = items[start:start + size]
+    next_cursor = str(start + size) if start + size < len(items) else ""
+    return {key: chunk, "response_metadata": {"next_cursor": next_cursor}}
+
+
+class FakeSlack:
+    """Stand-in for ``WebClient`` serving a small workspace page by page."""
+
+    def __init__(self, channels, history, users, page_size=2, delay=0.0):
+        self.channels = channels
+        self.history = history
+        self.users = users
+        self.page_size = page_size
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _record(self, method, **kwargs):
+        with self._lock:
+            self.calls.append((method, kwargs))
+
+    def users_conversations(self, cursor=None, **kwargs):
+        self._record("users_conversations", cursor=cursor)
+        return _page(self.channels, "channels", cursor, self.page_size)
+
+    def users_list(self, cursor=None, **kwargs):
+        self._record("users_list", cursor=cursor)
+        return _page(self.users, "members", cursor, self.page_size)
+
+    def users_info(self, user):
+        self._record("users_info", user=user)
+        return {"user": {"id": user, "name": f"new-{user}"}}
+
+    def conversations_history(self, channel, oldest, cursor=None, **kwargs):
+        self._record("conversations_history", channel=channel, oldest=oldest)
+        time.sleep(self.delay)
+        if channel == "C-private":
+            raise SlackApiError("not_in_channel", {"ok": False, "error": "not_in_channel"})
+        messages = [m for m in self.history.get(channel, []) if float(m["ts"]) > float(oldest)]
+        messages.sort(key=lambda m: float(m["ts"]), reverse=True)  # newest first, like Slack
+        return _page(messages, "messages", cursor, self.page_size)
+
+
+def _workspace():
+    now = time.time()
+    channels = [
+        {"id": "D1", "is_im": True},
+        {"id": "C1", "name": "general"},
+        {"id": "C2", "name": "random"},
+        {"id": "C-private", "name": "secret"},
+    ]
+    history = {
+        "D1": [
+            {"ts": f"{now - 30:.6f}", "user": "U1", "text": "are you free?"},
+            {"ts": f"{now - 20:.6f}", "bot_id": "B1", "text": "auto reply"},
+            {"ts": f"{now - 10:.6f}", "user": "U1", "text": "ping"},
+        ],
+        "C1": [
+            {"ts": f"{now - 25:.6f}", "user": "U2", "text": "<@U0> please review"},
+            {"ts": f"{now - 15:.6f}", "user": "U3", "text": "lunch?"},
+            {"ts": f"{now - 5:.6f}", "user": "U9", "text": "<@U0> ship it"},
+        ],
+        "C2": [{"ts": f"{now - 3 * 86400:.6f}", "user": "U2", "text": "<@U0> old"}],
+    }
+    users = [
+        {"id": "U1", "name": "ann", "real_name": "Ann Lee"},
+        {"id": "U2", "name": "bob", "real_name": ""},
+        {"id": "U3", "name": "cy"},
+    ]
+    return channels, history, users
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SqliteKV(str(tmp_path / "state.db"))
+
+
+@pytest.fixture
+def messages(tmp_path):
+    with SlackMessageStore(str(tmp_path / "slack.db")) as store:
+        yield store
+
+
+def _scanner(client, store, messages=None, **kwargs):
+    api = SlackApi(client, tier_rates={})
+    return SlackScanner(api, store=store, messages=messages, **kwargs)
+
+
+def test_scan_reports_dms_and_mentions(store, messages):
+    client = FakeSlack(*_workspace())
+    scanner = _scanner(client, store, messages)
+
+    reported = scanner.scan()
+
+    assert [(m["channel"], m["user"], m["message"]) for m in reported] == [
+        ("D1", "Ann Lee", "are you free?"),
+        ("general", "bob", "<@U0> please review"),
+        ("D1", "Ann Lee", "ping"),
+        ("general", "new-U9", "<@U0> ship it"),
+    ]
+    # Everything but bot messages is stored, mentions or not
+    assert messages.stats() == {"messages": 5, "conversations": 2, "unreported": 0}
+    methods = [m for m, _ in client.calls]
+    # Every page of the conversation and user lists is read, users only once
+    assert methods.count("users_conversations") == 2
+    assert methods.count("users_list") == 2
+    assert methods.count("users_info") == 1
+    assert scanner.scan() == []
+
+
+def test_second_scan_starts_at_watermark(store, messages):
+    channels, history, users = _workspace()
+    client = FakeSlack(channels, history, users)
+    scanner = _scanner(client, store, messages)
+    scanner.scan()
+    client.calls.clear()
+
+    history["D1"].append({"ts": f"{time.time():.6f}", "user": "U1", "text": "hello again"})
+    # The store was ingested moments ago, so nothing is fetched
+    assert scanner.scan() == []
+    assert client.calls == []
+    reported = scanner.scan(max_age=0)
+
+    assert [m["message"] for m in reported] == ["hello again"]
+    oldest = {k["channel"]: k["oldest"] for m, k in client.calls if m == "conversations_history"}
+    assert oldest["C1"] == history["C1"][-1]["ts"]
+    # The user directory is still fresh
+    assert "users_list" not in [m for m, _ in client.calls]
+
+
+def _history_reads(client):
+    return [k["channel"] for m, k in client.calls if m == "conversations_history"]
+
+
+def test_channels_are_read_on_every_run_by_default(store, messages):
+    client = FakeSlack(*_workspace())
+    scanner = _scanner(client, store, messages)
+    scanner.ingest()
+    client.calls.clear()
+    scanner.ingest()
+    # Slack does not list the latest message of channels to bots
+    assert set(_history_reads(client)) == {"D1", "C1", "C2", "C-private"}
+
+
+def test_quiet_channels_are_read_less_often(store, messages):
+    client = FakeSlack(*_workspace())
+    scanner = _scanner(client, store, messages, quiet_max_interval=3600)
+    scanner.ingest()
+    assert set(_history_reads(client)) == {"D1", "C1", "C2", "C-private"}
+
+    client.calls.clear()
+    scanner.ingest()
+    # random had nothing new; general did, so it is read once more
+    assert set(_history_reads(client)) == {"D1", "C1", "C-private"}
+
+    client.calls.clear()
+    scanner.ingest()
+    assert set(_history_reads(client)) == {"D1", "C-private"}
+
+
+def test_listed_latest_message_skips_unchanged_conversations(store, messages):
+    channels, history, users = _workspace()
+    channels = [dict(c, latest={"ts": history.get(c["id"], [{"ts": "0"}])[-1]["ts"]}) for c in channels[:2]]
+    client = FakeSlack(channels, history, users)
+    scanner = _scanner(client, store, messages)
+    scanner.ingest()
+
+    client.calls.clear()
+    scanner.ingest()
+    assert _history_reads(client) == []
+
+    new_ts = f"{time.time():.6f}"
+    history["C1"].append({"ts": new_ts, "user": "U2", "text": "news"})
+    channels[1]["latest"] = {"ts": new_ts}
+    assert scanner.ingest() == 1
+    assert _history_reads(client) == ["C1"]
+
+
+def test_user_directory_failure_skips_only_that_channel(store, messages):
+    channels, history, users = _workspace()
+    client = FakeSlack(channels, history, users)
+
+    def users_list(cursor=None, **kwargs):
+        raise SlackApiError("ratelimited", {"ok": False, "error": "ratelimited"})
+
+    client.users_list = users_list
+    scanner = _scanner(client, store, messages)
+    assert scanner.ingest() == 0
+    # Channels whose messages could not be named are read again next time
+    assert store.get("slack_watermark:D1") is None
+    assert store.get("slack_watermark:C2") is not None
+
+    del client.users_list
+    assert scanner.ingest() == 5
+
+
+def test_user_directory_expires(store):
+    client = FakeSlack(*_workspace())
+    users = UserDirectory(SlackApi(client, tier_rates={}), ttl=0)
+    users.name("U1")
+    users.name("U1")
+    assert [m for m, _ in client.calls].count("users_list") == 4  # two pages, twice
+
+
+def test_conversations_are_scanned_concurrently(store, messages):
+    channels = [{"id": f"D{i}", "is_im": True} for i in range(8)]
+    client = FakeSlack(channels, {}, [], page_size=100, delay=0.1)
+    scanner = _scanner(client, store, messages, max_workers=8)
+
+    started = time.perf_counter()
+    scanner.ingest()
+    assert time.perf_counter() - started < 0.5
+
+
+def test_calls_are_paced_per_tier():
+    client = FakeSlack([], {}, [])
+    api = SlackApi(client, tier_rates={3: 600})  # 10 calls per second
+
+    started = time.perf_counter()
+    for _ in range(4):
+        api.call("conversations_history", channel="C1", oldest="0")
+    api.call("users_info", user="U1")  # a tier without a limit here
+    assert 0.25 < time.perf_counter() - started < 1.0
+    assert api.calls == {"conversations_history": 4, "users_info": 1}
+
+
+def test_ingest_if_stale(store, messages):
+    client = FakeSlack(*_workspace())
+    scanner = _scanner(client, store, messages)
+
+    assert scanner.ingest_if_stale(max_age=300) == 5
+    client.calls.clear()
+    assert scanner.ingest_if_stale(max_age=300) == 0
+    assert client.calls == []
+
+
+def test_store_search_filters(messages):
+    now = time.time()
+    records = [
+        ("D1", "D1", "DM", "U1", "Ann", "budget draft attached", []),
+        ("C1", "general", "channel", "U2", "Bob", "<@U0> budget review today", ["U0"]),
+        ("C1", "general", "channel", "U3", "Cy", "<@U7> lunch?", ["U7"]),
+        ("C2", "random", "channel", "U2", "Bob", "budget memes", []),
+    ]
+    messages.add(
+        {
+            "channel": channel, "ts": f"{now - 100 + i:.6f}", "channel_name": name,
+            "channel_type": kind, "user_id": user_id, "user": user, "text": text,
+            "mentions": mentions,
+        }
+        for i, (channel, name, kind, user_id, user, text, mentions) in enumerate(records)
+    )
+
+    def texts(**kwargs):
+        return [m["message"] for m in messages.search(**kwargs)]
+
+    assert texts(query="budget") == [
+        "budget draft attached", "<@U0> budget review today", "budget memes",
+    ]
+    assert texts(query="Bob budget") == ["<@U0> budget review today", "budget memes"]
+    assert texts(dms=True) == ["budget draft attached"]
+    assert texts(mentions=True) == ["<@U0> budget review today", "<@U7> lunch?"]
+    assert texts(mentions=True, mention_of="U0") == ["<@U0> budget review today"]
+    assert texts(dms=True, mentions=True, mention_of="U0") == [
+        "budget draft attached", "<@U0> budget review today",
+    ]
+    assert texts(channel="#random") == ["budget memes"]
+    assert texts(since=now - 99.5, until=now - 97.5) == [
+        "<@U0> budget review today", "<@U7> lunch?",
+    ]
+    assert texts(limit=1) == ["budget memes"]
+    # Adding the same messages again changes nothing
+    assert messages.add([]) == 0
+
+
+def test_edits_replace_stored_text(store, messages):
+    channels, history, users = _workspace()
+    client = FakeSlack(channels, history, users)
+    scanner = _scanner(client, store, messages)
+    scanner.scan()
+
+    original = history["C1"][1]
+    history["C1"].append({
+        "ts": f"{time.time():.6f}", "subtype": "message_changed",
+        "message": {"ts": original["ts"], "user": "U3", "text": "dinner?"},
+    })
+
+    assert scanner.ingest() == 0
+    assert [m["message"] for m in messages.search(query="dinner")] == ["dinner?"]
+    assert messages.search(query="lunch") == []
+    # The edit is neither a new message nor reported again
+    assert messages.stats() == {"messages": 5, "conversations": 2, "unreported": 0}
+
+
+def test_store_search_is_fast(messages):
+    now = time.time()
+    messages.add(
+        {
+            "channel": f"C{i % 50}", "ts": f"{now - i:.6f}", "channel_name": f"chan{i % 50}",
+            "channel_type": "channel", "user_id": "U1", "user": "Ann",
+            "text": f"status update number {i}" + (" incident" if i % 1000 == 0 else ""),
+            "mentions": [],
+        }
+        for i in range(20000)
+    )
+
+    started = time.perf_counter()
+    found = messages.search(query="incident", channel="chan0")
+    assert time.perf_counter() - started < 0.05
+    assert len(found) == 20
+
+
+def test_search_tool_queries_store(store, messages, monkeypatch):
+    import src.tools.slack.scanner as scanner_module
+    from src.tools.slack import search_slack_messages
+
+    scanner = _scanner(FakeSlack(*_workspace()), store, messages, mention_of="U0")
+    monkeypatch.setattr(scanner_module, "_scanner", scanner)
+
+    found = search_slack_messages.invoke({"query": "review", "only_mentions": True})
+    assert [m["message"] for m in found] == ["<@U0> please review"]
+    assert search_slack_messages.invoke({"query": "nothing like this"}) == "No messages found."
+    assert search_slack_messages.invoke({"from_date": "yesterday"}).startswith("Invalid date")
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import warnings
+from typing import Any, List
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import StructuredTool
+from langgraph.prebuilt import create_react_agent
+from telegram.constants import ParseMode
+from telegram.error import BadRequest
+
+from src.agents.base import Agent, AgentsOrchestrator
+from src.channels.streaming import ERROR_TEXT, PLACEHOLDER, iterate_in_thread, split_message
+from src.channels.telegram import TelegramChannel
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model replaying ``responses``, streamed word by word."""
+
+    responses: List[Any]
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.responses.pop(0))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        msg = self.responses.pop(0)
+        for i, word in enumerate(msg.content.split()):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=" " * bool(i) + word))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        if msg.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                for i, c in enumerate(msg.tool_calls)
+            ]))
+
+
+def test_stream_reply_yields_progress_and_final_answer():
+    send_message = StructuredTool.from_function(
+        lambda recipient, message: "3 meetings today",
+        name="SendMessage",
+        description="Send a message to a sub-agent",
+    )
+    model = ScriptedChatModel(responses=[
+        AIMessage(content="Let me check.", tool_calls=[{
+            "name": "SendMessage",
+            "args": {"recipient": "calendar_agent", "message": "today"},
+            "id": "call-1",
+        }]),
+        AIMessage(content="You have 3 meetings today."),
+    ])
+    manager = Agent(
+        name="manager_agent", description="", system_prompt="", tools=[],
+        sub_agents=[], model="openai/gpt-4o", temperature=0.1,
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        manager.agent = create_react_agent(model, tools=[send_message], prompt="sys")
+    orchestrator = AgentsOrchestrator(main_agent=manager, agents=[manager])
+
+    snapshots = list(orchestrator.stream_reply("what's on today?"))
+
+    assert snapshots[:2] == ["Let", "Let me"]
+    assert "Let me check.\n\n⏳ Asking calendar_agent…" in snapshots
+    assert "You have 3" in snapshots
+    assert snapshots[-1] == "You have 3 meetings today."
+
+
+class FakeMessage:
+    def __init__(self, bot, text):
+        self.bot = bot
+        self.text = text
+
+    async def edit_text(self, text, parse_mode=None):
+        self.bot.calls.append(("edit", text, parse_mode))
+        self.text = text
+
+
+class FakeBot:
+    def __init__(self):
+        self.calls = []
+
+    async def send_message(self, chat_id, text, parse_mode=None, **kwargs):
+        self.calls.append(("send", text, parse_mode))
+        return FakeMessage(self, text)
+
+
+@pytest.fixture
+def channel(monkeypatch):
+    monkeypatch.setenv("TELEGRAM_TOKEN", "123:abc")
+    channel = TelegramChannel()
+    channel.bot = FakeBot()
+    return channel
+
+
+async def paced(snapshots, delay):
+    for snapshot in snapshots:
+        await asyncio.sleep(delay)
+        yield snapshot
+
+
+@pytest.mark.asyncio
+async def test_telegram_streaming_edits_are_throttled(channel):
+    snapshots = [f"word {i}" for i in range(20)] + ["final *answer*"]
+
+    final = await channel.asend_streaming(paced(snapshots, 0.01), min_interval=0.05)
+
+    calls = channel.bot.calls
+    assert final == "final *answer*"
+    assert calls[0] == ("send", PLACEHOLDER, None)
+    edits = [c for c in calls if c[0] == "edit"]
+    # ~0.2s of tokens at one edit per 0.05s, plus the final Markdown edit.
+    assert 2 <= len(edits) <= 6
+    assert edits[-1] == ("edit", "final *answer*", ParseMode.MARKDOWN)
+
+
+@pytest.mark.asyncio
+async def test_telegram_streaming_shows_progress_during_pauses(channel):
+    async def snapshots():
+        yield "Let me check"
+        yield "Let me check\n\n⏳ Asking calendar_agent…"
+        await asyncio.sleep(0.2)  # the sub-agent is working
+        yield "You have 3 meetings today."
+
+    await channel.asend_streaming(snapshots(), min_interval=0.05)
+
+    edited = [c[1] for c in channel.bot.calls if c[0] == "edit"]
+    assert "Let me check\n\n⏳ Asking calendar_agent…" in edited
+
+
+@pytest.mark.asyncio
+async def test_telegram_streaming_splits_long_replies(channel):
+    final = "\n".join(["x" * 100] * 60)
+
+    await channel.asend_streaming(paced([final], 0), min_interval=0)
+
+    first, rest = split_message(final, 4096)
+    edits = [c[1] for c in channel.bot.calls if c[0] == "edit"]
+    sent = [c[1] for c in channel.bot.calls if c[0] == "send"]
+    assert edits[-1] == first
+    assert sent == [PLACEHOLDER, rest]
+
+
+@pytest.mark.asyncio
+async def test_telegram_streaming_replaces_placeholder_on_error(channel):
+    async def snapshots():
+        yield "Let me check"
+        raise RuntimeError("model unavailable")
+
+    with pytest.raises(RuntimeError):
+        await channel.asend_streaming(snapshots(), min_interval=0)
+
+    assert channel.bot.calls[-1] == ("edit", ERROR_TEXT, None)
+
+
+@pytest.mark.asyncio
+async def test_long_message_is_split_and_falls_back_to_plain_text(channel):
+    text = "\n".join(["x" * 100] * 60).replace("x", "_", 1)
+    send = channel.bot.send_message
+
+    async def strict_send(chat_id, text, parse_mode=None, **kwargs):
+        if parse_mode and text.count("_") % 2:
+            raise BadRequest("Can't parse entities")
+        return await send(chat_id, text, parse_mode)
+
+    channel.bot.send_message = strict_send
+    await channel.asend_long_message(text)
+
+    first, rest = split_message(text, 4096)
+    assert channel.bot.calls == [("send", first, None), ("send", rest, ParseMode.MARKDOWN)]
+
+
+def test_send_streaming_consumes_blocking_iterator(channel):
+    def blocking():
+        yield "partial"
+        yield "done"
+
+    assert channel.send_streaming(blocking(), min_interval=0) == "done"
+
+
+@pytest.mark.asyncio
+async def test_iterate_in_thread_propagates_errors():
+    def broken():
+        yield 1
+        raise ValueError("boom")
+
+    seen = []
+    with pytest.raises(ValueError):
+        async for item in iterate_in_thread(broken()):
+            seen.append(item)
+    assert seen == [1]
+
+
+def test_split_message_prefers_newlines():
+    assert split_message("aaa\nbbb\nccc", 8) == ["aaa\nbbb", "ccc"]
+    assert split_message("abcdefgh", 3) == ["abc", "def", "gh"]
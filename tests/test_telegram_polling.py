@@ -0,0 +1,100 @@
+from datetime import datetime, timezone
+
+import pytest
+from telegram import Chat, Message, Update
+
+from src.channels.telegram import CATCHUP_REQUEST_KEY, UPDATE_OFFSET_KEY, TelegramChannel
+from src.db import SqliteKV
+
+NOW = datetime(2024, 5, 1, 9, 0, tzinfo=timezone.utc)
+
+
+def make_update(update_id, text, chat_id=42):
+    chat = Chat(id=chat_id, type="private")
+    # Every message shares the same timestamp second.
+    return Update(update_id, message=Message(update_id, NOW, chat, text=text))
+
+
+class FakeBot:
+    """Serves ``updates`` like Telegram: everything from ``offset`` on."""
+
+    def __init__(self, updates):
+        self.updates = updates
+        self.calls = []
+
+    async def get_updates(self, offset=None, timeout=None, allowed_updates=None):
+        self.calls.append((offset, timeout))
+        self.allowed_updates = allowed_updates
+        return tuple(u for u in self.updates if offset is None or u.update_id >= offset)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SqliteKV(str(tmp_path / "assistant.db"))
+    yield store
+    store.close()
+
+
+def make_channel(monkeypatch, store, bot):
+    monkeypatch.setenv("TELEGRAM_TOKEN", "123:abc")
+    channel = TelegramChannel(store=store)
+    channel.bot = bot
+    return channel
+
+
+def test_long_poll_delivers_each_update_once(monkeypatch, store):
+    bot = FakeBot([make_update(10, "first"), make_update(11, "second")])
+    channel = make_channel(monkeypatch, store, bot)
+
+    first = channel.poll_messages(timeout=30)
+    channel.commit_offset()
+    bot.updates.append(make_update(12, "third", chat_id=7))
+    second = channel.poll_messages(timeout=30)
+    channel.commit_offset()
+    third = channel.poll_messages(timeout=30)
+
+    # Same-second messages are not lost, and nothing is delivered twice.
+    assert [m["text"] for m in first] == ["first", "second"]
+    assert [(m["text"], m["chat_id"]) for m in second] == [("third", 7)]
+    assert third == []
+    assert bot.calls == [(None, 30), (12, 30), (13, 30)]
+    # Only messages are consumed, so nothing else is fetched and confirmed
+    assert bot.allowed_updates == ["message"]
+
+
+def test_offset_survives_restart(monkeypatch, store):
+    bot = FakeBot([make_update(10, "first")])
+    channel = make_channel(monkeypatch, store, bot)
+    channel.poll_messages(timeout=0)
+    channel.commit_offset()
+
+    assert store.get(UPDATE_OFFSET_KEY) == "11"
+    restarted = make_channel(monkeypatch, store, bot)
+    assert restarted.poll_messages(timeout=0) == []
+
+
+def test_uncommitted_batch_is_delivered_again_after_restart(monkeypatch, store):
+    bot = FakeBot([make_update(10, "first")])
+    channel = make_channel(monkeypatch, store, bot)
+    assert len(channel.poll_messages(timeout=0)) == 1
+
+    # A crash before the commit does not lose the batch
+    restarted = make_channel(monkeypatch, store, bot)
+    assert [m["text"] for m in restarted.poll_messages(timeout=0)] == ["first"]
+
+
+def test_only_configured_chats_are_allowed(monkeypatch, store):
+    monkeypatch.setenv("CHAT_ID", "42")
+    monkeypatch.setattr("src.config.TELEGRAM_ALLOWED_CHATS", "7, 8")
+    channel = make_channel(monkeypatch, store, FakeBot([]))
+
+    assert channel.is_allowed(42) and channel.is_allowed("7") and channel.is_allowed(8)
+    assert not channel.is_allowed(99)
+
+
+def test_catchup_command_is_recorded_for_the_gmail_service(monkeypatch, store):
+    channel = make_channel(monkeypatch, store, FakeBot([]))
+
+    assert channel.handle_command({"text": "/catchup"}) is True
+    assert store.get(CATCHUP_REQUEST_KEY)
+    assert channel.handle_command({"text": "what's on today?"}) is False
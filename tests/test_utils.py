@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from src import utils
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    utils.reset_llm_clients()
+    yield
+    utils.reset_llm_clients()
+
+
+def test_llm_registry_reuses_clients_per_key():
+    a = utils.get_llm_by_provider("openai/gpt-4o-mini", temperature=0.1)
+    b = utils.get_llm_by_provider("openai/gpt-4o-mini", temperature=0.1)
+    c = utils.get_llm_by_provider("openai/gpt-4o-mini", temperature=0.5)
+
+    assert a is b
+    assert a is not c
+    # Every OpenAI model talks through the same pooled HTTP client.
+    assert a.root_client._client is c.root_client._client is utils.get_http_client()
+    assert utils.get_openai_client()._client is utils.get_http_client()
+    # ainvoke goes through the shared async client
+    assert a.root_async_client._client is c.root_async_client._client is utils.get_async_http_client()
+    stats = utils.llm_pool_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["models"] == ["openai/gpt-4o-mini/0.1", "openai/gpt-4o-mini/0.5"]
+
+
+def test_llm_registry_is_thread_safe():
+    results = []
+
+    def worker():
+        results.append(utils.get_llm_by_provider("openai/gpt-4o", temperature=0.1))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(r) for r in results}) == 1
+    assert utils.llm_pool_stats()["misses"] == 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_http_client_keeps_connections_alive():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = utils.get_http_client()
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+        for _ in range(5):
+            assert client.get(url).text == "ok"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    stats = utils.llm_pool_stats()
+    assert stats["requests"] == 5
+    # All five requests went over one reused connection.
+    assert stats["connections"] == 1
+    assert stats["idle_connections"] == 1
+
+
+def test_pool_stats_degrade_when_httpx_internals_change(monkeypatch):
+    transport = httpx.MockTransport(lambda request: httpx.Response(200))
+    monkeypatch.setattr(utils, "_http_client", httpx.Client(transport=transport))
+
+    stats = utils.llm_pool_stats()
+    assert stats["connections"] == stats["idle_connections"] == "unknown"
+    assert (stats["hits"], stats["misses"]) == (0, 0)
+
+
+def test_async_http_client_pools_connections_per_loop():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    async def fetch(close):
+        client = utils.get_async_http_client()
+        for _ in range(5):
+            assert (await client.get(url)).text == "ok"
+        stats = utils.llm_pool_stats()
+        if close:
+            await client._transport.aclose()  # closes only this loop's pool
+        return stats
+
+    loop = asyncio.new_event_loop()
+    try:
+        first = loop.run_until_complete(fetch(close=False))
+        # Another worker thread's loop gets its own pool
+        second = asyncio.run(fetch(close=True))
+        loop.run_until_complete(fetch(close=True))
+    finally:
+        loop.close()
+        server.shutdown()
+        server.server_close()
+
+    assert first["requests"] == 5
+    assert first["connections"] == first["idle_connections"] == 1
+    assert second["connections"] == 2
+    assert utils.llm_pool_stats()["requests"] == 15